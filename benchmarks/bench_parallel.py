@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Compares Query.apply with Query.apply_parallel for an increasing number of worker processes.
+#
+#   PYTHONPATH=".:./src" python benchmarks/bench_parallel.py [items]
+import multiprocessing
+import sys
+import time
+
+from phylter.backends.mapping import MappingBackend
+from phylter.parser import Parser
+
+QUERY = " or ".join("(a == %s and b > %s)" % (i, i * 10) for i in range(50))
+
+
+def rows(n):
+	for i in range(n):
+		yield {'a': i % 100, 'b': i % 1000}
+
+
+def timed(f):
+	start = time.time()
+	count = sum(1 for _ in f())
+	return time.time() - start, count
+
+
+def main(n):
+	query = Parser().parse(QUERY)
+
+	serial, expected = timed(lambda: query.apply(rows(n), backend=MappingBackend))
+	print("serial         %8.3fs" % serial)
+
+	workers = 1
+	while workers <= multiprocessing.cpu_count():
+		elapsed, count = timed(lambda: query.apply_parallel(rows(n), workers=workers, chunksize=5000,
+															 backend=MappingBackend))
+		assert count == expected
+		print("%2d worker(s)   %8.3fs  speedup %.2fx" % (workers, elapsed, serial / elapsed))
+		workers *= 2
+
+
+if __name__ == '__main__':
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
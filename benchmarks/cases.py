@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# Benchmark cases for benchmarks/run.py. Every case is a function returning the callable to time (or None if the
+# case can't run in this environment); cases are registered with the @case decorator.
+from phylter.backends import get_backend
+from phylter.parser import Parser
+from phylter.query import Query
+from phylter.schema import Schema
+
+cases = []
+
+
+def case(name):
+	def decorator(f):
+		cases.append((name, f))
+		return f
+	return decorator
+
+
+class Item(object):
+	def __init__(self, i):
+		self.a = i % 100
+		self.b = i % 7
+		self.c = 'name%s' % (i % 13)
+
+
+def or_query(n):
+	return " or ".join("a == %s" % i for i in range(n))
+
+
+def nested_query(depth):
+	s = "a > 10"
+	for i in range(depth):
+		s = "b == %s or (%s and c == 'name%s')" % (i, s, i)
+	return s
+
+
+def have_pyparsing():
+	try:
+		import pyparsing
+		return True
+	except ImportError:
+		return False
+
+
+for _n in (1, 10, 100, 1000):
+	@case("parse/conditions=%s" % _n)
+	def parse(n=_n):
+		s = or_query(n)
+		parser = Parser()
+		return lambda: parser.parse(s)
+
+	@case("parse-pyparsing/conditions=%s" % _n)
+	def parse_pyparsing(n=_n):
+		if not have_pyparsing():
+			return None
+		s = or_query(n)
+		parser = Parser(use_pyparsing=True)
+		return lambda: parser.parse(s)
+
+
+for _n in (10, 1000):
+	@case("deserialize-bytes/conditions=%s" % _n)
+	def deserialize_bytes(n=_n):
+		data = Parser().parse(or_query(n)).to_bytes()
+		return lambda: Query.from_bytes(data)
+
+	@case("deserialize-json/conditions=%s" % _n)
+	def deserialize_json(n=_n):
+		data = Parser().parse(or_query(n)).to_json()
+		return lambda: Query.from_json(data)
+
+
+for _n in (1000, 10000, 100000):
+	@case("objects/items=%s" % _n)
+	def objects_items(n=_n):
+		items = [Item(i) for i in range(n)]
+		query = Parser().parse("a > 50 and (b == 3 or c == 'name5')")
+		return lambda: sum(1 for _ in query.apply(items))
+
+
+@case("objects-schema/items=100000")
+def objects_schema():
+	items = [Item(i) for i in range(100000)]
+	query = Parser(schema=Schema({'a': int, 'b': int, 'c': str})).parse("a > 50 and (b == 3 or c == 'name5')")
+	return lambda: sum(1 for _ in query.apply(items))
+
+
+for _n in (10, 100):
+	@case("objects-or/values=%s" % _n)
+	def objects_or(n=_n):
+		items = [Item(i) for i in range(10000)]
+		query = Parser().parse(or_query(n))
+		return lambda: sum(1 for _ in query.apply(items))
+
+	@case("objects-in/values=%s" % _n)
+	def objects_in(n=_n):
+		items = [Item(i) for i in range(10000)]
+		query = Parser().parse("a in (%s)" % ", ".join(str(i) for i in range(n)))
+		return lambda: sum(1 for _ in query.apply(items))
+
+
+for _depth in (1, 4, 16):
+	@case("objects/depth=%s" % _depth)
+	def objects_depth(depth=_depth):
+		items = [Item(i) for i in range(10000)]
+		query = Parser().parse(nested_query(depth))
+		return lambda: sum(1 for _ in query.apply(items))
+
+
+@case("mapping/items=10000")
+def mapping_items():
+	items = [Item(i).__dict__ for i in range(10000)]
+	query = Parser().parse("a > 50 and (b == 3 or c == 'name5')")
+	return lambda: sum(1 for _ in query.apply(items))
+
+
+def setup_django():
+	try:
+		import django
+		from django.conf import settings
+	except ImportError:
+		return None
+
+	if not settings.configured:
+		settings.configure(
+			DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+			INSTALLED_APPS=[],
+		)
+		django.setup()
+
+	from django.db import models
+
+	class Person(models.Model):
+		a = models.IntegerField()
+		b = models.IntegerField()
+		c = models.CharField(max_length=20)
+
+		class Meta:
+			app_label = 'benchmarks'
+
+	return Person
+
+
+_django_model = []
+
+
+def get_django_model():
+	if not _django_model:
+		_django_model.append(setup_django())
+	return _django_model[0]
+
+
+for _n in (10, 1000):
+	@case("django/sql/conditions=%s" % _n)
+	def django_sql(n=_n):
+		model = get_django_model()
+		if model is None:
+			return None
+
+		query = Parser().parse(" or ".join("a == %s or b > %s" % (i, i) for i in range(n)))
+		return lambda: str(query.apply(model.objects).query)
+
+
+@case("dispatch/get_backend/list")
+def dispatch_list():
+	items = [Item(1)]
+	return lambda: get_backend(items)
+
+
+@case("dispatch/get_backend/dicts")
+def dispatch_dicts():
+	items = [{'a': 1}]
+	return lambda: get_backend(items)
+
+
+@case("dispatch/apply/list")
+def dispatch_apply():
+	items = [Item(1)]
+	query = Parser().parse("a == 1")
+	return lambda: list(query.apply(items))
+
+
+@case("numpy/rows=1000000")
+def numpy_rows():
+	try:
+		import numpy
+	except ImportError:
+		return None
+
+	data = {'a': numpy.arange(1000000) % 100, 'b': numpy.arange(1000000) % 7}
+	query = Parser().parse("a > 50 and (b == 3 or b == 5)")
+	return lambda: query.mask(data)
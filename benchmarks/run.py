@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# Runs the benchmark suite and writes the results as JSON.
+#
+#   PYTHONPATH=".:./src" python benchmarks/run.py --save baseline.json
+#   PYTHONPATH=".:./src" python benchmarks/run.py --compare baseline.json
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cases import cases
+
+
+def measure(f, repeat, min_time):
+	timer = timeit.Timer(f)
+
+	# call the function often enough that a single measurement takes at least min_time seconds
+	number = 1
+	while True:
+		elapsed = timer.timeit(number)
+		if elapsed >= min_time:
+			break
+		number *= 10 if elapsed < min_time / 10 else 2
+
+	return min([elapsed] + timer.repeat(repeat - 1, number)) / number, number
+
+
+def run(selected, repeat, min_time):
+	results = {}
+
+	for name, setup in cases:
+		if selected and not any(s in name for s in selected):
+			continue
+
+		f = setup()
+		if f is None:
+			sys.stderr.write("%-40s skipped\n" % name)
+			continue
+
+		seconds, number = measure(f, repeat, min_time)
+		results[name] = {'seconds': seconds, 'number': number, 'repeat': repeat}
+		sys.stderr.write("%-40s %12.3f us\n" % (name, seconds * 1e6))
+
+	return {
+		'python': platform.python_version(),
+		'implementation': platform.python_implementation(),
+		'results': results,
+	}
+
+
+def compare(results, baseline, threshold):
+	regressions = []
+
+	sys.stderr.write("\n%-40s %14s %14s %8s\n" % ("benchmark", "baseline (us)", "current (us)", "ratio"))
+	for name, result in sorted(results['results'].items()):
+		if name not in baseline['results']:
+			continue
+
+		before = baseline['results'][name]['seconds']
+		ratio = result['seconds'] / before if before else float('inf')
+		marker = ""
+		if ratio > 1 + threshold:
+			marker = " slower"
+			regressions.append(name)
+		elif ratio < 1 - threshold:
+			marker = " faster"
+
+		sys.stderr.write("%-40s %14.3f %14.3f %7.2fx%s\n" % (name, before * 1e6, result['seconds'] * 1e6, ratio, marker))
+
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Runs the phylter benchmarks")
+	parser.add_argument('filter', nargs='*', help="only run benchmarks containing one of these strings")
+	parser.add_argument('--repeat', type=int, default=5)
+	parser.add_argument('--min-time', type=float, default=0.2, help="minimum duration of a single measurement")
+	parser.add_argument('--output', help="write the results to this file (default: stdout)")
+	parser.add_argument('--save', help="save the results as baseline to this file")
+	parser.add_argument('--compare', help="compare the results with this baseline file")
+	parser.add_argument('--threshold', type=float, default=0.1, help="relative change reported as regression")
+	args = parser.parse_args(argv)
+
+	results = run(args.filter, args.repeat, args.min_time)
+
+	output = json.dumps(results, indent=2, sort_keys=True)
+	for path in (args.output, args.save):
+		if path:
+			with open(path, 'w') as f:
+				f.write(output)
+	if not args.output:
+		print(output)
+
+	if args.compare:
+		with open(args.compare) as f:
+			regressions = compare(results, json.load(f), args.threshold)
+		if regressions:
+			sys.stderr.write("\n%s benchmark(s) slower than the baseline\n" % len(regressions))
+			return 1
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
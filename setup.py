@@ -19,7 +19,8 @@ setup(
 	include_package_data=True,
 	zip_safe=False,
 	license='GPL-3',
-	install_requires=[
-		'pyparsing',
-	]
+	install_requires=[],
+	extras_require={
+		'pyparsing': ['pyparsing'],
+	}
 )
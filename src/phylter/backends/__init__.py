@@ -1,22 +1,167 @@
 # -*- coding: utf-8 -*-
-from phylter.backends.objects import ObjectsBackend
+import importlib
+import sys
+import threading
+import weakref
 
-backends = None
+ENTRY_POINT_GROUP = 'phylter.backends'
 
-if backends is None:
-	backends = []
+# the built-in backends in the order they are probed: (module, class name, module which has to be imported already).
+# Objects of e.g. a Django QuerySet can't exist before django has been imported, so these backends (and their heavy
+# dependencies) are only loaded once the application has imported the library itself.
+builtin_backends = [
+	('phylter.backends.django_backend', 'DjangoBackend', 'django'),
+	('phylter.backends.pandas_backend', 'PandasBackend', 'pandas'),
+	('phylter.backends.numpy_backend', 'NumpyBackend', 'numpy'),
+	('phylter.backends.dbapi', 'SQLBackend', None),
+	('phylter.backends.files', 'FileBackend', None),
+	('phylter.backends.indexed', 'IndexedBackend', None),
+	('phylter.backends.mapping', 'MappingBackend', None),
+	('phylter.backends.objects', 'ObjectsBackend', None),
+]
 
+# generic backends which support (almost) everything; third-party backends are probed before them
+fallback_backends = ('MappingBackend', 'ObjectsBackend')
+
+# the loaded backend classes in the order they are probed
+backends = []
+pending = list(builtin_backends)
+builtin_positions = {}
+entry_points_loaded = False
+
+instances = {}
+# type -> backend instance for types whose backend doesn't depend on the content of the object
+dispatch_cache = weakref.WeakKeyDictionary()
+# type -> [(backend instance, supports all objects of the type)] for all other types
+candidate_cache = weakref.WeakKeyDictionary()
+lock = threading.RLock()
+
+
+def clear_caches():
+	dispatch_cache.clear()
+	candidate_cache.clear()
+
+
+def iter_entry_points():
 	try:
-		from phylter.backends.django_backend import DjangoBackend
-		backends.append(DjangoBackend)
+		from importlib.metadata import entry_points
 	except ImportError:
-		pass
+		try:
+			import pkg_resources
+		except ImportError:
+			return []
+		return list(pkg_resources.iter_entry_points(ENTRY_POINT_GROUP))
+
+	eps = entry_points()
+	if hasattr(eps, 'select'):
+		return list(eps.select(group=ENTRY_POINT_GROUP))
+	return list(eps.get(ENTRY_POINT_GROUP, ()))
+
+
+def register_backend(backend):
+	with lock:
+		if backend in backends:
+			return
+
+		index = len(backends)
+		for i, b in enumerate(backends):
+			if b.__name__ in fallback_backends and b in builtin_positions:
+				index = i
+				break
+		backends.insert(index, backend)
+		clear_caches()
+
+
+def insert_builtin(backend, position):
+	builtin_positions[backend] = position
+
+	# in front of the first loaded built-in backend which comes later in builtin_backends
+	index = len(backends)
+	for i, b in enumerate(backends):
+		if builtin_positions.get(b, -1) > position:
+			index = i
+			break
+	backends.insert(index, backend)
+
+
+def load_backends():
+	global entry_points_loaded
 
-	backends.append(ObjectsBackend)
+	with lock:
+		for spec in list(pending):
+			module_name, class_name, requires = spec
+			if requires is not None and requires not in sys.modules:
+				continue
+
+			pending.remove(spec)
+			try:
+				backend = getattr(importlib.import_module(module_name), class_name)
+			except ImportError:
+				continue
+			insert_builtin(backend, builtin_backends.index(spec))
+			clear_caches()
+
+		if not entry_points_loaded:
+			entry_points_loaded = True
+			for entry_point in iter_entry_points():
+				try:
+					register_backend(entry_point.load())
+				except ImportError:
+					pass
+
+
+def get_backends():
+	# backends whose requirement has been imported in the meantime are loaded on the next call
+	for _, _, requires in pending:
+		if requires is None or requires in sys.modules:
+			load_backends()
+			break
+	else:
+		if not entry_points_loaded:
+			load_backends()
+	return backends
+
+
+def get_instance(backend):
+	# backends are stateless; get_backend hands out a single shared instance per class
+	try:
+		return instances[backend]
+	except KeyError:
+		return instances.setdefault(backend, backend())
+
+
+def get_candidates(t, loaded):
+	# the backends which may support objects of type t, up to the first which supports all of them
+	candidates = []
+	for b in loaded:
+		supported = b.supports_type(t)
+		if supported is False:
+			continue
+
+		candidates.append((get_instance(b), supported is True))
+		if supported is True:
+			break
+	return candidates
 
 
 def get_backend(o):
-	for b in backends:
-		if b.supports(o):
-			return b()
+	loaded = get_backends()
+
+	t = type(o)
+	try:
+		return dispatch_cache[t]
+	except KeyError:
+		pass
+
+	try:
+		candidates = candidate_cache[t]
+	except KeyError:
+		candidates = get_candidates(t, loaded)
+		if candidates and candidates[0][1]:
+			dispatch_cache[t] = candidates[0][0]
+		else:
+			candidate_cache[t] = candidates
 
+	for instance, supported in candidates:
+		if supported or instance.supports(o):
+			return instance
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from phylter.backends.base import Backend
+from phylter.backends.mapping import MappingBackend
+from phylter.backends.objects import ObjectsBackend
+
+try:
+	from phylter.backends.django_backend import DjangoBackend
+except ImportError:  # pragma: nocover
+	DjangoBackend = None
+
+
+async def empty():
+	return
+	yield
+
+
+class AsyncBackend(Backend):
+
+	def __init__(self, backend=None, batch_size=None):
+		# the backend used to evaluate single items, picked based on the first item if not set
+		if isinstance(backend, type):
+			backend = backend()
+		self.backend = backend
+		self.batch_size = batch_size
+
+	@staticmethod
+	def supports(o):
+		return hasattr(o, '__aiter__')
+
+	def apply(self, query, iterable):
+		if self.batch_size:
+			return self.apply_batches(query, iterable)
+		return self.apply_items(query, iterable)
+
+	def empty(self, iterable):
+		return empty()
+
+	def get_item_backend(self, item):
+		if self.backend is not None:
+			return self.backend
+
+		if MappingBackend.supports([item]):
+			return MappingBackend()
+		return ObjectsBackend()
+
+	async def apply_items(self, query, iterable):
+		predicate = None
+
+		async for item in iterable:
+			if predicate is None:
+				predicate = query.compile(self.get_item_backend(item))
+
+			if predicate(item):
+				yield item
+
+	async def apply_batches(self, query, iterable):
+		predicate = None
+		batch = []
+
+		async for item in iterable:
+			if predicate is None:
+				predicate = query.compile(self.get_item_backend(item))
+
+			if predicate(item):
+				batch.append(item)
+
+				if len(batch) >= self.batch_size:
+					yield batch
+					batch = []
+
+		if batch:
+			yield batch
+
+
+if DjangoBackend is not None:
+	class AsyncDjangoBackend(DjangoBackend):
+
+		def apply(self, query, iterable):
+			return self.iterate(super(AsyncDjangoBackend, self).apply(query, iterable))
+
+		def empty(self, iterable):
+			return self.iterate(iterable.none())
+
+		async def iterate(self, queryset):
+			if hasattr(queryset, '__aiter__'):
+				async for o in queryset:
+					yield o
+			else:  # pragma: nocover
+				# Django < 4.1 has no asynchronous iteration, so the query is run in a thread
+				from asgiref.sync import sync_to_async
+
+				for o in await sync_to_async(list)(queryset):
+					yield o
+else:  # pragma: nocover
+	AsyncDjangoBackend = None
+
+
+def get_async_backend(o, backend=None, batch_size=None):
+	if backend is None and AsyncDjangoBackend is not None and AsyncDjangoBackend.supports(o):
+		return AsyncDjangoBackend()
+
+	return AsyncBackend(backend, batch_size)
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
+import itertools
 import re
 import sys
 
+from phylter.conditions import membership_conditions
+
 number_re = re.compile("^-?\d+(\.\d+)?$")
 
 def digit_or_float(s):
@@ -19,9 +22,45 @@ class Backend(object):
 	def supports(o):  # pragma: nocover
 		raise NotImplementedError
 
+	@classmethod
+	def supports_type(cls, t):
+		# True or False if supports() only depends on the type of the object, None if it has to be asked
+		return None
+
 	def apply(self, query, iterable):  # pragma: nocover
 		raise NotImplementedError
 
+	def empty(self, iterable):
+		return iter(())
+
+	# terminal operations. Backends override them if they can stop early or let the data source do the work
+	def limit(self, query, iterable, n):
+		return itertools.islice(self.apply(query, iterable), n)
+
+	def first(self, query, iterable):
+		for item in self.limit(query, iterable, 1):
+			return item
+		return None
+
+	def exists(self, query, iterable):
+		for _ in self.limit(query, iterable, 1):
+			return True
+		return False
+
+	def count(self, query, iterable):
+		return sum(1 for _ in self.apply(query, iterable))
+
+	def mask(self, query, iterable):  # pragma: nocover
+		raise NotImplementedError("%s does not support boolean masks" % self.__class__.__name__)
+
+	def get_value(self, condition, field_type=None):
+		# the values of conditions parsed with a schema already have the type of their field
+		if condition.typed:
+			return condition.right
+		if isinstance(condition, membership_conditions):
+			return tuple(self.get_compatible_value(x, field_type) for x in condition.right)
+		return self.get_compatible_value(condition.right, field_type)
+
 	def get_compatible_value(self, value, field_type=None):
 		if value is None:
 			return None
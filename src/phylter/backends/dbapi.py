@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+from phylter.backends.base import Backend
+from phylter.cache import ParseCache
+from phylter.conditions import Condition, EqualsCondition, GreaterThanCondition, GreaterThanOrEqualCondition, \
+	LessThanCondition, LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup, Operator, InCondition, NotInCondition, \
+	membership_conditions
+
+placeholders = {
+	'qmark': lambda i: '?',
+	'format': lambda i: '%s',
+	'numeric': lambda i: ':%s' % (i + 1),
+	'named': lambda i: ':p%s' % i,
+	'pyformat': lambda i: '%%(p%s)s' % i,
+}
+
+
+def quote_identifier(name):
+	return '"%s"' % name.replace('"', '""')
+
+
+class SQLTable(object):
+
+	def __init__(self, connection, table, fields, columns=None, paramstyle='qmark', batch_size=1000, cache_size=128):
+		if paramstyle not in placeholders:
+			raise ValueError("Unsupported paramstyle '%s'" % paramstyle)
+
+		self.connection = connection
+		self.table = table
+		# maps the field names usable in queries to column names; all other fields are rejected
+		self.fields = dict(fields) if isinstance(fields, dict) else dict((f, f) for f in fields)
+		self.columns = columns
+		self.paramstyle = paramstyle
+		self.batch_size = batch_size
+		self.sql_cache = ParseCache(cache_size)
+
+
+class SQLBackend(Backend):
+
+	operators = {
+		EqualsCondition: "=",
+		GreaterThanCondition: ">",
+		GreaterThanOrEqualCondition: ">=",
+		LessThanCondition: "<",
+		LessThanOrEqualCondition: "<=",
+		InCondition: "IN",
+		NotInCondition: "NOT IN",
+	}
+
+	@staticmethod
+	def supports(o):
+		return isinstance(o, SQLTable)
+
+	@classmethod
+	def supports_type(cls, t):
+		return issubclass(t, SQLTable)
+
+	def apply(self, query, table):
+		return self.fetch(table, *self.to_sql(query, table))
+
+	def limit(self, query, table, n):
+		return self.fetch(table, *self.to_sql(query, table, limit=n))
+
+	def exists(self, query, table):
+		return self.fetch_value(table, *self.to_sql(query, table, select="1", limit=1)) is not None
+
+	def count(self, query, table):
+		return self.fetch_value(table, *self.to_sql(query, table, select="COUNT(*)"))
+
+	def fetch(self, table, sql, params):
+		cursor = table.connection.cursor()
+		try:
+			cursor.execute(sql, params)
+
+			while True:
+				rows = cursor.fetchmany(table.batch_size)
+				if not rows:
+					break
+
+				for row in rows:
+					yield row
+		finally:
+			cursor.close()
+
+	def fetch_value(self, table, sql, params):
+		cursor = table.connection.cursor()
+		try:
+			cursor.execute(sql, params)
+			row = cursor.fetchone()
+			return row[0] if row is not None else None
+		finally:
+			cursor.close()
+
+	def to_sql(self, query, table, select=None, limit=None):
+		key = tuple(query.query), select, limit
+		cached = table.sql_cache.get(key)
+		if cached is not None:
+			return cached
+
+		values = []
+		where = " AND ".join(self.to_where(x, table, values) for x in query.query)
+
+		if select is None:
+			select = ", ".join(quote_identifier(c) for c in table.columns) if table.columns else "*"
+		sql = "SELECT %s FROM %s" % (select, quote_identifier(table.table))
+		if where:
+			sql += " WHERE %s" % where
+		if limit is not None:
+			sql += " LIMIT %d" % limit
+
+		if table.paramstyle in ('named', 'pyformat'):
+			params = dict(("p%s" % i, v) for i, v in enumerate(values))
+		else:
+			params = tuple(values)
+
+		table.sql_cache.put(key, (sql, params))
+		return sql, params
+
+	def to_where(self, obj, table, values):
+		if isinstance(obj, Condition):
+			return "%s %s %s" % (self.get_column(obj.left, table), self.operators[obj.__class__],
+								 self.add_value(obj, table, values))
+
+		if isinstance(obj, ConditionGroup):
+			return self.to_where(obj.item, table, values)
+
+		if isinstance(obj, Operator):
+			if isinstance(obj, AndOperator):
+				joiner = " AND "
+			elif isinstance(obj, OrOperator):
+				joiner = " OR "
+			else:
+				raise Exception("Unexpected item found in query: %s" % obj)
+
+			return "(%s)" % joiner.join(self.to_where(x, table, values) for x in obj.operands)
+
+		raise Exception("Unexpected item found in query: %s" % obj)
+
+	def get_column(self, field, table):
+		try:
+			return quote_identifier(table.fields[field])
+		except KeyError:
+			raise ValueError("Unknown field '%s'" % field)
+
+	def add_value(self, condition, table, values):
+		if isinstance(condition, membership_conditions):
+			# one placeholder per value: col IN (?, ?, ...)
+			return "(%s)" % ", ".join(self.add_placeholder(x, condition.typed, table, values) for x in condition.right)
+		return self.add_placeholder(condition.right, condition.typed, table, values)
+
+	def add_placeholder(self, value, typed, table, values):
+		placeholder = placeholders[table.paramstyle](len(values))
+		values.append(value if typed else self.get_sql_value(value))
+		return placeholder
+
+	def get_sql_value(self, value):
+		# untyped literals are bound as strings (without quotes) and the database converts them to the type of the
+		# column, so 01234 still matches a text column. A schema binds typed values instead
+		return self.get_compatible_value(value)
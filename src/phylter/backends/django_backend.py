@@ -5,7 +5,7 @@ from django.db.models.query import QuerySet
 
 from phylter.backends.base import Backend
 from phylter.conditions import Condition, EqualsCondition, GreaterThanCondition, GreaterThanOrEqualCondition, \
-	LessThanCondition, LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup, Operator
+	LessThanCondition, LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup, Operator, InCondition, NotInCondition
 
 
 class DjangoBackend(Backend):
@@ -14,17 +14,48 @@ class DjangoBackend(Backend):
 	def supports(o):
 		return isinstance(o, QuerySet) or isinstance(o, Manager)
 
+	@classmethod
+	def supports_type(cls, t):
+		return issubclass(t, (QuerySet, Manager))
+
 	def apply(self, query, iterable):
-		django_query = iterable if isinstance(iterable, QuerySet) else iterable.all()
+		django_query = self.get_queryset(iterable)
+
+		items = list(query.query)
+		if not items:
+			return django_query
+
+		# a single filter() call with all conditions
+		return self.apply_django_filter(django_query, items[0] if len(items) == 1 else AndOperator(*items))
+
+	def empty(self, iterable):
+		return iterable.none()
 
-		for o in query.query:
-			django_query = self.apply_django_filter(django_query, o)
+	def get_queryset(self, iterable):
+		return iterable if isinstance(iterable, QuerySet) else iterable.all()
 
-		return django_query
+	def limit(self, query, iterable, n):
+		return self.apply(query, iterable)[:n]
+
+	def first(self, query, iterable):
+		# unlike QuerySet.first() this doesn't add an ordering to unordered querysets
+		for item in self.limit(query, iterable, 1):
+			return item
+		return None
+
+	def exists(self, query, iterable):
+		return self.apply(query, iterable).exists()
+
+	def count(self, query, iterable):
+		return self.apply(query, iterable).count()
 
 	def apply_django_filter(self, django_query, obj):
 		return django_query.filter(self.to_q(obj))
 
+	def get_lookup(self, field):
+		# user.address.city spans relations like user__address__city
+		return field.replace('.', '__')
+
 	def to_q(self, obj):
 		if isinstance(obj, Condition):
 			suffix = {
@@ -33,19 +64,70 @@ class DjangoBackend(Backend):
 				GreaterThanOrEqualCondition: "__gte",
 				LessThanCondition: "__lt",
 				LessThanOrEqualCondition: "__lte",
+				InCondition: "__in",
+				NotInCondition: "__in",
 			}[obj.__class__]
 
-			f = "%s%s" % (obj.left, suffix)
-			return Q(**{f: self.get_compatible_value(obj.right)})
+			f = "%s%s" % (self.get_lookup(obj.left), suffix)
+			if isinstance(obj, NotInCondition):
+				# Django's negation matches NULL for nullable fields, SQL's NOT IN doesn't
+				return Q(**{"%s__isnull" % self.get_lookup(obj.left): False}) & ~Q(**{f: self.get_value(obj)})
+			return Q(**{f: self.get_value(obj)})
 
 		if isinstance(obj, ConditionGroup):
 			return Q(self.to_q(obj.item))
 
 		if isinstance(obj, Operator):
+			# build a single Q object with all operands as children instead of a deeply nested Q chain
 			if isinstance(obj, AndOperator):
-				return Q(self.to_q(obj.left), self.to_q(obj.right))
+				return Q(*self.collapse_ranges(obj.operands))
 
 			if isinstance(obj, OrOperator):
-				return Q(self.to_q(obj.left)) | Q(self.to_q(obj.right))
+				q = Q(*self.collapse_equals(obj.operands))
+				q.connector = Q.OR
+				return q
 
 		raise Exception("Unexpected item found in query: %s" % obj)
+
+	def collapse_equals(self, operands):
+		# field == a or field == b or ... becomes field__in=[a, b, ...]
+		values = {}
+		for x in operands:
+			if isinstance(x, EqualsCondition):
+				values.setdefault(x.left, []).append(self.get_value(x))
+
+		children = []
+		collapsed = set()
+		for x in operands:
+			if isinstance(x, EqualsCondition) and len(values[x.left]) > 1:
+				if x.left not in collapsed:
+					collapsed.add(x.left)
+					children.append(Q(**{"%s__in" % self.get_lookup(x.left): values[x.left]}))
+				continue
+
+			children.append(self.to_q(x))
+		return children
+
+	def collapse_ranges(self, operands):
+		# field >= a and field <= b becomes field__range=(a, b)
+		lower = {}
+		upper = {}
+		for x in operands:
+			if isinstance(x, GreaterThanOrEqualCondition):
+				lower.setdefault(x.left, x)
+			elif isinstance(x, LessThanOrEqualCondition):
+				upper.setdefault(x.left, x)
+
+		children = []
+		for x in operands:
+			if isinstance(x, Condition) and x.left in lower and x.left in upper:
+				if x is lower[x.left]:
+					value_range = (self.get_value(x), self.get_value(upper[x.left]))
+					children.append(Q(**{"%s__range" % self.get_lookup(x.left): value_range}))
+					continue
+
+				if x is upper[x.left]:
+					continue
+
+			children.append(self.to_q(x))
+		return children
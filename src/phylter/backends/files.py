@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+import mmap
+import os
+import string
+
+from phylter.backends.base import Backend, digit_or_float, str_types
+from phylter.backends.mapping import MappingBackend
+from phylter.conditions import Condition, ConditionGroup, EqualsCondition, AndOperator, OrOperator, InCondition
+from phylter.schema import Schema, coercers, text_types
+
+# characters which appear verbatim in JSON and CSV encoded strings
+safe_characters = frozenset(string.ascii_letters + string.digits + " !#$%&'()*+,-.:;<=>?@[]^_`{|}~")
+
+
+class LinesFile(object):
+
+	def __init__(self, path, raw=False, encoding='utf-8'):
+		self.path = path
+		# yield the (start, end) byte offsets of the matching lines instead of the decoded records
+		self.raw = raw
+		self.encoding = encoding
+
+	def get_header_end(self, mm):
+		return 0
+
+	def decode(self, line):  # pragma: nocover
+		raise NotImplementedError
+
+
+class JSONLinesFile(LinesFile):
+
+	def decode(self, line):
+		return json.loads(line.decode(self.encoding))
+
+
+class CSVFile(LinesFile):
+
+	def __init__(self, path, raw=False, encoding='utf-8', delimiter=',', fieldnames=None, converters=None):
+		super(CSVFile, self).__init__(path, raw, encoding)
+		self.delimiter = delimiter
+		# read from the first line of the file (on every pass over it) if not set
+		self.fieldnames = fieldnames
+		# the field names used to decode the records
+		self.columns = fieldnames
+		# field name -> callable converting the string of a cell, or a Schema. Other fields are kept as strings
+		if isinstance(converters, Schema):
+			converters = dict((field, coercers.get(t, t)) for field, t in converters.fields.items()
+							  if t is not None and t not in text_types)
+		self.converters = dict(converters or {})
+
+	def get_header_end(self, mm):
+		if self.fieldnames is not None:
+			return 0
+
+		end = mm.find(b'\n')
+		if end == -1:
+			end = len(mm)
+		self.columns = self.parse(mm[:end])
+		return end + 1
+
+	def parse(self, line):
+		return next(csv.reader([line.decode(self.encoding).rstrip('\r')], delimiter=self.delimiter))
+
+	def decode(self, line):
+		record = dict(zip(self.columns, self.parse(line)))
+		for field, convert in self.converters.items():
+			value = record.get(field)
+			if value is not None:
+				# empty cells are missing values
+				record[field] = convert(value) if value else None
+		return record
+
+
+def get_needle(condition, value=None):
+	if value is None:
+		value = condition.right
+	if not isinstance(value, str_types):
+		return None
+
+	if not condition.typed:
+		if digit_or_float(value):
+			return None
+
+		if len(value) > 1 and value[0] in ("'", '"') and value[0] == value[-1]:
+			value = value[1:-1]
+
+	if not value or not all(c in safe_characters for c in value):
+		return None
+	return value
+
+
+class FileBackend(Backend):
+
+	@staticmethod
+	def supports(o):
+		return isinstance(o, LinesFile)
+
+	@classmethod
+	def supports_type(cls, t):
+		return issubclass(t, LinesFile)
+
+	def get_needles(self, obj):
+		# returns a list of clauses; every matching line contains at least one needle of every clause
+		if isinstance(obj, EqualsCondition):
+			needle = get_needle(obj)
+			return [(needle, )] if needle is not None else []
+
+		if isinstance(obj, InCondition):
+			# a matching line contains one of the values, like field == a or field == b
+			needles = [get_needle(obj, x) for x in obj.right]
+			if not needles or None in needles:
+				return []
+			return [tuple(sorted(set(needles)))]
+
+		if isinstance(obj, ConditionGroup):
+			return self.get_needles(obj.item)
+
+		if isinstance(obj, AndOperator):
+			return [clause for x in obj.operands for clause in self.get_needles(x)]
+
+		if isinstance(obj, OrOperator):
+			needles = set()
+			for x in obj.operands:
+				clauses = self.get_needles(x)
+				if not clauses:
+					return []
+				needles.update(min(clauses, key=len))
+			return [tuple(sorted(needles))]
+
+		return []
+
+	def apply(self, query, source):
+		clauses = [clause for x in query.query for clause in self.get_needles(x)]
+		clauses = [tuple(n.encode(source.encoding) for n in clause) for clause in clauses]
+		predicate = query.compile(MappingBackend())
+
+		with open(source.path, 'rb') as f:
+			if not os.fstat(f.fileno()).st_size:
+				return
+
+			mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			try:
+				for start, end in self.candidates(mm, source.get_header_end(mm), clauses):
+					line = mm[start:end]
+					if not line.strip():
+						continue
+
+					record = source.decode(line)
+					if predicate(record):
+						yield (start, end) if source.raw else record
+			finally:
+				mm.close()
+
+	def candidates(self, mm, pos, clauses):
+		size = len(mm)
+		single = [clause[0] for clause in clauses if len(clause) == 1]
+
+		if single:
+			# jump from one occurrence of the longest required needle to the next one instead of
+			# looking at every line
+			needle = max(single, key=len)
+			while pos < size:
+				found = mm.find(needle, pos)
+				if found == -1:
+					return
+
+				start = mm.rfind(b'\n', pos, found) + 1 or pos
+				end = mm.find(b'\n', found)
+				if end == -1:
+					end = size
+
+				if self.contains(mm, start, end, clauses):
+					yield start, end
+				pos = end + 1
+			return
+
+		while pos < size:
+			end = mm.find(b'\n', pos)
+			if end == -1:
+				end = size
+
+			if self.contains(mm, pos, end, clauses):
+				yield pos, end
+			pos = end + 1
+
+	def contains(self, mm, start, end, clauses):
+		for clause in clauses:
+			for needle in clause:
+				if mm.find(needle, start, end) != -1:
+					break
+			else:
+				return False
+		return True
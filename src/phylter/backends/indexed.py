@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+from phylter.backends.base import Backend
+from phylter.backends.objects import ObjectsBackend
+from phylter.conditions import Condition, ConditionGroup, AndOperator, OrOperator, EqualsCondition, \
+	GreaterThanCondition, GreaterThanOrEqualCondition, LessThanCondition, LessThanOrEqualCondition, InCondition
+
+
+class HashIndex(object):
+
+	def __init__(self):
+		self.values = {}
+		# literals are coerced to the type of the indexed values, so the index has to know all of them
+		self.types = {}
+
+	def add(self, value, key):
+		self.values.setdefault(value, set()).add(key)
+		value_type = type(value)
+		self.types[value_type] = self.types.get(value_type, 0) + 1
+
+	def extend(self, pairs):
+		for value, key in pairs:
+			self.add(value, key)
+
+	def remove(self, value, key):
+		keys = self.values[value]
+		keys.discard(key)
+		if not keys:
+			del self.values[value]
+
+		value_type = type(value)
+		self.types[value_type] -= 1
+		if not self.types[value_type]:
+			del self.types[value_type]
+
+	def lookup(self, condition, coerce):
+		if isinstance(condition, EqualsCondition):
+			literals = (condition.right, )
+		elif isinstance(condition, InCondition):
+			literals = condition.right
+		else:
+			return None
+
+		result = set()
+		for value_type in self.types:
+			for literal in literals:
+				result.update(self.values.get(coerce(literal, value_type), ()))
+		return result
+
+
+def is_orderable(value):
+	try:
+		value < value
+	except TypeError:
+		return False
+	# NaN isn't equal to itself and would break the order of the sorted list
+	return value == value
+
+
+class SortedIndex(object):
+
+	def __init__(self):
+		# one sorted list of values (and a parallel list of keys) per value type
+		self.values = {}
+		# key -> value for values like None which can't be sorted; range conditions never match them
+		self.unordered = {}
+
+	def add(self, value, key):
+		if not is_orderable(value):
+			self.unordered[key] = value
+			return
+
+		values, keys = self.values.setdefault(type(value), ([], []))
+		pos = bisect_right(values, value)
+		values.insert(pos, value)
+		keys.insert(pos, key)
+
+	def extend(self, pairs):
+		# sorting all (value, key) pairs at once; inserting them one by one makes building an index quadratic
+		new = {}
+		for value, key in pairs:
+			if value is None or value != value:
+				self.unordered[key] = value
+			else:
+				new.setdefault(type(value), []).append((value, key))
+
+		for value_type, added in new.items():
+			if not is_orderable(added[0][0]):
+				self.unordered.update((key, value) for value, key in added)
+				continue
+
+			values, keys = self.values.get(value_type, ((), ()))
+			# the sort is stable, so equal values keep the order add() would give them
+			merged = list(zip(values, keys))
+			merged.extend(added)
+			merged.sort(key=itemgetter(0))
+			self.values[value_type] = list(map(itemgetter(0), merged)), list(map(itemgetter(1), merged))
+
+	def remove(self, value, key):
+		if not is_orderable(value):
+			del self.unordered[key]
+			return
+
+		values, keys = self.values[type(value)]
+		pos = bisect_left(values, value)
+		end = bisect_right(values, value)
+		pos += keys[pos:end].index(key)
+		del values[pos]
+		del keys[pos]
+
+		if not values:
+			del self.values[type(value)]
+
+	def lookup(self, condition, coerce):
+		result = set()
+
+		if self.unordered and isinstance(condition, (EqualsCondition, InCondition)):
+			literals = condition.right if isinstance(condition, InCondition) else (condition.right, )
+			for key, value in self.unordered.items():
+				if any(value == coerce(literal, type(value)) for literal in literals):
+					result.add(key)
+
+		for value_type, (values, keys) in self.values.items():
+			if isinstance(condition, InCondition):
+				try:
+					for literal in condition.right:
+						value = coerce(literal, value_type)
+						result.update(keys[bisect_left(values, value):bisect_right(values, value)])
+				except TypeError:
+					return None
+				continue
+
+			value = coerce(condition.right, value_type)
+
+			try:
+				if isinstance(condition, EqualsCondition):
+					result.update(keys[bisect_left(values, value):bisect_right(values, value)])
+				elif isinstance(condition, GreaterThanCondition):
+					result.update(keys[bisect_right(values, value):])
+				elif isinstance(condition, GreaterThanOrEqualCondition):
+					result.update(keys[bisect_left(values, value):])
+				elif isinstance(condition, LessThanCondition):
+					result.update(keys[:bisect_left(values, value)])
+				elif isinstance(condition, LessThanOrEqualCondition):
+					result.update(keys[:bisect_right(values, value)])
+				else:
+					return None
+			except TypeError:
+				# the literal isn't comparable with the indexed values; let the scan handle (and report) it
+				return None
+
+		return result
+
+
+class IndexedCollection(object):
+
+	def __init__(self, items=(), hash_indexes=(), sorted_indexes=(), backend=None):
+		if isinstance(backend, type):
+			backend = backend()
+		self.backend = backend or ObjectsBackend()
+
+		self.indexes = {}
+		for field in hash_indexes:
+			self.indexes.setdefault(field, []).append(HashIndex())
+		for field in sorted_indexes:
+			self.indexes.setdefault(field, []).append(SortedIndex())
+		self.accessors = dict((field, self.backend.get_accessor(field)) for field in self.indexes)
+		# (field, position in the indexed values, indexes of the field)
+		self.fields = [(field, i, indexes) for i, (field, indexes) in enumerate(self.indexes.items())]
+
+		self.items = {}
+		# key -> tuple of the field values as they were indexed; the item may have been changed since then
+		self.indexed_values = {}
+		self._identities = {}
+		self._next_key = 0
+
+		self.extend(items)
+
+	def add(self, item):
+		key = self._next_key
+		self._next_key += 1
+
+		values = self.indexed_values[key] = self.get_indexed_values(item)
+		for field, i, indexes in self.fields:
+			for index in indexes:
+				index.add(values[i], key)
+
+		self.items[key] = item
+		self._identities.setdefault(id(item), []).append(key)
+		return key
+
+	def extend(self, items):
+		keys = []
+		for item in items:
+			key = self._next_key
+			self._next_key += 1
+			self.items[key] = item
+			self._identities.setdefault(id(item), []).append(key)
+			keys.append(key)
+
+		indexed_values = self.indexed_values
+		for key in keys:
+			indexed_values[key] = self.get_indexed_values(self.items[key])
+
+		for field, i, indexes in self.fields:
+			pairs = [(indexed_values[key][i], key) for key in keys]
+			for index in indexes:
+				index.extend(pairs)
+		return keys
+
+	def get_indexed_values(self, item):
+		accessors = self.accessors
+		return tuple(accessors[field](item) for field, _, _ in self.fields)
+
+	def update(self, item):
+		# re-indexes an item after its indexed fields have been changed
+		keys = self._identities.get(id(item))
+		if not keys:
+			raise ValueError("Item not in collection")
+
+		values = self.get_indexed_values(item)
+		for key in keys:
+			old = self.indexed_values[key]
+			for field, i, indexes in self.fields:
+				# 1 and True are equal, but indexed by type
+				if type(old[i]) is type(values[i]) and old[i] == values[i]:
+					continue
+				for index in indexes:
+					index.remove(old[i], key)
+					index.add(values[i], key)
+			self.indexed_values[key] = values
+
+	def remove(self, item):
+		keys = self._identities.get(id(item))
+		if not keys:
+			raise ValueError("Item not in collection")
+
+		key = keys.pop()
+		if not keys:
+			del self._identities[id(item)]
+
+		values = self.indexed_values.pop(key)
+		for field, i, indexes in self.fields:
+			for index in indexes:
+				index.remove(values[i], key)
+
+		del self.items[key]
+
+	def __len__(self):
+		return len(self.items)
+
+	def __iter__(self):
+		items = self.items
+		return (items[key] for key in sorted(items))
+
+	def candidates(self, obj):
+		if isinstance(obj, Condition):
+			if obj.typed:
+				coerce = lambda value, value_type: value
+			else:
+				coerce = self.backend.get_compatible_value
+			for index in self.indexes.get(obj.left, ()):
+				keys = index.lookup(obj, coerce)
+				if keys is not None:
+					return keys
+			return None
+
+		if isinstance(obj, ConditionGroup):
+			return self.candidates(obj.item)
+
+		if isinstance(obj, AndOperator):
+			return self._intersect(obj.operands)
+
+		if isinstance(obj, OrOperator):
+			result = set()
+			for x in obj.operands:
+				keys = self.candidates(x)
+				if keys is None:
+					return None
+				result |= keys
+			return result
+
+		raise Exception("Unexpected item found in query: %s" % obj)
+
+	def _intersect(self, operands):
+		candidates = [keys for keys in (self.candidates(x) for x in operands) if keys is not None]
+		if not candidates:
+			return None
+
+		candidates.sort(key=len)
+		result = set(candidates[0])
+		for keys in candidates[1:]:
+			result &= keys
+		return result
+
+	def filter(self, query):
+		predicate = query.compile(self.backend)
+		keys = self._intersect(query.query)
+
+		if keys is None:
+			# nothing is indexed, fall back to a full scan
+			candidates = iter(self)
+		else:
+			items = self.items
+			candidates = (items[key] for key in sorted(keys))
+
+		# the candidates are a superset of the matches, so all conditions are checked again
+		for item in candidates:
+			if predicate(item):
+				yield item
+
+
+class IndexedBackend(Backend):
+
+	@staticmethod
+	def supports(o):
+		return isinstance(o, IndexedCollection)
+
+	@classmethod
+	def supports_type(cls, t):
+		return issubclass(t, IndexedCollection)
+
+	def apply(self, query, collection):
+		return collection.filter(query)
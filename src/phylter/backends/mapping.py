@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import copy
+import itertools
+import operator
+
+try:
+	from collections.abc import Mapping
+except ImportError:  # pragma: nocover
+	from collections import Mapping
+
+from phylter.backends.objects import ObjectsBackend, chain
+
+
+def is_namedtuple(o):
+	return isinstance(o, tuple) and hasattr(o, '_fields')
+
+
+class MappingBackend(ObjectsBackend):
+
+	def __init__(self, fields=None, **kwargs):
+		super(MappingBackend, self).__init__(**kwargs)
+		# field names of the namedtuple rows, or None for mappings
+		self.fields = tuple(fields) if fields is not None else None
+
+	@staticmethod
+	def supports(o):
+		if isinstance(o, (list, tuple)) and o:
+			first = o[0]
+			return isinstance(first, Mapping) or is_namedtuple(first)
+		return False
+
+	@classmethod
+	def supports_type(cls, t):
+		return None if issubclass(t, (list, tuple)) else False
+
+	@property
+	def compile_key(self):
+		key = super(MappingBackend, self).compile_key
+		if key is None:
+			return None
+		return key, self.fields
+
+	def get_accessor(self, field):
+		if '.' in field:
+			first, rest = field.split('.', 1)
+			if self.fields is None:
+				# nested mappings
+				return chain([operator.itemgetter(first)] + [operator.itemgetter(x) for x in rest.split('.')])
+			# the attributes of nested namedtuples (or objects)
+			return chain([self.get_accessor(first), operator.attrgetter(rest)])
+
+		if self.fields is None:
+			return operator.itemgetter(field)
+
+		if field in self.fields:
+			return operator.itemgetter(self.fields.index(field))
+
+		return operator.attrgetter(field)
+
+	def apply(self, query, iterable):
+		iterator = iter(iterable)
+		try:
+			first = next(iterator)
+		except StopIteration:
+			return
+
+		backend = self
+		if self.fields is None and is_namedtuple(first):
+			backend = copy.copy(self)
+			backend.fields = type(first)._fields
+
+		predicate = query.compile(backend)
+
+		for item in itertools.chain((first, ), iterator):
+			if predicate(item):
+				yield item
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+import operator
+
+import numpy
+
+from phylter.backends.base import Backend, str_types
+from phylter.conditions import Condition, EqualsCondition, GreaterThanCondition, GreaterThanOrEqualCondition, \
+	LessThanCondition, LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup, Operator, InCondition, NotInCondition, \
+	membership_conditions
+
+true_values = ('true', '1', 'yes')
+false_values = ('false', '0', 'no')
+
+
+def is_in(column, values):
+	return numpy.isin(column, values)
+
+
+def is_missing(column):
+	kind = column.dtype.kind
+	if kind in 'fc':
+		return numpy.isnan(column)
+	if kind in 'mM':
+		return numpy.isnat(column)
+	if kind == 'O':
+		return numpy.frompyfunc(lambda x: x is None or x != x, 1, 1)(column).astype(bool)
+	return numpy.zeros(len(column), dtype=bool)
+
+
+def not_in(column, values):
+	# like SQL's NOT IN, missing values never match
+	mask = numpy.isin(column, values, invert=True)
+	mask &= ~is_missing(column)
+	return mask
+
+
+class NumpyBackend(Backend):
+
+	comparators = {
+		EqualsCondition: operator.eq,
+		GreaterThanCondition: operator.gt,
+		GreaterThanOrEqualCondition: operator.ge,
+		LessThanCondition: operator.lt,
+		LessThanOrEqualCondition: operator.le,
+		InCondition: is_in,
+		NotInCondition: not_in,
+	}
+
+	@staticmethod
+	def supports(o):
+		if isinstance(o, numpy.ndarray):
+			return o.dtype.names is not None
+
+		if isinstance(o, dict):
+			return len(o) > 0 and all(isinstance(v, numpy.ndarray) for v in o.values())
+
+		return False
+
+	@classmethod
+	def supports_type(cls, t):
+		return None if issubclass(t, (numpy.ndarray, dict)) else False
+
+	def apply(self, query, data):
+		return self.filter(data, self.mask(query, data))
+
+	def filter(self, data, mask):
+		if isinstance(data, dict):
+			return dict((k, v[mask]) for k, v in data.items())
+		return data[mask]
+
+	def get_row(self, data, index):
+		if isinstance(data, dict):
+			return dict((k, v[index]) for k, v in data.items())
+		return data[index]
+
+	def limit(self, query, data, n):
+		mask = self.mask(query, data)
+		mask[numpy.flatnonzero(mask)[n:]] = False
+		return self.filter(data, mask)
+
+	def first(self, query, data):
+		matches = numpy.flatnonzero(self.mask(query, data))
+		if not len(matches):
+			return None
+		return self.get_row(data, matches[0])
+
+	def exists(self, query, data):
+		return bool(self.mask(query, data).any())
+
+	def count(self, query, data):
+		return int(numpy.count_nonzero(self.mask(query, data)))
+
+	def get_column(self, data, field):
+		if isinstance(data, numpy.ndarray) and '.' in field and field not in data.dtype.names:
+			# nested structured dtypes
+			column = data
+			for part in field.split('.'):
+				column = column[part]
+			return column
+		return data[field]
+
+	def get_length(self, data):
+		if isinstance(data, dict):
+			return len(next(iter(data.values())))
+		return len(data)
+
+	def empty(self, data):
+		return self.filter(data, numpy.zeros(self.get_length(data), dtype=bool))
+
+	def mask(self, query, data):
+		length = self.get_length(data)
+
+		if query.empty:
+			return numpy.zeros(length, dtype=bool)
+
+		mask = None
+
+		for o in query.query:
+			m = self.to_mask(o, data, length)
+			if mask is None:
+				mask = m
+			else:
+				mask &= m
+
+		if mask is None:
+			return numpy.ones(length, dtype=bool)
+		return mask
+
+	def to_mask(self, obj, data, length):
+		if isinstance(obj, Condition):
+			column = self.get_column(data, obj.left)
+			get_value = self.get_typed_column_value if obj.typed else self.get_column_value
+			if isinstance(obj, membership_conditions):
+				value = [get_value(x, column) for x in obj.right]
+			else:
+				value = get_value(obj.right, column)
+			mask = self.compare(self.comparators[obj.__class__], column, value)
+
+			if mask.ndim == 0:
+				# incomparable types yield a single boolean instead of an array
+				mask = numpy.full(length, bool(mask), dtype=bool)
+			return mask
+
+		if isinstance(obj, ConditionGroup):
+			return self.to_mask(obj.item, data, length)
+
+		if isinstance(obj, Operator):
+			# the masks of the operands are freshly allocated arrays which can be combined in-place
+			mask = self.to_mask(obj.operands[0], data, length)
+
+			if isinstance(obj, AndOperator):
+				for x in obj.operands[1:]:
+					mask &= self.to_mask(x, data, length)
+				return mask
+
+			if isinstance(obj, OrOperator):
+				for x in obj.operands[1:]:
+					mask |= self.to_mask(x, data, length)
+				return mask
+
+		raise Exception("Unexpected item found in query: %s" % obj)
+
+	def compare(self, comparator, column, value):
+		return numpy.asarray(comparator(column, value))
+
+	def get_first_value(self, column):
+		# missing cells don't tell the type of the column
+		for value in column:
+			if value is not None:
+				return value
+		return None
+
+	def get_typed_column_value(self, value, column):
+		kind = column.dtype.kind
+
+		if kind == 'M':
+			return numpy.datetime64(value)
+
+		if kind == 'S' and not isinstance(value, bytes):
+			return value.encode('utf-8')
+
+		return value
+
+	def get_column_value(self, value, column):
+		kind = column.dtype.kind
+
+		if kind in 'iuf':
+			return self.get_compatible_value(value, float)
+
+		if kind == 'b':
+			s = self.get_compatible_value(value, str)
+			if isinstance(s, str_types) and s.lower() in true_values:
+				return True
+			if isinstance(s, str_types) and s.lower() in false_values:
+				return False
+			return s
+
+		if kind == 'U':
+			return self.get_compatible_value(value, str)
+
+		if kind == 'S':
+			s = self.get_compatible_value(value, str)
+			return s.encode('utf-8') if not isinstance(s, bytes) else s
+
+		if kind == 'M':
+			return numpy.datetime64(self.get_compatible_value(value, str))
+
+		if kind == 'O' and len(column):
+			first = self.get_first_value(column)
+			if first is not None:
+				return self.get_compatible_value(value, type(first))
+
+		return self.get_compatible_value(value)
@@ -1,45 +1,286 @@
 # -*- coding: utf-8 -*-
+import operator
+import time
+
 from phylter.backends.base import Backend
+from phylter.stats import is_coerced
 from phylter.conditions import Condition, OrOperator, AndOperator, EqualsCondition, \
 	GreaterThanOrEqualCondition, LessThanCondition, LessThanOrEqualCondition, GreaterThanCondition, ConditionGroup, \
-	Operator
+	InCondition, NotInCondition, membership_conditions
+
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def chain(getters):
+	# applies the getters one after another, e.g. for the parts of a dotted path
+	if len(getters) == 1:
+		return getters[0]
+
+	if len(getters) == 2:
+		first, second = getters
+		return lambda item: second(first(item))
+
+	def getter(item):
+		for g in getters:
+			item = g(item)
+		return item
+	return getter
+
+
+def is_in(value, values):
+	return value in values
+
+
+def not_in(value, values):
+	# like SQL's NOT IN, missing values (None and NaN) never match
+	return value is not None and value == value and value not in values
+
+
+def all_of(predicates):
+	if len(predicates) == 2:
+		left, right = predicates
+		return lambda item: left(item) and right(item)
+
+	def predicate(item):
+		for p in predicates:
+			if not p(item):
+				return False
+		return True
+
+	return predicate
+
+
+def any_of(predicates):
+	if len(predicates) == 2:
+		left, right = predicates
+		return lambda item: left(item) or right(item)
+
+	def predicate(item):
+		for p in predicates:
+			if p(item):
+				return True
+		return False
+
+	return predicate
+
+
+class AdaptiveOperator(object):
+
+	def __init__(self, predicates, conjunction, sample_size=1000, resample_interval=None):
+		self.predicates = list(predicates)
+		self.conjunction = conjunction
+		self.sample_size = sample_size
+		self.resample_interval = resample_interval
+		self.start_sampling()
+
+	def __call__(self, item):
+		return self.evaluate(item)
+
+	def start_sampling(self):
+		count = len(self.predicates)
+		self.samples = 0
+		self.passed = [0] * count
+		self.costs = [0.0] * count
+		self.evaluate = self.sample
+
+	def sample(self, item):
+		# evaluates all operands to measure their cost and pass rate, the result is the same as with short-circuiting
+		conjunction = self.conjunction
+		result = conjunction
+
+		for i, p in enumerate(self.predicates):
+			start = timer()
+			try:
+				passed = p(item)
+			except Exception:
+				if result == conjunction:
+					# short-circuiting would have evaluated this operand as well
+					raise
+				passed = False
+			self.costs[i] += timer() - start
+
+			if passed:
+				self.passed[i] += 1
+			if bool(passed) != conjunction:
+				result = not conjunction
+
+		self.samples += 1
+		if self.samples >= self.sample_size:
+			self.reorder()
+
+		return result
+
+	def rank(self, i):
+		# the expected cost per decided item: cheap operands which decide the result often come first
+		rate = float(self.passed[i]) / self.samples
+		decisive = (1 - rate) if self.conjunction else rate
+		if not decisive:
+			return float('inf')
+		return self.costs[i] / decisive
+
+	def reorder(self):
+		order = sorted(range(len(self.predicates)), key=self.rank)
+		self.predicates = [self.predicates[i] for i in order]
+
+		evaluate = (all_of if self.conjunction else any_of)(self.predicates)
+
+		if self.resample_interval:
+			remaining = [self.resample_interval]
+
+			def counting(item):
+				remaining[0] -= 1
+				if not remaining[0]:
+					self.start_sampling()
+				return evaluate(item)
+
+			self.evaluate = counting
+		else:
+			self.evaluate = evaluate
 
 
 class ObjectsBackend(Backend):
 
+	comparators = {
+		EqualsCondition: operator.eq,
+		GreaterThanCondition: operator.gt,
+		GreaterThanOrEqualCondition: operator.ge,
+		LessThanCondition: operator.lt,
+		LessThanOrEqualCondition: operator.le,
+		InCondition: is_in,
+		NotInCondition: not_in,
+	}
+
+	def __init__(self, adaptive=False, sample_size=1000, resample_interval=None, stats=None):
+		# adaptive mode measures the operands of and/or during the first items and reorders them afterwards
+		self.adaptive = adaptive
+		self.sample_size = sample_size
+		self.resample_interval = resample_interval
+		# a phylter.stats.QueryStats instance recording the evaluations of every node
+		self.stats = stats
+
 	@staticmethod
 	def supports(o):
 		return True
 
+	@classmethod
+	def supports_type(cls, t):
+		return True
+
+	@property
+	def compile_key(self):
+		if self.adaptive or self.stats is not None:
+			return None  # adaptive and instrumented predicates keep state and can't be shared
+		return self.__class__
+
 	def apply(self, query, iterable):
+		predicate = query.compile(self)
+
 		for item in iterable:
-			if self.matches(query, item):
+			if predicate(item):
 				yield item
 
 	def matches(self, query, item):
-		return all((self.eval_op(x, item) for x in query.query))
+		return query.compile(self)(item)
 
 	def eval_op(self, op, item):
-		if isinstance(op, Condition):
-			left_value = getattr(item, op.left)
-			right_value = self.get_compatible_value(op.right, type(left_value))
+		return self.compile_op(op)(item)
+
+	def get_accessor(self, field):
+		# attrgetter resolves dotted paths like user.address.city itself
+		return operator.attrgetter(field)
+
+	def compile(self, query):
+		if query.empty:
+			return lambda item: False
 
-			return {
-				EqualsCondition: lambda a, b: a == b,
-				GreaterThanCondition: lambda a, b: a > b,
-				GreaterThanOrEqualCondition: lambda a, b: a >= b,
-				LessThanCondition: lambda a, b: a < b,
-				LessThanOrEqualCondition: lambda a, b: a <= b,
-			}[op.__class__](left_value, right_value)
+		predicates = [self.compile_op(x) for x in query.query]
 
+		if len(predicates) == 1:
+			return predicates[0]
+
+		return self.compile_and(predicates)
+
+	def compile_op(self, op):
 		if isinstance(op, ConditionGroup):
-			return self.eval_op(op.item, item)
+			return self.compile_op(op.item)
+
+		if isinstance(op, Condition):
+			predicate = self.compile_condition(op)
+		elif isinstance(op, AndOperator):
+			predicate = self.compile_and([self.compile_op(x) for x in op.operands])
+		elif isinstance(op, OrOperator):
+			predicate = self.compile_or([self.compile_op(x) for x in op.operands])
+		else:
+			raise Exception("Unexpected item found in query: %s" % op)
+
+		if self.stats is not None:
+			predicate = self.stats.instrument(op, predicate)
+		return predicate
+
+	def compile_and(self, predicates):
+		if self.adaptive:
+			return AdaptiveOperator(predicates, True, self.sample_size, self.resample_interval)
+		return all_of(predicates)
+
+	def compile_or(self, predicates):
+		if self.adaptive:
+			return AdaptiveOperator(predicates, False, self.sample_size, self.resample_interval)
+		return any_of(predicates)
+
+	def compile_condition(self, condition):
+		getter = self.get_accessor(condition.left)
+		compare = self.comparators[condition.__class__]
+		coerce = self.coerce
+
+		if condition.typed:
+			# coerced by the schema at parse time
+			right = frozenset(condition.right) if isinstance(condition, membership_conditions) else condition.right
+			return lambda item: compare(getter(item), right)
+
+		# the literal is coerced once per type of the left-hand value instead of once per item
+		coerced = {}
+
+		if self.stats is not None:
+			return self.compile_instrumented_condition(condition, getter, compare, coerced)
+
+		def predicate(item):
+			left_value = getter(item)
+			value_type = type(left_value)
+			try:
+				right_value = coerced[value_type]
+			except KeyError:
+				right_value = coerced[value_type] = coerce(condition, value_type)
+			return compare(left_value, right_value)
+
+		return predicate
+
+	def coerce(self, condition, value_type):
+		if isinstance(condition, membership_conditions):
+			# membership is tested with a set lookup
+			return frozenset(self.get_compatible_value(x, value_type) for x in condition.right)
+		return self.get_compatible_value(condition.right, value_type)
+
+	def compile_instrumented_condition(self, condition, getter, compare, coerced):
+		stats = self.stats.get(condition)
+		coerce = self.coerce
+		membership = isinstance(condition, membership_conditions)
 
-		if isinstance(op, Operator):
-			if isinstance(op, AndOperator):
-				return self.eval_op(op.left, item) and self.eval_op(op.right, item)
+		def predicate(item):
+			left_value = getter(item)
+			value_type = type(left_value)
+			try:
+				right_value, failed = coerced[value_type]
+			except KeyError:
+				right_value = coerce(condition, value_type)
+				if membership:
+					failed = not all(is_coerced(x, value_type) for x in right_value)
+				else:
+					failed = not is_coerced(right_value, value_type)
+				coerced[value_type] = right_value, failed
 
-			if isinstance(op, OrOperator):
-				return self.eval_op(op.left, item) or self.eval_op(op.right, item)
+			if failed:
+				stats.coercion_failures += 1
+			return compare(left_value, right_value)
 
-		raise Exception("Unexpected item found in query: %s" % op)
+		return predicate
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import numpy
+import pandas
+
+from phylter.backends.numpy_backend import NumpyBackend
+from phylter.conditions import InCondition, NotInCondition
+
+
+def is_in(column, values):
+	# Series.isin is hash based and keeps the semantics of extension dtypes
+	return column.isin(values)
+
+
+def not_in(column, values):
+	# like SQL's NOT IN, missing values never match
+	return ~column.isin(values) & column.notna()
+
+
+class PandasBackend(NumpyBackend):
+
+	comparators = dict(NumpyBackend.comparators)
+	comparators[InCondition] = is_in
+	comparators[NotInCondition] = not_in
+
+	@staticmethod
+	def supports(o):
+		return isinstance(o, pandas.DataFrame)
+
+	@classmethod
+	def supports_type(cls, t):
+		return issubclass(t, pandas.DataFrame)
+
+	def filter(self, data, mask):
+		return data.loc[mask]
+
+	def get_row(self, data, index):
+		return data.iloc[index]
+
+	def index(self, query, data):
+		return data.index[self.mask(query, data)]
+
+	def get_length(self, data):
+		return len(data)
+
+	def compare(self, comparator, column, value):
+		result = comparator(column, value)
+
+		if isinstance(result, pandas.Series):
+			# nullable dtypes return missing values for missing cells which never match
+			result = result.to_numpy(dtype=bool, na_value=False)
+
+			# the masks are combined in-place, but with copy-on-write pandas hands out read-only views
+			if not result.flags.writeable:
+				result = result.copy()
+			return result
+		return numpy.asarray(result)
+
+	def get_first_value(self, column):
+		# missing cells (None, NaN, NA) don't tell the type of the column
+		valid = column.notna().to_numpy()
+		if not valid.any():
+			return None
+		return column.iloc[valid.argmax()]
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import re
+import threading
+from collections import OrderedDict
+
+# quoted strings are kept as they are, any other run of whitespace is collapsed into a single space
+normalize_re = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|\s+""")
+
+
+def normalize_query(s):
+	return normalize_re.sub(lambda m: m.group(1) or ' ', s).strip()
+
+
+class ParseCache(object):
+
+	def __init__(self, maxsize=128):
+		if maxsize is None or maxsize < 1:
+			raise ValueError("'maxsize' must be >= 1")
+
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self._data = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key):
+		with self._lock:
+			try:
+				value = self._data.pop(key)
+			except KeyError:
+				self.misses += 1
+				return None
+
+			self._data[key] = value  # move to the end (most recently used)
+			self.hits += 1
+			return value
+
+	def put(self, key, value):
+		with self._lock:
+			self._data.pop(key, None)
+			self._data[key] = value
+
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+
+	def clear(self):
+		with self._lock:
+			self._data.clear()
+			self.hits = 0
+			self.misses = 0
+
+	def __len__(self):
+		return len(self._data)
+
+	def __contains__(self, key):
+		return key in self._data
+
+	@property
+	def info(self):
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'maxsize': self.maxsize,
+			'currsize': len(self._data),
+		}
@@ -1,78 +1,178 @@
 # -*- coding: utf-8 -*-
+import threading
+import weakref
 
-class Condition(object):
+# all nodes currently alive, keyed by their structure. Identical (sub-)trees share the same instances
+interned_nodes = weakref.WeakValueDictionary()
+interned_nodes_lock = threading.Lock()
 
-	def __init__(self, left, right):
-		self.left = left
-		self.right = right
+
+def intern_node(node):
+	key = node.key
+	with interned_nodes_lock:
+		existing = interned_nodes.get(key)
+		if existing is None:
+			interned_nodes[key] = node
+			return node
+		return existing
+
+
+def value_types(value):
+	if isinstance(value, tuple):
+		return tuple(value_types(x) for x in value)
+	return type(value)
+
+
+class Node(object):
+	# nodes are immutable, hashable and don't have a __dict__
+	__slots__ = ('key', '_hash', '__weakref__')
+
+	def __setattr__(self, name, value):
+		raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+	def __delattr__(self, name):
+		raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+	def _set_key(self, key):
+		object.__setattr__(self, 'key', key)
+		object.__setattr__(self, '_hash', hash(key))
 
 	def __eq__(self, other):
-		return isinstance(other, self.__class__) and other.left == self.left and other.right == self.right
+		return self is other or (isinstance(other, Node) and self._hash == other._hash and self.key == other.key)
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
+	def __hash__(self):
+		return self._hash
 
 	def __repr__(self):
 		return self.__str__()
 
+
+class Condition(Node):
+	__slots__ = ('left', 'right', 'typed')
+
+	def __init__(self, left, right, typed=False):
+		object.__setattr__(self, 'left', left)
+		object.__setattr__(self, 'right', right)
+		# typed conditions have been coerced to the type of the field by a schema and are compared as they are
+		object.__setattr__(self, 'typed', typed)
+		# the types are part of the key because e.g. 1, 1.0 and True are equal but not interchangeable
+		self._set_key((self.__class__, left, right, value_types(right), typed))
+
+	def __reduce__(self):
+		return self.__class__, (self.left, self.right, self.typed)
+
+
 class EqualsCondition(Condition):
+	__slots__ = ()
 
 	def __str__(self):  # pragma: nocover
 		return "%s == %s" % (self.left, self.right)
 
 
 class GreaterThanCondition(Condition):
+	__slots__ = ()
 
 	def __str__(self):  # pragma: nocover
 		return "%s > %s" % (self.left, self.right)
 
 
 class GreaterThanOrEqualCondition(Condition):
+	__slots__ = ()
 
 	def __str__(self):  # pragma: nocover
 		return "%s >= %s" % (self.left, self.right)
 
 
 class LessThanCondition(Condition):
+	__slots__ = ()
 
 	def __str__(self):  # pragma: nocover
 		return "%s < %s" % (self.left, self.right)
 
 
 class LessThanOrEqualCondition(Condition):
+	__slots__ = ()
 
 	def __str__(self):  # pragma: nocover
 		return "%s <= %s" % (self.left, self.right)
 
 
-class Operator(object):  # pragma: nocover
-	def __init__(self, left, right):
-		self.left = left
-		self.right = right
+class InCondition(Condition):
+	__slots__ = ()
 
-	def __eq__(self, other):
-		return isinstance(other, self.__class__) and other.left == self.left and other.right == self.right
+	def __str__(self):  # pragma: nocover
+		return "%s in (%s)" % (self.left, ", ".join(str(x) for x in self.right))
 
 
-class AndOperator(Operator):
+class NotInCondition(Condition):
+	__slots__ = ()
 
 	def __str__(self):  # pragma: nocover
-		return "(%s) AND (%s)" % (self.left, self.right)
+		return "%s not in (%s)" % (self.left, ", ".join(str(x) for x in self.right))
 
 
-class OrOperator(Operator):
+# conditions whose value is a tuple of values
+membership_conditions = (InCondition, NotInCondition)
 
-	def __str__(self):  # pragma: nocover
-		return "(%s) OR (%s)" % (self.left, self.right)
 
+class Operator(Node):  # pragma: nocover
+	__slots__ = ('operands', )
+	symbol = None
 
-class ConditionGroup(object):
+	def __init__(self, *operands):
+		if len(operands) < 2:
+			raise ValueError("%s requires at least two operands" % self.__class__.__name__)
 
-	def __init__(self, item):
-		self.item = item
+		# nested operators of the same kind are merged into a single n-ary operator
+		flattened = []
+		for operand in operands:
+			if type(operand) is type(self):
+				flattened.extend(operand.operands)
+			else:
+				flattened.append(operand)
+		operands = tuple(flattened)
+		object.__setattr__(self, 'operands', operands)
+		self._set_key((self.__class__, ) + operands)
+
+	def __reduce__(self):
+		return self.__class__, self.operands
+
+	@property
+	def left(self):
+		if len(self.operands) == 2:
+			return self.operands[0]
+		return self.__class__(*self.operands[:-1])
+
+	@property
+	def right(self):
+		return self.operands[-1]
 
 	def __str__(self):
-		return "(%s)" % self.item
+		return (" %s " % self.symbol).join("(%s)" % x for x in self.operands)
 
-	def __repr__(self):
-		return self.__str__()
 
-	def __eq__(self, other):
-		return isinstance(other, ConditionGroup) and self.item == other.item
\ No newline at end of file
+class AndOperator(Operator):
+	__slots__ = ()
+	symbol = "AND"
+
+
+class OrOperator(Operator):
+	__slots__ = ()
+	symbol = "OR"
+
+
+class ConditionGroup(Node):
+	__slots__ = ('item', )
+
+	def __init__(self, item):
+		object.__setattr__(self, 'item', item)
+		self._set_key((ConditionGroup, item))
+
+	def __reduce__(self):
+		return ConditionGroup, (self.item, )
+
+	def __str__(self):
+		return "(%s)" % self.item
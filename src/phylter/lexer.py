@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import re
+from collections import namedtuple
+
+IDENTIFIER = 'identifier'
+STRING = 'string'
+NUMBER = 'number'
+OPERATOR = 'operator'
+AND = 'and'
+OR = 'or'
+LPAREN = '('
+RPAREN = ')'
+COMMA = ','
+IN = 'in'
+NOT = 'not'
+END = 'end'
+
+keywords = {
+	'and': AND,
+	'or': OR,
+	'in': IN,
+	'not': NOT,
+}
+
+token_re = re.compile(r"""
+	(?P<whitespace>\s+)
+	|(?P<string>"(?:[^"\\\n\r]|\\.)*"|'(?:[^'\\\n\r]|\\.)*')
+	|(?P<operator>==|!=|>=|<=|>|<)
+	|(?P<lparen>\()
+	|(?P<rparen>\))
+	|(?P<comma>,)
+	|(?P<number>-?[0-9]+\.[0-9]+|-[0-9]+)
+	|(?P<word>[A-Za-z0-9_]+(?:\.[A-Za-z0-9_]+)*)
+""", re.VERBOSE)
+
+
+class ParseError(Exception):
+
+	def __init__(self, message, pos=None, query=None):
+		if pos is not None:
+			message = "%s at position %s" % (message, pos)
+		super(ParseError, self).__init__(message)
+		self.pos = pos
+		self.query = query
+
+
+Token = namedtuple('Token', ('type', 'value', 'pos'))
+
+
+def tokenize(s):
+	tokens = []
+	pos = 0
+	length = len(s)
+	match = token_re.match
+
+	while pos < length:
+		m = match(s, pos)
+		if m is None:
+			raise ParseError("Unexpected character %r" % s[pos], pos, s)
+
+		kind = m.lastgroup
+		value = m.group(kind)
+
+		if kind == 'word':
+			lowered = value.lower()
+			if lowered in keywords:
+				tokens.append(Token(keywords[lowered], lowered, pos))
+			else:
+				tokens.append(Token(IDENTIFIER, value, pos))
+		elif kind == 'lparen':
+			tokens.append(Token(LPAREN, value, pos))
+		elif kind == 'rparen':
+			tokens.append(Token(RPAREN, value, pos))
+		elif kind == 'comma':
+			tokens.append(Token(COMMA, value, pos))
+		elif kind == 'string':
+			tokens.append(Token(STRING, value, pos))
+		elif kind == 'number':
+			tokens.append(Token(NUMBER, value, pos))
+		elif kind == 'operator':
+			tokens.append(Token(OPERATOR, value, pos))
+
+		pos = m.end()
+
+	tokens.append(Token(END, None, length))
+	return tokens
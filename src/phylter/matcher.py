@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+from phylter.backends.objects import ObjectsBackend
+from phylter.conditions import Condition, ConditionGroup, Operator, AndOperator, OrOperator
+
+
+class QueryMatcher(object):
+
+	def __init__(self, queries=None, backend=None):
+		if isinstance(backend, type):
+			backend = backend()
+		self.backend = backend or ObjectsBackend()
+
+		self.queries = OrderedDict()
+		self._compiled = None
+
+		for query_id, query in (queries.items() if isinstance(queries, dict) else queries or ()):
+			self.add(query_id, query)
+
+	def add(self, query_id, query):
+		self.queries[query_id] = query
+		self._compiled = None
+
+	def remove(self, query_id):
+		del self.queries[query_id]
+		self._compiled = None
+
+	def __len__(self):
+		return len(self.queries)
+
+	@property
+	def node_count(self):
+		return len(self.compile()[0])
+
+	def compile(self):
+		if self._compiled is not None:
+			return self._compiled
+
+		# every distinct node gets a slot in the per-item memo list, so shared conditions and subtrees
+		# are evaluated at most once per item regardless of how many queries contain them
+		slots = {}
+		nodes = []
+
+		def compile_node(node):
+			if isinstance(node, ConditionGroup):
+				return compile_node(node.item)
+
+			try:
+				return nodes[slots[node]][1]
+			except KeyError:
+				pass
+
+			if isinstance(node, Condition):
+				predicate = self.backend.compile_condition(node)
+				evaluate = lambda item, memo: predicate(item)
+			elif isinstance(node, Operator):
+				evaluate = self.compile_operator(node, [compile_node(x) for x in node.operands])
+			else:
+				raise Exception("Unexpected item found in query: %s" % node)
+
+			index = len(nodes)
+			slots[node] = index
+
+			def memoized(item, memo):
+				result = memo[index]
+				if result is None:
+					result = memo[index] = evaluate(item, memo)
+				return result
+
+			nodes.append((node, memoized))
+			return memoized
+
+		entries = []
+		for query_id, query in self.queries.items():
+			if query.empty:
+				continue
+			predicates = [compile_node(x) for x in query.query]
+			entries.append((query_id, predicates))
+
+		self._compiled = nodes, entries
+		return self._compiled
+
+	def compile_operator(self, operator, predicates):
+		if isinstance(operator, AndOperator):
+			def evaluate(item, memo):
+				for p in predicates:
+					if not p(item, memo):
+						return False
+				return True
+			return evaluate
+
+		if isinstance(operator, OrOperator):
+			def evaluate(item, memo):
+				for p in predicates:
+					if p(item, memo):
+						return True
+				return False
+			return evaluate
+
+		raise Exception("Unexpected item found in query: %s" % operator)
+
+	def match(self, item):
+		nodes, entries = self.compile()
+		memo = [None] * len(nodes)
+		matches = []
+
+		for query_id, predicates in entries:
+			for p in predicates:
+				if not p(item, memo):
+					break
+			else:
+				matches.append(query_id)
+
+		return matches
+
+	def apply(self, iterable):
+		for item in iterable:
+			yield item, self.match(item)
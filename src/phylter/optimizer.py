@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+from phylter.backends.base import digit_or_float, str_types
+from phylter.conditions import Condition, ConditionGroup, Operator, AndOperator, OrOperator, EqualsCondition, \
+	GreaterThanCondition, GreaterThanOrEqualCondition, LessThanCondition, LessThanOrEqualCondition
+from phylter.parser import ConsumableIter
+from phylter.query import Query
+
+lower_bounds = (GreaterThanCondition, GreaterThanOrEqualCondition)
+upper_bounds = (LessThanCondition, LessThanOrEqualCondition)
+inclusive = (GreaterThanOrEqualCondition, LessThanOrEqualCondition)
+
+
+class Contradiction(Exception):
+	pass
+
+
+def numeric_value(condition):
+	# only literals which a schema converted to numbers prove that the field is numeric; untyped literals like 10
+	# are compared as strings on string fields
+	value = condition.right
+	if not condition.typed or isinstance(value, bool):
+		return None
+	if isinstance(value, (int, float)):
+		return value
+	return None
+
+
+def untyped_number(condition):
+	value = condition.right
+	if not condition.typed and isinstance(value, str_types) and digit_or_float(value):
+		return float(value)
+	return None
+
+
+def string_value(condition):
+	value = condition.right
+	if condition.typed:
+		return value
+	if isinstance(value, str_types) and len(value) > 1 and value[0] in ("'", '"') and value[0] == value[-1]:
+		return value[1:-1]
+	return value
+
+
+def cost(node):
+	if isinstance(node, EqualsCondition):
+		return 0
+	if isinstance(node, Condition):
+		return 1
+	return 2
+
+
+# Rewrites the condition tree of a query into an equivalent, cheaper one: redundant groups are removed,
+# duplicate operands are dropped, range conditions on the same field are merged and cheap conditions are
+# moved to the front. Queries which can never match are returned as empty queries.
+#
+# Range conditions are only merged (and checked for contradictions) if a schema converted their literals to
+# numbers; the order of untyped literals depends on the type of the field, which isn't known.
+class Optimizer(object):
+	def optimize(self, query):
+		if query.empty:
+			return query
+
+		items = list(query.query)
+		if not items:
+			return query
+
+		try:
+			root = self.optimize_node(AndOperator(*items) if len(items) > 1 else items[0])
+		except Contradiction:
+			return Query(ConsumableIter([]), empty=True, schema=query.schema)
+
+		return Query(ConsumableIter([root]), schema=query.schema)
+
+	def optimize_node(self, node):
+		if isinstance(node, ConditionGroup):
+			# the tree already encodes the precedence, so groups carry no meaning
+			return self.optimize_node(node.item)
+
+		if isinstance(node, Condition):
+			return node
+
+		if isinstance(node, AndOperator):
+			operands = self.merge_and(self.unique(AndOperator, [self.optimize_node(x) for x in node.operands]))
+		elif isinstance(node, OrOperator):
+			operands = []
+			for x in node.operands:
+				try:
+					operands.append(self.optimize_node(x))
+				except Contradiction:
+					pass
+
+			if not operands:
+				raise Contradiction()
+			operands = self.merge_or(self.unique(OrOperator, operands))
+		else:
+			raise Exception("Unexpected item found in query: %s" % node)
+
+		operands.sort(key=cost)
+
+		if len(operands) == 1:
+			return operands[0]
+		return node.__class__(*operands)
+
+	def unique(self, operator_class, operands):
+		seen = set()
+		result = []
+
+		for x in operands:
+			# unwrapping groups may yield operators of the same kind which have to be flattened again
+			for operand in (x.operands if type(x) is operator_class else (x, )):
+				if operand not in seen:
+					seen.add(operand)
+					result.append(operand)
+
+		return result
+
+	def merge_and(self, operands):
+		lower = {}
+		upper = {}
+		equals = {}
+		result = []
+
+		for x in operands:
+			value = numeric_value(x) if isinstance(x, Condition) else None
+
+			if isinstance(x, EqualsCondition):
+				previous = equals.get(x.left)
+				if previous is not None and self.differs(previous, x):
+					raise Contradiction()
+				equals.setdefault(x.left, x)
+				result.append(x)
+			elif value is not None and isinstance(x, lower_bounds):
+				current = lower.get(x.left)
+				if current is None or self.stricter_lower(x, current):
+					lower[x.left] = x
+			elif value is not None and isinstance(x, upper_bounds):
+				current = upper.get(x.left)
+				if current is None or self.stricter_upper(x, current):
+					upper[x.left] = x
+			else:
+				result.append(x)
+
+		for field in set(lower) | set(upper):
+			low, high = lower.get(field), upper.get(field)
+
+			if low is not None and high is not None:
+				low_value, high_value = numeric_value(low), numeric_value(high)
+				if low_value > high_value or (low_value == high_value and not (isinstance(low, inclusive) and isinstance(high, inclusive))):
+					raise Contradiction()
+
+			eq = equals.get(field)
+			eq_value = numeric_value(eq) if eq is not None else None
+			if eq_value is not None:
+				if not self.in_range(eq_value, low, high):
+					raise Contradiction()
+				# the equality implies the range
+				continue
+
+			result.extend(x for x in (low, high) if x is not None)
+
+		return result
+
+	def merge_or(self, operands):
+		lower = {}
+		upper = {}
+		result = []
+
+		for x in operands:
+			value = numeric_value(x) if isinstance(x, Condition) else None
+
+			if value is not None and isinstance(x, lower_bounds):
+				current = lower.get(x.left)
+				if current is None or self.stricter_lower(current, x):
+					lower[x.left] = x
+			elif value is not None and isinstance(x, upper_bounds):
+				current = upper.get(x.left)
+				if current is None or self.stricter_upper(current, x):
+					upper[x.left] = x
+			else:
+				result.append(x)
+
+		result.extend(lower.values())
+		result.extend(upper.values())
+		return result
+
+	def differs(self, a, b):
+		if a.typed and b.typed:
+			return a.right != b.right
+		if a.typed or b.typed:
+			return False
+
+		# untyped literals like 1 and 1.0 are equal for numeric fields, but not for string fields
+		a_number, b_number = untyped_number(a), untyped_number(b)
+		if a_number is not None and a_number == b_number:
+			return False
+		return string_value(a) != string_value(b)
+
+	def stricter_lower(self, a, b):
+		a_value, b_value = numeric_value(a), numeric_value(b)
+		return a_value > b_value or (a_value == b_value and isinstance(a, GreaterThanCondition))
+
+	def stricter_upper(self, a, b):
+		a_value, b_value = numeric_value(a), numeric_value(b)
+		return a_value < b_value or (a_value == b_value and isinstance(a, LessThanCondition))
+
+	def in_range(self, value, low, high):
+		if low is not None:
+			low_value = numeric_value(low)
+			if value < low_value or (value == low_value and not isinstance(low, inclusive)):
+				return False
+
+		if high is not None:
+			high_value = numeric_value(high)
+			if value > high_value or (value == high_value and not isinstance(high, inclusive)):
+				return False
+
+		return True
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import itertools
+import multiprocessing
+from collections import deque
+
+# set in every worker process by the pool initializer, so the query is only sent once per worker
+_worker_query = None
+_worker_backend = None
+
+
+def _init_worker(query, backend):
+	global _worker_query, _worker_backend
+	_worker_query = query
+	_worker_backend = backend
+
+
+def _filter_chunk(chunk):
+	return list(_worker_query.apply(chunk, backend=_worker_backend))
+
+
+def chunks(iterable, chunksize):
+	iterator = iter(iterable)
+	while True:
+		chunk = list(itertools.islice(iterator, chunksize))
+		if not chunk:
+			return
+		yield chunk
+
+
+def _pop_ready(pending):
+	while True:
+		for i, result in enumerate(pending):
+			if result.ready():
+				del pending[i]
+				return result.get()
+		pending[0].wait(0.001)
+
+
+def apply_parallel(query, iterable, workers=None, chunksize=1000, ordered=True, backend=None, max_pending=None):
+	if chunksize is None or chunksize < 1:
+		raise ValueError("'chunksize' must be >= 1")
+
+	workers = workers or multiprocessing.cpu_count()
+	# limits the number of chunks in flight so that large inputs aren't read into memory at once
+	max_pending = max_pending or workers * 2
+
+	pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(query, backend))
+	try:
+		if ordered:
+			pending = deque()
+			for chunk in chunks(iterable, chunksize):
+				pending.append(pool.apply_async(_filter_chunk, (chunk, )))
+				if len(pending) >= max_pending:
+					for item in pending.popleft().get():
+						yield item
+
+			while pending:
+				for item in pending.popleft().get():
+					yield item
+		else:
+			pending = []
+			for chunk in chunks(iterable, chunksize):
+				pending.append(pool.apply_async(_filter_chunk, (chunk, )))
+				if len(pending) >= max_pending:
+					for item in _pop_ready(pending):
+						yield item
+
+			while pending:
+				for item in _pop_ready(pending):
+					yield item
+	finally:
+		pool.terminate()
+		pool.join()
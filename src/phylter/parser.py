@@ -1,27 +1,56 @@
 # -*- coding: utf-8 -*-
-import pyparsing
-
+from phylter import lexer
 from phylter.conditions import EqualsCondition, GreaterThanCondition, LessThanCondition, GreaterThanOrEqualCondition, \
-	LessThanOrEqualCondition, AndOperator, OrOperator, Condition, Operator, ConditionGroup
+	LessThanOrEqualCondition, AndOperator, OrOperator, Condition, Operator, ConditionGroup, InCondition, NotInCondition, \
+	intern_node
+from phylter.cache import ParseCache, normalize_query
+from phylter.lexer import ParseError, tokenize
 from phylter.query import Query
+from phylter.schema import SchemaError
 
 operator_signs = ('==', '!=', '>', '<', '>=', '<=')
+membership_operators = ('in', 'not in')
+
+# 'or' binds tighter than 'and'
+operator_precedence = {
+	lexer.AND: 1,
+	lexer.OR: 2,
+}
+
+value_tokens = (lexer.STRING, lexer.NUMBER, lexer.IDENTIFIER)
+
+_pyparsing_pattern = None
+
+
+def get_pyparsing_pattern():
+	global _pyparsing_pattern
 
-identifier = pyparsing.Word(pyparsing.alphanums)
-operator = pyparsing.oneOf(operator_signs)
-value = pyparsing.quotedString | pyparsing.Word(pyparsing.alphanums)
+	if _pyparsing_pattern is None:
+		import pyparsing
 
-# covers foo == bar and (foo == bar)
-condition = identifier + operator + value | \
-			"(" + identifier + operator + value + ")"
+		word = pyparsing.Word(pyparsing.alphanums)
+		identifier = pyparsing.Combine(word + pyparsing.ZeroOrMore("." + word))
+		operator = pyparsing.oneOf(operator_signs)
+		value = pyparsing.quotedString | pyparsing.Word(pyparsing.alphanums)
 
-and_or = pyparsing.oneOf(['and', 'or'], caseless=True)
-andor_field_op_value = and_or + condition
+		in_operator = (pyparsing.CaselessKeyword('not') + pyparsing.CaselessKeyword('in')).setParseAction(lambda: 'not in') | \
+					  pyparsing.CaselessKeyword('in')
+		value_list = pyparsing.Group(pyparsing.Suppress("(") + pyparsing.delimitedList(value) + pyparsing.Suppress(")"))
+		comparison = identifier + operator + value | identifier + in_operator + value_list
 
-grouped_andor_field_op_value = and_or + "(" + condition + pyparsing.Optional(pyparsing.OneOrMore(andor_field_op_value)) + ")"
+		# covers foo == bar and (foo == bar)
+		condition = comparison | "(" + comparison + ")"
 
-pattern = condition + \
-		  pyparsing.Optional(pyparsing.OneOrMore(andor_field_op_value | grouped_andor_field_op_value))
+		and_or = pyparsing.oneOf(['and', 'or'], caseless=True)
+		andor_field_op_value = and_or + condition
+
+		grouped_andor_field_op_value = and_or + "(" + condition + \
+									   pyparsing.Optional(pyparsing.OneOrMore(andor_field_op_value)) + ")"
+
+		_pyparsing_pattern = condition + \
+			pyparsing.Optional(pyparsing.OneOrMore(andor_field_op_value | grouped_andor_field_op_value))
+
+	return _pyparsing_pattern
 
 
 class ConsumableIter(object):
@@ -74,7 +103,11 @@ class ConsumableIter(object):
 		return self.length
 
 	def __contains__(self, item):
-		return item in self.iterable[self.pos:]
+		iterable = self.iterable
+		for i in range(self.pos, self.length):
+			if iterable[i] == item:
+				return True
+		return False
 
 	def __getitem__(self, item):
 		return ConsumableIter(self.iterable.__getitem__(item))
@@ -86,43 +119,193 @@ class ConsumableIter(object):
 		return isinstance(other, ConsumableIter) and self.iterable[self.pos:] == other.iterable[other.pos:] or \
 				isinstance(other, list) and self.iterable[self.pos:] == other
 
+class ExpressionParser(object):
+
+	def __init__(self, parser, query):
+		self.parser = parser
+		self.query = query
+		self.tokens = tokenize(query)
+		self.pos = 0
+
+	@property
+	def current(self):
+		return self.tokens[self.pos]
+
+	def error(self, expected):
+		token = self.current
+		found = "end of query" if token.type == lexer.END else repr(token.value)
+		return ParseError("Expected %s, found %s" % (expected, found), token.pos, self.query)
+
+	def expect(self, token_types, expected):
+		token = self.current
+		if token.type not in token_types:
+			raise self.error(expected)
+		self.pos += 1
+		return token
+
+	def parse(self):
+		if self.current.type == lexer.END:
+			raise self.error("condition")
+
+		item = self.parse_expression(1)
+
+		if self.current.type != lexer.END:
+			raise self.error("'and' or 'or'")
+
+		return Query(ConsumableIter([item]), schema=self.parser.schema)
+
+	def parse_expression(self, min_precedence):
+		left = self.parse_primary()
+
+		while True:
+			token = self.current
+			precedence = operator_precedence.get(token.type)
+			if precedence is None or precedence < min_precedence:
+				return left
+
+			# collect a whole chain of the same operator and build a single n-ary node from it
+			operands = [left]
+			while self.current.type == token.type:
+				self.pos += 1
+				operands.append(self.parse_expression(precedence + 1))
+			left = intern_node(self.parser._get_operator_class(token.value)(*operands))
+
+	def parse_primary(self):
+		token = self.current
+
+		if token.type == lexer.LPAREN:
+			self.pos += 1
+			item = self.parse_expression(1)
+			self.expect((lexer.RPAREN, ), "')'")
+			return intern_node(ConditionGroup(item))
+
+		left = self.expect((lexer.IDENTIFIER, ), "identifier")
+		if self.current.type in (lexer.IN, lexer.NOT):
+			return self.parse_membership(left)
+
+		operator = self.expect((lexer.OPERATOR, ), "operator")
+		right = self.expect(value_tokens, "value")
+
+		try:
+			condition_class = self.parser._get_condition_class(operator.value)
+		except Exception as e:
+			raise ParseError(str(e), operator.pos, self.query)
+
+		return self.parser.build_condition(condition_class, left.value, right.value, self.query, left.pos, right.pos)
+
+	def parse_membership(self, left):
+		# field in (a, b, ...) and field not in (a, b, ...)
+		operator = 'in'
+		if self.current.type == lexer.NOT:
+			self.pos += 1
+			operator = 'not in'
+		self.expect((lexer.IN, ), "'in'")
+		self.expect((lexer.LPAREN, ), "'('")
+
+		values = [self.expect(value_tokens, "value")]
+		while self.current.type == lexer.COMMA:
+			self.pos += 1
+			values.append(self.expect(value_tokens, "value"))
+		self.expect((lexer.RPAREN, ), "',' or ')'")
+
+		return self.parser.build_condition(self.parser._get_condition_class(operator), left.value,
+										   tuple(x.value for x in values), self.query, left.pos, tuple(x.pos for x in values))
+
+
 class Parser(object):
 
 	def __init__(self, *args, **kwargs):
-		pass
+		self.use_pyparsing = kwargs.get('use_pyparsing', False)
+		self.optimize = kwargs.get('optimize', False)
+		# a phylter.schema.Schema to validate fields and convert values at parse time
+		self.schema = kwargs.get('schema', None)
+
+		cache = kwargs.get('cache', None)
+		cache_size = kwargs.get('cache_size', None)
+
+		if cache is None and cache_size:
+			cache = ParseCache(cache_size)
+		self.cache = cache
 
 	def parse(self, query):
-		chunks = ConsumableIter(pattern.parseString(query, parseAll=True))
-		return self.build_query(chunks)
+		if self.cache is None:
+			return self._parse(query)
+
+		normalized = normalize_query(query)
+		# the same cache may be shared by parsers with different schemas
+		key = normalized if self.schema is None else (self.schema, normalized)
+		q = self.cache.get(key)
+		if q is None:
+			# the normalized string is only the cache key; errors point into the string the caller passed
+			q = self._parse(query)
+			self.cache.put(key, q)
+		return q
+
+	def _parse(self, query):
+		if self.use_pyparsing:
+			chunks = ConsumableIter(get_pyparsing_pattern().parseString(query, parseAll=True))
+			q = self.build_query(chunks, query)
+		else:
+			q = ExpressionParser(self, query).parse()
+
+		if self.optimize:
+			q = q.optimize()
+		return q
 
 	def find_group_end(self, consumable):
 		openings = 1
+		iterable = consumable.iterable
 
-		for i, item in enumerate(consumable):
+		# the returned position is relative to the current position of the consumable
+		for i in range(consumable.pos, consumable.length):
+			item = iterable[i]
 			if item == ')':
-				if openings <= 1:
-					return i
-				else:
-					i -= 1
+				openings -= 1
+				if openings == 0:
+					return i - consumable.pos
 			elif item == '(':
-				i += 1
+				openings += 1
 
 		raise Exception("Unbalanced parenthesis")
 
-	def build_query(self, consumable):
+	def build_condition(self, condition_class, field, value, query=None, field_pos=None, value_pos=None):
+		if self.schema is None:
+			return intern_node(condition_class(field, value))
+
+		if field not in self.schema:
+			raise ParseError("Unknown field '%s'" % field, field_pos, query)
+
+		if self.schema.get_type(field) is None:
+			return intern_node(condition_class(field, value))
+
+		if isinstance(value, tuple):
+			# the values of a membership condition; value_pos holds the position of each of them
+			positions = value_pos or (None, ) * len(value)
+			value = tuple(self.coerce_value(field, x, query, pos) for x, pos in zip(value, positions))
+		else:
+			value = self.coerce_value(field, value, query, value_pos)
+		return intern_node(condition_class(field, value, typed=True))
+
+	def coerce_value(self, field, value, query=None, value_pos=None):
+		try:
+			return self.schema.coerce(field, value)
+		except SchemaError as e:
+			raise ParseError(str(e), value_pos, query)
+
+	def build_query(self, consumable, query=None):
 		l = []
 
 		# parse groups first
 		while consumable.has_more:
 			if consumable.current == '(':
 				consumable.consume()  # consume (
-				end = self.find_group_end(consumable[consumable.pos:])
+				end = self.find_group_end(consumable)
 				sub = consumable[consumable.pos:consumable.pos+end] # extract group content
 				consumable.consume(end+1) # consume the whole group
-				sub_query = self.build_query(sub) # parse the group
+				sub_query = self.build_query(sub, query) # parse the group
 				if len(sub_query.query) != 1:
 					raise Exception()
-				l.append(ConditionGroup(sub_query.query.iterable[0]))
+				l.append(intern_node(ConditionGroup(sub_query.query.iterable[0])))
 			else:
 				l.append(consumable.consume())
 
@@ -134,9 +317,11 @@ class Parser(object):
 			if consumable.current in ('and', 'or') or isinstance(consumable.current, ConditionGroup):
 				l.append(consumable.consume())
 			else:
-				if consumable.next in operator_signs:
+				if consumable.next in operator_signs or consumable.next in membership_operators:
 					left, operator, right = tuple(consumable.consume(3))
-					condition = self._get_condition_class(operator)(left, right)
+					if operator in membership_operators:
+						right = tuple(right)
+					condition = self.build_condition(self._get_condition_class(operator), left, right, query)
 					l.append(condition)
 				else:
 					raise Exception("Unexpected tokens found: %s" % consumable.iterable[consumable.pos:])
@@ -148,27 +333,30 @@ class Parser(object):
 		for op in ('or', 'and'):
 			op_clazz = self._get_operator_class(op)
 			l2 = []
-			last = None
+			chain = []
 
 			while l.has_more:
 				current = l.consume()
 
-				if isinstance(current, Condition) or isinstance(current, Operator):
-					last = current
+				if current == op:
+					chain.append(l.consume())
+					continue
+
+				if chain:
+					l2.append(intern_node(op_clazz(*chain)) if len(chain) > 1 else chain[0])
+					chain = []
+
+				if isinstance(current, (Condition, Operator, ConditionGroup)):
+					chain.append(current)
 				else:
-					if current == op:
-						last = op_clazz(last, l.consume())
-					else:
-						if last:
-							l2.append(last)
-							last = None
-						l2.append(current)
-			if last:
-				l2.append(last)
+					l2.append(current)
+
+			if chain:
+				l2.append(intern_node(op_clazz(*chain)) if len(chain) > 1 else chain[0])
 
 			l = ConsumableIter(l2)
 
-		return Query(l)
+		return Query(l, schema=self.schema)
 
 	def _get_condition_class(self, operator):
 		d = {
@@ -176,7 +364,9 @@ class Parser(object):
 			'>': GreaterThanCondition,
 			'<': LessThanCondition,
 			'>=': GreaterThanOrEqualCondition,
-			'<=': LessThanOrEqualCondition
+			'<=': LessThanOrEqualCondition,
+			'in': InCondition,
+			'not in': NotInCondition,
 		}
 		if operator not in d:
 			raise Exception("Unknown operator '%s'" % operator)
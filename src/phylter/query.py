@@ -1,19 +1,139 @@
 # -*- coding: utf-8 -*-
+import sys
+
 from phylter.backends import get_backend
+from phylter.backends.objects import ObjectsBackend
 
 
 class Query(object):
+	# queries are shared by parse caches, so the items, empty and schema can't be changed after construction
+
+	def __init__(self, q, empty=False, schema=None):
+		self._items = tuple(q or ())
+		# set by the optimizer for queries which can never match
+		self._empty = empty
+		# the schema the query has been parsed with, if any
+		self._schema = schema
+		self._compiled = {}
+
+	@property
+	def query(self):
+		# a fresh iterator over the items, so consuming it doesn't affect other users of the query
+		from phylter.parser import ConsumableIter
+		return ConsumableIter(list(self._items))
+
+	@property
+	def empty(self):
+		return self._empty
 
-	def __init__(self, q):
-		self.query = q
+	@property
+	def schema(self):
+		return self._schema
 
 	def __str__(self):  # pragma: nocover
+		if self.empty:
+			return "FALSE"
 		return ' '.join([str(x) for x in self.query])
 
 	def __repr__(self):  # pragma: nocover
 		return "%s(%s)" % (self.__class__.__name__, self.__str__())
 
-	def apply(self, iterable):
-		backend = get_backend(iterable)
+	def get_backend(self, iterable, backend=None, **options):
+		if backend is None:
+			backend = get_backend(iterable)
+			if options:
+				backend = backend.__class__(**options)
+		elif isinstance(backend, type):
+			backend = backend(**options)
+		elif options:
+			# the options would configure a new backend; they can't be applied to an existing instance
+			raise TypeError("Backend options (%s) can't be combined with a backend instance" % ", ".join(sorted(options)))
+		return backend
+
+	def apply(self, iterable, backend=None, limit=None, **options):
+		backend = self.get_backend(iterable, backend, **options)
 
+		if self.empty:
+			return backend.empty(iterable)
+
+		if limit is not None:
+			return backend.limit(self, iterable, limit)
 		return backend.apply(self, iterable)
+
+	def first(self, iterable, backend=None, **options):
+		if self.empty:
+			return None
+		return self.get_backend(iterable, backend, **options).first(self, iterable)
+
+	def exists(self, iterable, backend=None, **options):
+		if self.empty:
+			return False
+		return self.get_backend(iterable, backend, **options).exists(self, iterable)
+
+	def count(self, iterable, backend=None, **options):
+		if self.empty:
+			return 0
+		return self.get_backend(iterable, backend, **options).count(self, iterable)
+
+	def aapply(self, iterable, backend=None, batch_size=None):
+		if sys.version_info < (3, 6):
+			raise NotImplementedError("aapply requires python 3.6 or newer")
+
+		from phylter.backends.async_backend import get_async_backend
+
+		backend = get_async_backend(iterable, backend, batch_size)
+
+		if self.empty:
+			return backend.empty(iterable)
+
+		return backend.apply(self, iterable)
+
+	def apply_parallel(self, iterable, workers=None, chunksize=1000, ordered=True, backend=None):
+		from phylter.parallel import apply_parallel
+		return apply_parallel(self, iterable, workers=workers, chunksize=chunksize, ordered=ordered, backend=backend)
+
+	def mask(self, iterable):
+		backend = get_backend(iterable)
+
+		return backend.mask(self, iterable)
+
+	def optimize(self):
+		from phylter.optimizer import Optimizer
+		return Optimizer().optimize(self)
+
+	def to_bytes(self):
+		from phylter.serialization import to_bytes
+		return to_bytes(self)
+
+	@classmethod
+	def from_bytes(cls, data):
+		from phylter.serialization import from_bytes
+		return from_bytes(data)
+
+	def to_json(self):
+		from phylter.serialization import to_json
+		return to_json(self)
+
+	@classmethod
+	def from_json(cls, s):
+		from phylter.serialization import from_json
+		return from_json(s)
+
+	def __getstate__(self):
+		# compiled predicates are closures which can't be pickled
+		state = self.__dict__.copy()
+		state['_compiled'] = {}
+		return state
+
+	def compile(self, backend=None):
+		backend = backend or ObjectsBackend()
+		key = backend.compile_key
+
+		if key is None:
+			return backend.compile(self)
+
+		try:
+			return self._compiled[key]
+		except KeyError:
+			predicate = self._compiled[key] = backend.compile(self)
+			return predicate
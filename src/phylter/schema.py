@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import datetime
+import decimal
+import sys
+
+if sys.version_info[0] == 2:
+	text_types = (str, unicode)
+else:
+	text_types = (str, )
+
+true_values = ('true', 'yes', 'on', '1')
+false_values = ('false', 'no', 'off', '0')
+
+# Django field types which aren't strings
+model_field_types = {
+	'AutoField': int,
+	'BigAutoField': int,
+	'SmallAutoField': int,
+	'IntegerField': int,
+	'BigIntegerField': int,
+	'SmallIntegerField': int,
+	'PositiveIntegerField': int,
+	'PositiveBigIntegerField': int,
+	'PositiveSmallIntegerField': int,
+	'FloatField': float,
+	'DecimalField': decimal.Decimal,
+	'BooleanField': bool,
+	'NullBooleanField': bool,
+	'DateField': datetime.date,
+	'DateTimeField': datetime.datetime,
+}
+
+
+class SchemaError(ValueError):
+	pass
+
+
+def unquote(value):
+	if len(value) > 1 and value[0] in ("'", '"') and value[0] == value[-1]:
+		return value[1:-1]
+	return value
+
+
+def coerce_int(s):
+	try:
+		return int(s)
+	except ValueError:
+		# a fractional literal is still comparable with integers
+		return float(s)
+
+
+def coerce_bool(s):
+	lowered = s.lower()
+	if lowered in true_values:
+		return True
+	if lowered in false_values:
+		return False
+	raise ValueError(s)
+
+
+def coerce_datetime(s):
+	for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+		try:
+			return datetime.datetime.strptime(s, fmt)
+		except ValueError:
+			pass
+	raise ValueError(s)
+
+
+def coerce_date(s):
+	return datetime.datetime.strptime(s, '%Y-%m-%d').date()
+
+
+def coerce_decimal(s):
+	try:
+		return decimal.Decimal(s)
+	except decimal.InvalidOperation:
+		raise ValueError(s)
+
+
+coercers = {
+	int: coerce_int,
+	float: float,
+	bool: coerce_bool,
+	decimal.Decimal: coerce_decimal,
+	datetime.datetime: coerce_datetime,
+	datetime.date: coerce_date,
+}
+for _t in text_types:
+	coercers[_t] = lambda s: s
+
+
+# Maps field names to types. Literals of a query parsed with a schema are converted to the type of their field once
+# at parse time, fields with the type None are accepted but their literals are left to the backends.
+class Schema(object):
+
+	def __init__(self, fields):
+		self.fields = dict(fields)
+
+	def __contains__(self, field):
+		return field in self.fields
+
+	def __iter__(self):
+		return iter(self.fields)
+
+	def get_type(self, field):
+		try:
+			return self.fields[field]
+		except KeyError:
+			raise SchemaError("Unknown field '%s'" % field)
+
+	def coerce(self, field, value):
+		field_type = self.get_type(field)
+		if field_type is None or not isinstance(value, text_types + (bytes, )):
+			return value
+
+		s = unquote(value)
+		try:
+			return coercers.get(field_type, field_type)(s)
+		except (ValueError, TypeError):
+			raise SchemaError("Invalid value %s for field '%s' of type %s" % (value, field, field_type.__name__))
+
+	@classmethod
+	def from_model(cls, model):
+		fields = {}
+		for field in model._meta.concrete_fields:
+			if field.is_relation:
+				# filters on foreign keys compare the primary key of the related object
+				fields[field.attname] = model_field_types.get(field.target_field.get_internal_type(), str)
+			else:
+				fields[field.name] = model_field_types.get(field.get_internal_type(), str)
+		return cls(fields)
+
+	@classmethod
+	def from_dataclass(cls, dataclass):
+		import dataclasses
+		import typing
+
+		hints = typing.get_type_hints(dataclass)
+		fields = {}
+		for field in dataclasses.fields(dataclass):
+			fields[field.name] = get_annotation_type(hints.get(field.name, field.type))
+		return cls(fields)
+
+
+def get_annotation_type(annotation):
+	# Optional[X] is X, annotations without a known conversion are left to the backends
+	import typing
+
+	if getattr(annotation, '__origin__', None) is typing.Union or type(annotation).__name__ == 'UnionType':
+		args = [a for a in annotation.__args__ if a is not type(None)]
+		return get_annotation_type(args[0]) if len(args) == 1 else None
+	if annotation in coercers:
+		return annotation
+	return None
@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+# Binary and JSON encodings of parsed queries. Both formats only describe the condition tree, so decoding never
+# executes code and is safe for data received from other processes.
+#
+# Binary format (version 1):
+#   magic "PHQ", version byte, flags byte (bit 0: empty query), varint number of items, items
+#   condition: tag 0x01-0x07 (| 0x40 for values typed by a schema), left value, right value
+#   operator:  tag 0x10 (and) or 0x11 (or), varint number of operands, operands
+#   group:     tag 0x20, item
+#   value:     tag byte followed by the payload (varint length-prefixed UTF-8 for strings). Repeated strings are
+#              written as the varint index of their first occurrence
+import datetime
+import decimal
+import json
+import struct
+
+from phylter.conditions import EqualsCondition, GreaterThanCondition, GreaterThanOrEqualCondition, LessThanCondition, \
+	LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup, Condition, Operator, InCondition, NotInCondition, \
+	intern_node, membership_conditions
+from phylter.parser import ConsumableIter
+from phylter.query import Query
+from phylter.schema import coerce_datetime
+
+try:
+	text_type = unicode
+	integer_types = (int, long)
+except NameError:
+	text_type = str
+	integer_types = (int, )
+
+MAGIC = b'PHQ'
+VERSION = 1
+# limits the nesting of decoded trees so that crafted input can't exhaust the stack
+MAX_DEPTH = 256
+
+FLAG_EMPTY = 0x01
+
+condition_tags = {
+	EqualsCondition: 0x01,
+	GreaterThanCondition: 0x02,
+	GreaterThanOrEqualCondition: 0x03,
+	LessThanCondition: 0x04,
+	LessThanOrEqualCondition: 0x05,
+	InCondition: 0x06,
+	NotInCondition: 0x07,
+}
+operator_tags = {
+	AndOperator: 0x10,
+	OrOperator: 0x11,
+}
+GROUP_TAG = 0x20
+
+VALUE_NONE = 0x00
+VALUE_TRUE = 0x01
+VALUE_FALSE = 0x02
+VALUE_STRING = 0x03
+VALUE_INT = 0x04
+VALUE_FLOAT = 0x05
+VALUE_TUPLE = 0x06
+VALUE_STRING_REF = 0x07
+VALUE_DECIMAL = 0x08
+VALUE_DATE = 0x09
+VALUE_DATETIME = 0x0a
+
+TYPED_FLAG = 0x40
+
+condition_symbols = {
+	EqualsCondition: '==',
+	GreaterThanCondition: '>',
+	GreaterThanOrEqualCondition: '>=',
+	LessThanCondition: '<',
+	LessThanOrEqualCondition: '<=',
+	InCondition: 'in',
+	NotInCondition: 'not in',
+}
+operator_symbols = {
+	AndOperator: 'and',
+	OrOperator: 'or',
+}
+GROUP_SYMBOL = '()'
+
+symbol_classes = dict((v, k) for k, v in list(condition_symbols.items()) + list(operator_symbols.items()))
+# tag -> (class, typed, membership) with and without the typed flag, and tag -> class for operators
+decoded_conditions = dict((tag | flag, (cls, bool(flag), issubclass(cls, membership_conditions)))
+	for cls, tag in condition_tags.items() for flag in (0, TYPED_FLAG))
+decoded_operators = dict((tag, cls) for cls, tag in operator_tags.items())
+
+double = struct.Struct('>d')
+
+
+class DecodeError(ValueError):
+	pass
+
+
+def parse_datetime(s):
+	fromisoformat = getattr(datetime.datetime, 'fromisoformat', None)
+	return fromisoformat(s) if fromisoformat is not None else coerce_datetime(s)
+
+
+def parse_date(s):
+	return datetime.datetime.strptime(s, '%Y-%m-%d').date()
+
+
+# values without a binary or JSON representation of their own are stored as strings
+string_encoded_types = (
+	(datetime.datetime, VALUE_DATETIME, 'datetime', parse_datetime),
+	(datetime.date, VALUE_DATE, 'date', parse_date),
+	(decimal.Decimal, VALUE_DECIMAL, 'decimal', decimal.Decimal),
+)
+string_encoded_tags = dict((tag, parse) for _, tag, _, parse in string_encoded_types)
+string_encoded_names = dict((name, parse) for _, _, name, parse in string_encoded_types)
+
+
+def encode_value(value):
+	for value_type, tag, name, _ in string_encoded_types:
+		if isinstance(value, value_type):
+			return tag, name, value.isoformat() if hasattr(value, 'isoformat') else str(value)
+	return None
+
+
+def decode_value(parse, s):
+	try:
+		return parse(s)
+	except (ValueError, TypeError, decimal.InvalidOperation):
+		raise DecodeError("Invalid value %r" % (s, ))
+
+
+def node_class(node):
+	# serialize subclasses like the built-in node they are derived from
+	for cls in type(node).__mro__:
+		if cls in condition_tags or cls in operator_tags:
+			return cls
+	raise ValueError("Unexpected item found in query: %s" % node)
+
+
+def write_varint(buf, n):
+	while n > 0x7f:
+		buf.append((n & 0x7f) | 0x80)
+		n >>= 7
+	buf.append(n)
+
+
+class Writer(object):
+
+	def __init__(self):
+		self.buf = bytearray(MAGIC)
+		self.strings = {}
+
+	def string(self, s):
+		if not isinstance(s, text_type):
+			s = s.decode('utf-8')
+
+		index = self.strings.get(s)
+		if index is not None:
+			self.buf.append(VALUE_STRING_REF)
+			write_varint(self.buf, index)
+			return
+
+		self.strings[s] = len(self.strings)
+		data = s.encode('utf-8')
+		self.buf.append(VALUE_STRING)
+		write_varint(self.buf, len(data))
+		self.buf.extend(data)
+
+	def value(self, value):
+		buf = self.buf
+		if value is None:
+			buf.append(VALUE_NONE)
+		elif value is True:
+			buf.append(VALUE_TRUE)
+		elif value is False:
+			buf.append(VALUE_FALSE)
+		elif isinstance(value, (text_type, str)):
+			self.string(value)
+		elif isinstance(value, integer_types):
+			buf.append(VALUE_INT)
+			write_varint(buf, value * 2 if value >= 0 else -value * 2 - 1)  # zigzag
+		elif isinstance(value, float):
+			buf.append(VALUE_FLOAT)
+			buf.extend(double.pack(value))
+		elif isinstance(value, tuple):
+			buf.append(VALUE_TUPLE)
+			write_varint(buf, len(value))
+			for x in value:
+				self.value(x)
+		else:
+			encoded = encode_value(value)
+			if encoded is None:
+				raise ValueError("Can't serialize value %r" % (value, ))
+
+			tag, _, s = encoded
+			buf.append(tag)
+			data = s.encode('utf-8')
+			write_varint(buf, len(data))
+			buf.extend(data)
+
+	def node(self, node):
+		if isinstance(node, ConditionGroup):
+			self.buf.append(GROUP_TAG)
+			self.node(node.item)
+		elif isinstance(node, Condition):
+			self.buf.append(condition_tags[node_class(node)] | (TYPED_FLAG if node.typed else 0))
+			self.value(node.left)
+			self.value(node.right)
+		elif isinstance(node, Operator):
+			self.buf.append(operator_tags[node_class(node)])
+			write_varint(self.buf, len(node.operands))
+			for operand in node.operands:
+				self.node(operand)
+		else:
+			raise ValueError("Unexpected item found in query: %s" % node)
+
+
+def to_bytes(query):
+	writer = Writer()
+	writer.buf.append(VERSION)
+	writer.buf.append(FLAG_EMPTY if query.empty else 0)
+
+	items = list(query.query)
+	write_varint(writer.buf, len(items))
+	for item in items:
+		writer.node(item)
+	return bytes(writer.buf)
+
+
+class Reader(object):
+	# the methods take the current position and return it with the decoded result, and single byte varints are
+	# decoded inline. Running past the end of the data raises IndexError, which from_bytes turns into a DecodeError
+
+	def __init__(self, data):
+		self.data = bytearray(data)
+		self.length = len(self.data)
+		self.strings = []
+
+	def varint(self, pos):
+		data = self.data
+		n = 0
+		shift = 0
+		while True:
+			b = data[pos]
+			pos += 1
+			n |= (b & 0x7f) << shift
+			if not b & 0x80:
+				return n, pos
+			shift += 7
+			if shift > 63:
+				raise DecodeError("Invalid varint at position %s" % pos)
+
+	def count(self, pos):
+		# every element takes at least one byte, so larger counts can't be valid
+		n = self.data[pos]
+		if n < 0x80:
+			pos += 1
+		else:
+			n, pos = self.varint(pos)
+		if n > self.length - pos:
+			raise DecodeError("Invalid length %s at position %s" % (n, pos))
+		return n, pos
+
+	def text(self, pos):
+		n, pos = self.count(pos)
+		end = pos + n
+		try:
+			return self.data[pos:end].decode('utf-8'), end
+		except UnicodeDecodeError as e:
+			raise DecodeError("Invalid string: %s" % e)
+
+	def value(self, pos, depth=0):
+		data = self.data
+		tag = data[pos]
+		pos += 1
+		if tag == VALUE_STRING:
+			n = data[pos]
+			end = pos + 1 + n
+			if n < 0x80 and end <= self.length:
+				# short strings are decoded without going through text()
+				try:
+					s = data[pos + 1:end].decode('utf-8')
+				except UnicodeDecodeError as e:
+					raise DecodeError("Invalid string: %s" % e)
+				pos = end
+			else:
+				s, pos = self.text(pos)
+			self.strings.append(s)
+			return s, pos
+		if tag == VALUE_STRING_REF:
+			index = data[pos]
+			if index < 0x80:
+				pos += 1
+			else:
+				index, pos = self.varint(pos)
+			if index >= len(self.strings):
+				raise DecodeError("Invalid string reference at position %s" % pos)
+			return self.strings[index], pos
+		if tag == VALUE_NONE:
+			return None, pos
+		if tag == VALUE_TRUE:
+			return True, pos
+		if tag == VALUE_FALSE:
+			return False, pos
+		if tag == VALUE_INT:
+			n, pos = self.varint(pos)
+			return (n >> 1 if not n & 1 else -((n + 1) >> 1)), pos
+		if tag == VALUE_FLOAT:
+			end = pos + double.size
+			if end > self.length:
+				raise DecodeError("Unexpected end of data")
+			return double.unpack_from(self.data, pos)[0], end
+		if tag == VALUE_TUPLE and depth < MAX_DEPTH:
+			n, pos = self.count(pos)
+			values = []
+			for _ in range(n):
+				value, pos = self.value(pos, depth + 1)
+				values.append(value)
+			return tuple(values), pos
+		if tag in string_encoded_tags:
+			s, pos = self.text(pos)
+			return decode_value(string_encoded_tags[tag], s), pos
+		raise DecodeError("Invalid value tag 0x%02x at position %s" % (tag, pos - 1))
+
+	def node(self, pos, depth=0):
+		if depth > MAX_DEPTH:
+			raise DecodeError("Query nested too deeply")
+
+		data = self.data
+		tag = data[pos]
+		condition = decoded_conditions.get(tag)
+		if condition is not None:
+			cls, typed, membership = condition
+			index = data[pos + 2]
+			if data[pos + 1] == VALUE_STRING_REF and index < 0x80 and index < len(self.strings):
+				# the usual case of a field name seen before compared to a single value doesn't need build_condition
+				right, pos = self.value(pos + 3)
+				if not membership and not isinstance(right, tuple):
+					return intern_node(cls(self.strings[index], right, typed)), pos
+				return build_condition(cls, self.strings[index], right, typed), pos
+
+			left, pos = self.value(pos + 1)
+			right, pos = self.value(pos)
+			return build_condition(cls, left, right, typed), pos
+
+		pos += 1
+
+		if tag == GROUP_TAG:
+			item, pos = self.node(pos, depth + 1)
+			return intern_node(ConditionGroup(item)), pos
+
+		cls = decoded_operators.get(tag)
+		if cls is None:
+			raise DecodeError("Invalid node tag 0x%02x at position %s" % (tag, pos - 1))
+
+		n, pos = self.count(pos)
+		if n < 2:
+			raise DecodeError("%s requires at least two operands" % cls.__name__)
+		operands = []
+		for _ in range(n):
+			operand, pos = self.node(pos, depth + 1)
+			operands.append(operand)
+		return intern_node(cls(*operands)), pos
+
+
+def build_condition(cls, left, right, typed):
+	# the decoded values have to form a condition the parser could have built
+	if not isinstance(left, (text_type, str)):
+		raise DecodeError("Invalid field: %r" % (left, ))
+
+	if issubclass(cls, membership_conditions):
+		if not isinstance(right, tuple) or not right or any(isinstance(x, tuple) for x in right):
+			raise DecodeError("%s requires a list of values: %r" % (cls.__name__, right))
+	elif isinstance(right, tuple):
+		raise DecodeError("%s requires a single value: %r" % (cls.__name__, right))
+
+	return intern_node(cls(left, right, typed))
+
+
+def from_bytes(data):
+	if not isinstance(data, (bytes, bytearray)):
+		raise TypeError("Expected bytes, got %s" % type(data).__name__)
+
+	reader = Reader(data)
+	if bytes(reader.data[:len(MAGIC)]) != MAGIC:
+		raise DecodeError("Not a serialized query")
+
+	try:
+		pos = len(MAGIC)
+		version = reader.data[pos]
+		if version != VERSION:
+			raise DecodeError("Unsupported version %s" % version)
+
+		flags = reader.data[pos + 1]
+		n, pos = reader.count(pos + 2)
+		items = []
+		for _ in range(n):
+			item, pos = reader.node(pos)
+			items.append(item)
+	except IndexError:
+		raise DecodeError("Unexpected end of data")
+
+	if pos != reader.length:
+		raise DecodeError("Unexpected data at position %s" % pos)
+
+	return Query(ConsumableIter(items), empty=bool(flags & FLAG_EMPTY))
+
+
+def node_to_json(node):
+	if isinstance(node, ConditionGroup):
+		return [GROUP_SYMBOL, node_to_json(node.item)]
+	if isinstance(node, Condition):
+		data = [condition_symbols[node_class(node)], value_to_json(node.left), value_to_json(node.right)]
+		if node.typed:
+			data.append(True)
+		return data
+	if isinstance(node, Operator):
+		return [operator_symbols[node_class(node)]] + [node_to_json(x) for x in node.operands]
+	raise ValueError("Unexpected item found in query: %s" % node)
+
+
+def value_to_json(value):
+	if isinstance(value, tuple):
+		return [value_to_json(x) for x in value]
+
+	encoded = encode_value(value)
+	if encoded is not None:
+		_, name, s = encoded
+		return {name: s}
+	return value
+
+
+def to_json_data(query):
+	return {
+		'version': VERSION,
+		'empty': bool(query.empty),
+		'query': [node_to_json(x) for x in query.query],
+	}
+
+
+def to_json(query):
+	return json.dumps(to_json_data(query), separators=(',', ':'))
+
+
+def node_from_json(data, depth=0):
+	if depth > MAX_DEPTH:
+		raise DecodeError("Query nested too deeply")
+	if not isinstance(data, list) or not data:
+		raise DecodeError("Invalid node: %r" % (data, ))
+
+	symbol = data[0]
+	if symbol == GROUP_SYMBOL and len(data) == 2:
+		return intern_node(ConditionGroup(node_from_json(data[1], depth + 1)))
+
+	cls = symbol_classes.get(symbol) if isinstance(symbol, (text_type, str)) else None
+	if cls is None:
+		raise DecodeError("Invalid node: %r" % (data, ))
+
+	if issubclass(cls, Condition):
+		if len(data) not in (3, 4) or (len(data) == 4 and not isinstance(data[3], bool)):
+			raise DecodeError("Invalid condition: %r" % (data, ))
+		return build_condition(cls, value_from_json(data[1]), value_from_json(data[2]), len(data) == 4 and data[3])
+
+	if len(data) < 3:
+		raise DecodeError("%s requires at least two operands" % cls.__name__)
+	return intern_node(cls(*[node_from_json(x, depth + 1) for x in data[1:]]))
+
+
+def value_from_json(value, depth=0):
+	if isinstance(value, list):
+		if depth >= MAX_DEPTH:
+			raise DecodeError("Value nested too deeply")
+		return tuple(value_from_json(x, depth + 1) for x in value)
+	if value is None or isinstance(value, (bool, float, text_type, str) + integer_types):
+		return value
+	if isinstance(value, dict) and len(value) == 1:
+		name, s = list(value.items())[0]
+		if name in string_encoded_names and isinstance(s, (text_type, str)):
+			return decode_value(string_encoded_names[name], s)
+	raise DecodeError("Invalid value: %r" % (value, ))
+
+
+def from_json_data(data):
+	if not isinstance(data, dict):
+		raise DecodeError("Not a serialized query")
+	if data.get('version') != VERSION:
+		raise DecodeError("Unsupported version %s" % data.get('version'))
+
+	items = data.get('query')
+	if not isinstance(items, list):
+		raise DecodeError("Not a serialized query")
+
+	return Query(ConsumableIter([node_from_json(x) for x in items]), empty=bool(data.get('empty', False)))
+
+
+def from_json(s):
+	try:
+		data = json.loads(s)
+	except ValueError as e:
+		raise DecodeError("Invalid JSON: %s" % e)
+	return from_json_data(data)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import time
+from collections import OrderedDict
+
+from phylter.backends.base import str_types
+
+timer = getattr(time, 'perf_counter', time.time)
+
+number_types = (int, float)
+
+
+def is_coerced(value, field_type):
+	# whether a literal was converted into something comparable with values of field_type
+	value_type = type(value)
+	if field_type is type(None) or value_type is field_type:
+		return True
+	if field_type in str_types and value_type in str_types:
+		return True
+	return field_type in number_types and value_type in number_types
+
+
+class NodeStats(object):
+
+	def __init__(self, node):
+		self.node = node
+		self.evaluations = 0
+		self.passed = 0
+		self.time = 0.0
+		self.coercion_failures = 0
+		self.errors = 0
+
+	@property
+	def pass_rate(self):
+		if not self.evaluations:
+			return None
+		return float(self.passed) / self.evaluations
+
+	def __repr__(self):  # pragma: nocover
+		return "<NodeStats %s: %s evaluations, %s passed, %.6fs>" % (self.node, self.evaluations, self.passed, self.time)
+
+
+class QueryStats(object):
+
+	def __init__(self, callbacks=None):
+		self.nodes = OrderedDict()
+		self.callbacks = list(callbacks or ())
+
+	def add_callback(self, callback):
+		self.callbacks.append(callback)
+
+	def get(self, node):
+		try:
+			return self.nodes[node]
+		except KeyError:
+			stats = self.nodes[node] = NodeStats(node)
+			return stats
+
+	def __iter__(self):
+		return iter(self.nodes.values())
+
+	def __getitem__(self, node):
+		return self.nodes[node]
+
+	def reset(self):
+		for node in list(self.nodes):
+			self.nodes[node] = NodeStats(node)
+
+	def instrument(self, node, predicate):
+		stats = self.get(node)
+		callbacks = self.callbacks
+
+		def instrumented(item):
+			start = timer()
+			try:
+				result = predicate(item)
+			except Exception:
+				stats.errors += 1
+				raise
+			elapsed = timer() - start
+
+			stats.evaluations += 1
+			stats.time += elapsed
+			if result:
+				stats.passed += 1
+
+			for callback in callbacks:
+				callback(stats, result, elapsed)
+			return result
+
+		return instrumented
+
+	def report(self):
+		lines = ["%-50s %10s %10s %10s %12s %10s" % ("node", "evaluated", "passed", "coercion", "time (s)", "errors")]
+		for stats in self:
+			node = str(stats.node)
+			if len(node) > 50:
+				node = node[:47] + "..."
+			lines.append("%-50s %10s %10s %10s %12.6f %10s" % (node, stats.evaluations, stats.passed,
+															   stats.coercion_failures, stats.time, stats.errors))
+		return "\n".join(lines)
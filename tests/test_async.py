@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import sys
+
+import pytest
+
+from phylter.conditions import EqualsCondition, GreaterThanCondition
+from phylter.query import Query
+
+if sys.version_info >= (3, 6):
+	import asyncio
+	from phylter.backends.async_backend import AsyncBackend, AsyncDjangoBackend, get_async_backend
+	from phylter.backends.objects import ObjectsBackend
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 6), reason='requires python 3.6')
+
+have_django = False
+try:
+	from django.db.models.manager import Manager
+	from django.db.models.query import QuerySet
+	have_django = True
+except ImportError:
+	have_django = False
+
+
+class AsyncIterable(object):
+
+	def __init__(self, items):
+		self.items = list(items)
+
+	def __aiter__(self):
+		return self
+
+	def __anext__(self):
+		return self.next_item()
+
+	def next_item(self):
+		if not self.items:
+			raise StopAsyncIteration()
+
+		future = asyncio.get_event_loop().create_future()
+		future.set_result(self.items.pop(0))
+		return future
+
+
+def collect(aiterable):
+	async_iterator = aiterable.__aiter__()
+	result = []
+
+	def step():
+		return async_iterator.__anext__()
+
+	loop = asyncio.new_event_loop()
+	try:
+		asyncio.set_event_loop(loop)
+		while True:
+			try:
+				result.append(loop.run_until_complete(step()))
+			except StopAsyncIteration:
+				return result
+	finally:
+		asyncio.set_event_loop(None)
+		loop.close()
+
+
+class Foo(object):
+	def __init__(self, a):
+		self.a = a
+
+
+class TestAsyncBackend(object):
+
+	def test_supports(self):
+		assert AsyncBackend.supports(AsyncIterable([]))
+		assert not AsyncBackend.supports([])
+
+	def test_get_async_backend(self):
+		assert isinstance(get_async_backend(AsyncIterable([])), AsyncBackend)
+		assert get_async_backend(AsyncIterable([]), ObjectsBackend).backend.__class__ == ObjectsBackend
+
+	def test_aapply(self):
+		query = Query([GreaterThanCondition('a', '2')])
+		items = [Foo(x) for x in range(5)]
+
+		assert collect(query.aapply(AsyncIterable(items))) == items[3:]
+
+	def test_aapply_mappings(self):
+		query = Query([EqualsCondition('a', '1')])
+		items = [{'a': x % 2} for x in range(5)]
+
+		assert collect(query.aapply(AsyncIterable(items))) == [items[1], items[3]]
+
+	def test_aapply_batches(self):
+		query = Query([GreaterThanCondition('a', '0')])
+		items = [Foo(x) for x in range(6)]
+
+		assert collect(query.aapply(AsyncIterable(items), batch_size=2)) == [items[1:3], items[3:5], items[5:]]
+
+	def test_aapply_empty(self):
+		assert collect(Query([], empty=True).aapply(AsyncIterable([Foo(1)]))) == []
+		assert collect(Query([EqualsCondition('a', '1')]).aapply(AsyncIterable([]))) == []
+
+
+@pytest.mark.skipif(not have_django, reason='Disable without django')
+class TestAsyncDjangoBackend(object):
+
+	def test_get_async_backend(self):
+		assert isinstance(get_async_backend(QuerySet()), AsyncDjangoBackend)
+		assert isinstance(get_async_backend(Manager()), AsyncDjangoBackend)
+
+	def test_iterate(self):
+		class FakeQuerySet(object):
+			def __aiter__(self):
+				return AsyncIterable([1, 2])
+
+		assert collect(AsyncDjangoBackend().iterate(FakeQuerySet())) == [1, 2]
@@ -1,13 +1,26 @@
 # -*- coding: utf-8 -*-
+import datetime
+import json
+import os
 import pytest
+import sqlite3
+import subprocess
 import sys
+from collections import namedtuple
 
-from phylter.backends import backends, get_backend
+from phylter import backends as backends_module
+from phylter.backends import dispatch_cache, get_backend, get_backends, register_backend
 from phylter.backends.base import Backend, str_types
-from phylter.backends.objects import ObjectsBackend
+from phylter.backends.dbapi import SQLBackend, SQLTable
+from phylter.backends.files import FileBackend, JSONLinesFile, CSVFile
+from phylter.backends.indexed import IndexedBackend, IndexedCollection, HashIndex, SortedIndex
+from phylter.backends.mapping import MappingBackend
+from phylter.backends.objects import ObjectsBackend, AdaptiveOperator
 from phylter.conditions import EqualsCondition, GreaterThanCondition, GreaterThanOrEqualCondition, LessThanCondition, \
-	LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup
+	LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup, InCondition, NotInCondition
+from phylter.parser import Parser
 from phylter.query import Query
+from phylter.schema import Schema
 
 have_django = False
 try:
@@ -19,21 +32,54 @@ try:
 except ImportError:
 	have_django = False
 
+have_numpy = False
+try:
+	import numpy
+	from phylter.backends.numpy_backend import NumpyBackend
+	have_numpy = True
+except ImportError:
+	have_numpy = False
+
+have_pandas = False
+try:
+	import pandas
+	from phylter.backends.pandas_backend import PandasBackend
+	have_pandas = True
+except ImportError:
+	have_pandas = False
+
 if sys.version_info.major == 2 or (sys.version_info.major == 3 and sys.version_info.minor <= 2):
-	from mock import Mock
+	from mock import Mock, MagicMock
 else:
-	from unittest.mock import Mock
+	from unittest.mock import Mock, MagicMock
 
 class TestBackends(object):
 
 	def test_objectbackend_exists(self):
+		backends = get_backends()
 		assert ObjectsBackend in backends
+		assert backends[-1] == ObjectsBackend
 
+		assert MappingBackend in backends
+		assert IndexedBackend in backends
+		assert SQLBackend in backends
+		assert FileBackend in backends
+		expected = 5
 		if have_django:
 			assert DjangoBackend in backends
-			assert len(backends) == 2
-		else:
-			assert len(backends) == 1
+			expected += 1
+		if have_numpy:
+			assert NumpyBackend in backends
+			expected += 1
+		if have_pandas:
+			assert PandasBackend in backends
+			expected += 1
+		assert len(backends) == expected
+
+		assert backends.index(SQLBackend) < backends.index(FileBackend) < backends.index(IndexedBackend) < \
+			backends.index(MappingBackend)
+		if have_pandas:
+			assert backends.index(PandasBackend) < backends.index(NumpyBackend) < backends.index(SQLBackend)
 
 	def test_get_backend(self):
 		class Foo(object):
@@ -42,6 +88,75 @@ class TestBackends(object):
 		be = get_backend(Foo())
 		assert isinstance(be, ObjectsBackend)
 
+	def test_dispatch_cache(self):
+		class Foo(object):
+			pass
+
+		assert get_backend(Foo()) is get_backend(Foo())
+		assert dispatch_cache[Foo] is get_backend(Foo())
+
+		# the backend of lists depends on their items
+		assert isinstance(get_backend([{'a': 1}]), MappingBackend)
+		assert isinstance(get_backend([Foo()]), ObjectsBackend)
+		assert list not in dispatch_cache
+
+	def test_register_backend(self, monkeypatch):
+		class Foo(object):
+			pass
+
+		class FooBackend(Backend):
+			@staticmethod
+			def supports(o):
+				return isinstance(o, Foo)
+
+		monkeypatch.setattr(backends_module, 'backends', list(get_backends()))
+		assert isinstance(get_backend(Foo()), ObjectsBackend)
+
+		register_backend(FooBackend)
+		assert backends_module.backends.index(FooBackend) == backends_module.backends.index(MappingBackend) - 1
+		assert isinstance(get_backend(Foo()), FooBackend)
+		assert Foo not in dispatch_cache  # FooBackend doesn't implement supports_type
+
+		backends_module.clear_caches()
+
+	def test_entry_points(self, monkeypatch):
+		class BarBackend(Backend):
+			@staticmethod
+			def supports(o):
+				return o == 'bar'
+
+			@classmethod
+			def supports_type(cls, t):
+				return None if t is str else False
+
+		class EntryPoint(object):
+			def __init__(self, obj):
+				self.obj = obj
+
+			def load(self):
+				if self.obj is None:
+					raise ImportError()
+				return self.obj
+
+		monkeypatch.setattr(backends_module, 'backends', list(get_backends()))
+		monkeypatch.setattr(backends_module, 'entry_points_loaded', False)
+		monkeypatch.setattr(backends_module, 'iter_entry_points', lambda: [EntryPoint(None), EntryPoint(BarBackend)])
+		backends_module.clear_caches()
+
+		assert isinstance(get_backend('bar'), BarBackend)
+		assert isinstance(get_backend('foo'), ObjectsBackend)
+		assert str not in dispatch_cache
+		assert isinstance(get_backend(1), ObjectsBackend)
+		assert int in dispatch_cache
+
+		backends_module.clear_caches()
+
+	def test_lazy_imports(self):
+		code = "import sys, phylter.parser, phylter.query; " \
+			"print(','.join(m for m in ('django', 'pandas', 'numpy', 'pyparsing') if m in sys.modules))"
+		env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+		assert subprocess.check_output([sys.executable, '-c', code], env=env).strip() == b''
+
 	@pytest.mark.skipif(sys.version_info >= (3, 0), reason="requires python 2")
 	def test_str_types_py2(self):
 		assert str_types == (str, unicode, bytes)
@@ -137,6 +252,631 @@ class TestObjectBackend(object):
 		assert list(ob.apply(query, [Foo()])) == [Foo()]
 		assert list(query.apply([Foo()])) == [Foo()]
 
+	def test_compile(self):
+		class Foo(object):
+			def __init__(self, a, b):
+				self.a = a
+				self.b = b
+
+		query = Query([OrOperator(EqualsCondition('a', "'x'"), ConditionGroup(
+			AndOperator(GreaterThanCondition('b', '1'), LessThanOrEqualCondition('b', '2.5'))
+		))])
+		predicate = query.compile()
+
+		assert query.compile() is predicate # compiled once per backend
+		assert predicate(Foo('x', 0))
+		assert predicate(Foo('y', 2))
+		assert predicate(Foo('y', 2.5))
+		assert not predicate(Foo('y', 1))
+		assert not predicate(Foo('y', 3))
+
+	def test_nested_attributes(self):
+		class Address(object):
+			city = 'Berlin'
+
+		class User(object):
+			address = Address()
+
+		class Foo(object):
+			user = User()
+
+		assert Query([EqualsCondition('user.address.city', "'Berlin'")]).compile()(Foo())
+		assert not Query([EqualsCondition('user.address.city', "'Paris'")]).compile()(Foo())
+
+	def test_membership(self):
+		class Foo(object):
+			def __init__(self, a):
+				self.a = a
+
+		items = [Foo(1), Foo('x'), Foo(2.5), Foo(None)]
+		query = Query([InCondition('a', ('1', "'x'"))])
+		assert list(query.apply(items)) == items[:2]
+		assert list(Query([NotInCondition('a', ('1', "'x'"))]).apply(items)) == [items[2]]
+		assert list(Query([InCondition('a', (1, 2.5), typed=True)]).apply(items)) == [items[0], items[2]]
+
+	def test_not_in_missing(self):
+		class Foo(object):
+			def __init__(self, a):
+				self.a = a
+
+		items = [Foo(1), Foo(None), Foo(float('nan')), Foo(3)]
+		assert list(Query([NotInCondition('a', ('1', ))]).apply(items)) == [items[3]]
+		assert list(Query([InCondition('a', ('1', ))]).apply(items)) == [items[0]]
+
+	def test_compile_multiple_toplevel(self):
+		class Foo(object):
+			a = 1
+			b = 2
+
+		ob = ObjectsBackend()
+		assert ob.matches(Query([EqualsCondition('a', '1'), EqualsCondition('b', '2')]), Foo())
+		assert not ob.matches(Query([EqualsCondition('a', '1'), EqualsCondition('b', '3')]), Foo())
+
+	def test_terminal_operations(self):
+		consumed = []
+
+		def items():
+			for i in range(10):
+				consumed.append(i)
+				yield Item('name%s' % i, i % 3)
+
+		query = Query([EqualsCondition('age', '1')])
+
+		assert [x.name for x in query.apply(items(), backend=ObjectsBackend, limit=2)] == ['name1', 'name4']
+		assert consumed == [0, 1, 2, 3, 4]
+
+		del consumed[:]
+		assert query.first(items()).name == 'name1'
+		assert consumed == [0, 1]
+
+		del consumed[:]
+		assert query.exists(items())
+		assert consumed == [0, 1]
+
+		assert query.count(items()) == 3
+		assert not Query([EqualsCondition('age', '5')]).exists(items())
+		assert Query([EqualsCondition('age', '5')]).first(items()) is None
+
+		empty = Query([], empty=True)
+		assert empty.first(items()) is None
+		assert not empty.exists(items())
+		assert empty.count(items()) == 0
+		assert list(empty.apply(items(), limit=1)) == []
+
+
+class TestAdaptiveOperator(object):
+
+	def get_predicates(self, calls):
+		def always(item):
+			calls.append('always')
+			return True
+
+		def rarely(item):
+			calls.append('rarely')
+			return item % 10 == 0
+
+		return always, rarely
+
+	def test_and(self):
+		calls = []
+		always, rarely = self.get_predicates(calls)
+		op = AdaptiveOperator([always, rarely], True, sample_size=20)
+
+		assert [x for x in range(20) if op(x)] == [0, 10]
+		assert len(calls) == 40 # all operands are evaluated while sampling
+		assert op.predicates == [rarely, always]
+
+		del calls[:]
+		assert [x for x in range(20, 40) if op(x)] == [20, 30]
+		assert calls.count('rarely') == 20
+		assert calls.count('always') == 2
+
+	def test_or(self):
+		calls = []
+		always, rarely = self.get_predicates(calls)
+		op = AdaptiveOperator([rarely, always], False, sample_size=5)
+
+		assert all(op(x) for x in range(10))
+		assert op.predicates == [always, rarely]
+
+	def test_exceptions(self):
+		def fails(item):
+			raise AttributeError()
+
+		op = AdaptiveOperator([lambda item: False, fails], True, sample_size=5)
+		assert not op(1) # short-circuiting would never evaluate the failing operand
+
+		op = AdaptiveOperator([lambda item: True, fails], True, sample_size=5)
+		with pytest.raises(AttributeError):
+			op(1)
+
+	def test_resample(self):
+		op = AdaptiveOperator([lambda item: item > 5, lambda item: item < 5], True, sample_size=3, resample_interval=4)
+
+		for x in range(7):
+			op(x)
+		assert op.evaluate == op.sample
+
+	def test_apply(self):
+		class Foo(object):
+			def __init__(self, a):
+				self.a = a
+
+		items = [Foo(x % 7) for x in range(100)]
+		query = Query([AndOperator(GreaterThanCondition('a', '1'), EqualsCondition('a', '3'))])
+
+		assert query.compile(ObjectsBackend(adaptive=True)) is not query.compile(ObjectsBackend(adaptive=True))
+		assert list(query.apply(items, adaptive=True, sample_size=10)) == list(query.apply(items))
+		assert list(query.apply(items, backend=ObjectsBackend, adaptive=True)) == list(query.apply(items))
+
+		# options configure a new backend and can't be applied to an instance
+		for f in (query.apply, query.first, query.exists, query.count):
+			with pytest.raises(TypeError):
+				f(items, backend=ObjectsBackend(), adaptive=True)
+		with pytest.raises(TypeError):
+			query.apply(items, backend=ObjectsBackend(), stats=None)
+
+
+class TestMappingBackend(object):
+
+	def test_supports(self):
+		Row = namedtuple('Row', ('a', 'b'))
+
+		assert MappingBackend.supports([{'a': 1}])
+		assert MappingBackend.supports(({'a': 1}, ))
+		assert MappingBackend.supports([Row(1, 2)])
+		assert not MappingBackend.supports([])
+		assert not MappingBackend.supports([(1, 2)])
+		assert not MappingBackend.supports([object()])
+		assert not MappingBackend.supports({'a': 1})
+
+	def test_get_backend(self):
+		assert isinstance(get_backend([{'a': 1}]), MappingBackend)
+
+	def test_apply_mappings(self):
+		query = Query([OrOperator(EqualsCondition('a', '1'), GreaterThanCondition('b', '2'))])
+		rows = [{'a': 1, 'b': 1}, {'a': 2, 'b': 2}, {'a': 2, 'b': 3}]
+
+		assert list(query.apply(rows)) == [rows[0], rows[2]]
+		assert list(query.apply(iter(rows), backend=MappingBackend)) == [rows[0], rows[2]]
+		assert list(query.apply(iter([]), backend=MappingBackend)) == []
+
+		with pytest.raises(KeyError):
+			list(query.apply([{'b': 1}]))
+
+	def test_apply_membership(self):
+		rows = [{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'y'}, {'a': 3, 'b': 'z'}]
+
+		assert list(Query([InCondition('a', ('1', '3'))]).apply(rows)) == [rows[0], rows[2]]
+		assert list(Query([NotInCondition('b', ("'x'", 'z'))]).apply(rows)) == [rows[1]]
+
+		rows = [{'a': 1}, {'a': None}, {'a': 3}]
+		assert list(Query([NotInCondition('a', ('1', ))]).apply(rows)) == [rows[2]]
+
+	def test_apply_namedtuples(self):
+		Row = namedtuple('Row', ('a', 'b'))
+		query = Query([EqualsCondition('b', "'x'")])
+		rows = [Row(1, 'x'), Row(2, 'y')]
+
+		assert list(query.apply(rows)) == [rows[0]]
+		assert query.compile(MappingBackend(Row._fields))(rows[0])
+
+		with pytest.raises(AttributeError):
+			list(Query([EqualsCondition('c', '1')]).apply(rows))
+
+	def test_apply_nested(self):
+		rows = [{'user': {'address': {'city': 'Berlin'}, 'age': 30}}, {'user': {'address': {'city': 'Paris'}, 'age': 40}}]
+
+		assert list(Query([EqualsCondition('user.address.city', "'Paris'")]).apply(rows)) == [rows[1]]
+		assert list(Query([GreaterThanCondition('user.age', '35')]).apply(rows)) == [rows[1]]
+
+		Address = namedtuple('Address', ('city', ))
+		Row = namedtuple('Row', ('id', 'address'))
+		rows = [Row(1, Address('Berlin')), Row(2, Address('Paris'))]
+		assert list(Query([EqualsCondition('address.city', "'Berlin'")]).apply(rows)) == [rows[0]]
+
+
+class Item(object):
+	def __init__(self, name, age):
+		self.name = name
+		self.age = age
+
+	def __repr__(self):  # pragma: nocover
+		return "Item(%r, %r)" % (self.name, self.age)
+
+
+class TestIndexedBackend(object):
+
+	def get_collection(self, **kwargs):
+		items = [Item('a', 10), Item('b', 20), Item('c', 30), Item('a', 40), Item('d', 20)]
+		return items, IndexedCollection(items, **kwargs)
+
+	def test_supports(self):
+		assert IndexedBackend.supports(IndexedCollection())
+		assert not IndexedBackend.supports([])
+
+	def test_get_backend(self):
+		assert isinstance(get_backend(IndexedCollection()), IndexedBackend)
+
+	def test_hash_index(self):
+		index = HashIndex()
+		index.add(1, 'x')
+		index.add('1', 'y')
+		index.add(2, 'z')
+		ob = ObjectsBackend()
+
+		assert index.lookup(EqualsCondition('f', '1'), ob.get_compatible_value) == set(['x', 'y'])
+		assert index.lookup(EqualsCondition('f', "'1'"), ob.get_compatible_value) == set(['y'])
+		assert index.lookup(GreaterThanCondition('f', '1'), ob.get_compatible_value) is None
+
+		assert index.lookup(InCondition('f', ('1', '2')), ob.get_compatible_value) == set(['x', 'y', 'z'])
+		assert index.lookup(NotInCondition('f', ('1', )), ob.get_compatible_value) is None
+
+		index.remove(1, 'x')
+		assert index.lookup(EqualsCondition('f', '1'), ob.get_compatible_value) == set(['y'])
+
+	def test_sorted_index(self):
+		index = SortedIndex()
+		for i, v in enumerate((5, 1, 3, 3, 9)):
+			index.add(v, i)
+		coerce = ObjectsBackend().get_compatible_value
+
+		assert index.lookup(EqualsCondition('f', '3'), coerce) == set([2, 3])
+		assert index.lookup(GreaterThanCondition('f', '3'), coerce) == set([0, 4])
+		assert index.lookup(GreaterThanOrEqualCondition('f', '3'), coerce) == set([0, 2, 3, 4])
+		assert index.lookup(LessThanCondition('f', '3'), coerce) == set([1])
+		assert index.lookup(LessThanOrEqualCondition('f', '3'), coerce) == set([1, 2, 3])
+		assert index.lookup(GreaterThanCondition('f', "'x'"), coerce) is None
+		assert index.lookup(InCondition('f', ('3', '9', '4')), coerce) == set([2, 3, 4])
+		assert index.lookup(NotInCondition('f', ('3', )), coerce) is None
+
+		index.remove(3, 3)
+		assert index.lookup(EqualsCondition('f', '3'), coerce) == set([2])
+
+	def test_sorted_index_extend(self):
+		pairs = [(5, 0), (1, 1), (3, 2), (None, 3), (3, 4), ('b', 5), (float('nan'), 6), ('a', 7)]
+		added, extended = SortedIndex(), SortedIndex()
+		for value, key in pairs:
+			added.add(value, key)
+		extended.extend(pairs[:4])
+		extended.extend(pairs[4:])
+
+		assert extended.values == added.values
+		assert extended.values[int] == ([1, 3, 3, 5], [1, 2, 4, 0])
+		assert sorted(extended.unordered) == [3, 6]
+
+	def test_sorted_index_unorderable(self):
+		index = SortedIndex()
+		for i, v in enumerate((None, 3, None, float('nan'), 1)):
+			index.add(v, i)
+		coerce = ObjectsBackend().get_compatible_value
+
+		assert index.lookup(GreaterThanCondition('f', '0'), coerce) == set([1, 4])
+		assert index.lookup(LessThanOrEqualCondition('f', '3'), coerce) == set([1, 4])
+		assert index.lookup(EqualsCondition('f', '3'), coerce) == set([1])
+		assert index.lookup(InCondition('f', ('1', '9')), coerce) == set([4])
+
+		index.remove(None, 0)
+		assert index.unordered == {2: None, 3: index.unordered[3]}
+
+	def test_nullable_field(self):
+		items = [Item('a', None), Item('b', 20), Item('c', None), Item('d', 10)]
+		c = IndexedCollection(items, sorted_indexes=('age', ))
+
+		assert list(Query([GreaterThanCondition('age', '5')]).apply(c)) == [items[1], items[3]]
+		assert list(Query([EqualsCondition('age', '20')]).apply(c)) == [items[1]]
+		c.remove(items[0])
+		assert len(c) == 3
+
+	def test_candidates(self):
+		items, c = self.get_collection(hash_indexes=('name', ), sorted_indexes=('age', ))
+
+		assert c.candidates(EqualsCondition('name', "'a'")) == set([0, 3])
+		assert c.candidates(GreaterThanCondition('name', "'a'")) is None
+		assert c.candidates(GreaterThanCondition('age', "20")) == set([2, 3])
+		assert c.candidates(AndOperator(EqualsCondition('name', "'a'"), GreaterThanCondition('age', "20"))) == set([3])
+		assert c.candidates(OrOperator(EqualsCondition('name', "'b'"), GreaterThanCondition('age', "30"))) == set([1, 3])
+		assert c.candidates(OrOperator(EqualsCondition('name', "'b'"), GreaterThanCondition('name', "'x'"))) is None
+		assert c.candidates(ConditionGroup(EqualsCondition('name', "'b'"))) == set([1])
+
+	def test_apply(self):
+		for kwargs in ({}, {'hash_indexes': ('name', )}, {'hash_indexes': ('name', ), 'sorted_indexes': ('age', )}):
+			items, c = self.get_collection(**kwargs)
+
+			for query, expected in (
+				(Query([EqualsCondition('name', "'a'")]), [0, 3]),
+				(Query([EqualsCondition('age', "20")]), [1, 4]),
+				(Query([AndOperator(EqualsCondition('name', "'a'"), LessThanCondition('age', "20"))]), [0]),
+				(Query([OrOperator(EqualsCondition('name', "'c'"), LessThanCondition('age', "20"))]), [0, 2]),
+				(Query([OrOperator(EqualsCondition('name', "'c'"), GreaterThanCondition('name', "'c'"))]), [2, 4]),
+				(Query([InCondition('name', ("'b'", "'d'"))]), [1, 4]),
+				(Query([AndOperator(InCondition('age', ('20', '30')), NotInCondition('name', ("'d'", )))]), [1, 2]),
+			):
+				assert list(query.apply(c)) == [items[i] for i in expected]
+
+	def test_extend(self):
+		items, c = self.get_collection(hash_indexes=('name', ), sorted_indexes=('age', ))
+		assert c.extend([Item('e', 15), Item('a', 50)]) == [5, 6]
+		assert [x.age for x in Query([EqualsCondition('name', "'a'")]).apply(c)] == [10, 40, 50]
+		assert [x.name for x in Query([LessThanCondition('age', '20')]).apply(c)] == ['a', 'e']
+
+	def test_add_remove(self):
+		items, c = self.get_collection(hash_indexes=('name', ), sorted_indexes=('age', ))
+		query = Query([EqualsCondition('name', "'a'")])
+
+		c.remove(items[0])
+		new = Item('a', 1)
+		c.add(new)
+
+		assert len(c) == 5
+		assert list(query.apply(c)) == [items[3], new]
+		assert list(Query([LessThanCondition('age', '15')]).apply(c)) == [new]
+
+		with pytest.raises(ValueError):
+			c.remove(items[0])
+
+	def test_update(self):
+		items, c = self.get_collection(hash_indexes=('name', ), sorted_indexes=('age', ))
+		items[0].name, items[0].age = 'x', 50
+
+		# the indexes still hold the values the item had when it was added
+		assert list(Query([EqualsCondition('name', "'x'")]).apply(c)) == []
+		c.update(items[0])
+		assert list(Query([EqualsCondition('name', "'x'")]).apply(c)) == [items[0]]
+		assert list(Query([GreaterThanCondition('age', '45')]).apply(c)) == [items[0]]
+		assert list(Query([EqualsCondition('name', "'a'")]).apply(c)) == [items[3]]
+
+		with pytest.raises(ValueError):
+			c.update(Item('y', 1))
+
+	def test_remove_changed_item(self):
+		items, c = self.get_collection(hash_indexes=('name', ), sorted_indexes=('age', ))
+		items[1].age = 99
+		c.remove(items[1])
+
+		assert len(c) == 4
+		assert list(Query([EqualsCondition('age', '20')]).apply(c)) == [items[4]]
+
+	def test_mappings(self):
+		rows = [{'a': 1}, {'a': 2}]
+		c = IndexedCollection(rows, hash_indexes=('a', ), backend=MappingBackend)
+		assert list(Query([EqualsCondition('a', '2')]).apply(c)) == [rows[1]]
+
+
+class TestSQLBackend(object):
+
+	def get_table(self, tmpdir, **kwargs):
+		connection = sqlite3.connect(str(tmpdir.join('test.db')))
+		connection.execute('CREATE TABLE person (name TEXT, "the age" INTEGER, secret TEXT)')
+		connection.executemany('INSERT INTO person VALUES (?, ?, ?)', [
+			('Alice', 30, 'x'), ('Bob', 20, 'y'), ('Carol', 40, 'z'), ("O'Brien", 20, 'w'),
+		])
+		connection.commit()
+
+		kwargs.setdefault('fields', {'name': 'name', 'age': 'the age'})
+		return SQLTable(connection, 'person', **kwargs)
+
+	def test_supports(self, tmpdir):
+		table = self.get_table(tmpdir)
+		assert SQLBackend.supports(table)
+		assert not SQLBackend.supports([])
+		assert isinstance(get_backend(table), SQLBackend)
+
+	def test_table(self, tmpdir):
+		with pytest.raises(ValueError):
+			self.get_table(tmpdir, paramstyle='foo')
+
+		assert SQLTable(None, 't', ['a', 'b']).fields == {'a': 'a', 'b': 'b'}
+
+	def test_to_sql(self, tmpdir):
+		table = self.get_table(tmpdir, columns=('name', ))
+		sb = SQLBackend()
+
+		query = Query([OrOperator(EqualsCondition('name', "'Bob'"), ConditionGroup(
+			AndOperator(GreaterThanCondition('age', '25'), LessThanOrEqualCondition('age', '35.5'))))])
+		sql, params = sb.to_sql(query, table)
+
+		assert sql == 'SELECT "name" FROM "person" WHERE ("name" = ? OR ("the age" > ? AND "the age" <= ?))'
+		assert params == ('Bob', '25', '35.5')
+
+		assert sb.to_sql(query, table) == (sql, params)
+		assert table.sql_cache.hits == 1
+
+		with pytest.raises(ValueError):
+			sb.to_sql(Query([EqualsCondition('secret', "'x'")]), table)
+
+	def test_not_in_missing(self, tmpdir):
+		table = self.get_table(tmpdir, columns=('name', ))
+		table.connection.execute("INSERT INTO person VALUES ('Dave', NULL, 'v')")
+
+		assert list(Query([NotInCondition('age', ('20', '40'))]).apply(table)) == [('Alice', )]
+		assert list(Query([InCondition('age', ('20', '40'))]).apply(table)) == [('Bob', ), ('Carol', ), ("O'Brien", )]
+
+	def test_membership(self, tmpdir):
+		table = self.get_table(tmpdir, columns=('name', ))
+		query = Query([InCondition('age', ('20', '40')), NotInCondition('name', ("'Bob'", ))])
+
+		assert SQLBackend().to_sql(query, table) == (
+			'SELECT "name" FROM "person" WHERE "the age" IN (?, ?) AND "name" NOT IN (?)', ('20', '40', 'Bob'))
+		assert list(query.apply(table)) == [('Carol', ), ("O'Brien", )]
+		assert list(Query([InCondition('age', (30, ), typed=True)]).apply(table)) == [('Alice', )]
+
+	def test_paramstyles(self):
+		query = Query([EqualsCondition('name', "'Bob'"), EqualsCondition('age', '20')])
+
+		for paramstyle, where, params in (
+			('format', '"name" = %s AND "the age" = %s', ('Bob', '20')),
+			('numeric', '"name" = :1 AND "the age" = :2', ('Bob', '20')),
+			('named', '"name" = :p0 AND "the age" = :p1', {'p0': 'Bob', 'p1': '20'}),
+			('pyformat', '"name" = %(p0)s AND "the age" = %(p1)s', {'p0': 'Bob', 'p1': '20'}),
+		):
+			table = SQLTable(None, 'person', {'name': 'name', 'age': 'the age'}, paramstyle=paramstyle)
+			assert SQLBackend().to_sql(query, table) == ('SELECT * FROM "person" WHERE %s' % where, params)
+
+	def test_apply(self, tmpdir):
+		table = self.get_table(tmpdir, columns=('name', ), batch_size=1)
+
+		assert list(Query([EqualsCondition('age', '20')]).apply(table)) == [('Bob', ), ("O'Brien", )]
+		assert list(Query([EqualsCondition('name', "\"O'Brien\"")]).apply(table)) == [("O'Brien", )]
+		assert list(Query([OrOperator(GreaterThanCondition('age', '35'), EqualsCondition('name', 'Alice'))]).apply(table)) == \
+			[('Alice', ), ('Carol', )]
+		assert list(Query([], empty=True).apply(table)) == []
+
+	def test_column_affinity(self, tmpdir):
+		connection = sqlite3.connect(str(tmpdir.join('zip.db')))
+		connection.execute('CREATE TABLE address (zip TEXT, n INTEGER)')
+		connection.executemany('INSERT INTO address VALUES (?, ?)', [('01234', 9), ('1234', 10)])
+		table = SQLTable(connection, 'address', ['zip', 'n'])
+
+		# untyped literals are bound as strings and converted by the database
+		assert list(Query([EqualsCondition('zip', '01234')]).apply(table)) == [('01234', 9)]
+		assert list(Query([GreaterThanCondition('n', '9')]).apply(table)) == [('1234', 10)]
+
+	def test_typed(self, tmpdir):
+		table = self.get_table(tmpdir, columns=('name', ))
+		query = Query([EqualsCondition('name', '20', typed=True), EqualsCondition('age', 20, typed=True)])
+
+		assert SQLBackend().to_sql(query, table)[1] == ('20', 20)
+		assert list(Query([EqualsCondition('age', 20, typed=True)]).apply(table)) == [('Bob', ), ("O'Brien", )]
+
+	def test_terminal_operations(self, tmpdir):
+		table = self.get_table(tmpdir, columns=('name', ))
+		query = Query([LessThanCondition('age', '35')])
+
+		assert SQLBackend().to_sql(query, table, limit=1)[0] == 'SELECT "name" FROM "person" WHERE "the age" < ? LIMIT 1'
+		assert SQLBackend().to_sql(query, table, select="COUNT(*)")[0] == \
+			'SELECT COUNT(*) FROM "person" WHERE "the age" < ?'
+
+		assert list(query.apply(table, limit=2)) == [('Alice', ), ('Bob', )]
+		assert query.first(table) == ('Alice', )
+		assert query.exists(table)
+		assert query.count(table) == 3
+
+		query = Query([GreaterThanCondition('age', '50')])
+		assert query.first(table) is None
+		assert not query.exists(table)
+		assert query.count(table) == 0
+
+
+class TestFileBackend(object):
+
+	def get_rows(self):
+		return [
+			{'name': 'Alice', 'city': 'Berlin', 'age': 30},
+			{'name': 'Bob', 'city': 'Hamburg', 'age': 20},
+			{'name': 'Carol', 'city': 'Berlin', 'age': 40},
+			{'name': 'B\u00e4rbel', 'city': 'K\u00f6ln', 'age': 50},
+		]
+
+	def get_jsonl(self, tmpdir, **kwargs):
+		path = tmpdir.join('data.jsonl')
+		path.write('\n'.join(json.dumps(r) for r in self.get_rows()) + '\n\n')
+		return JSONLinesFile(str(path), **kwargs)
+
+	def get_csv(self, tmpdir, **kwargs):
+		path = tmpdir.join('data.csv')
+		lines = [u'name,city,age'] + [u'%(name)s,"%(city)s",%(age)s' % r for r in self.get_rows()]
+		path.write_text(u'\r\n'.join(lines) + u'\r\n', 'utf-8')
+		return CSVFile(str(path), **kwargs)
+
+	def test_supports(self, tmpdir):
+		assert FileBackend.supports(self.get_jsonl(tmpdir))
+		assert FileBackend.supports(CSVFile('foo.csv'))
+		assert not FileBackend.supports('foo.csv')
+		assert isinstance(get_backend(self.get_jsonl(tmpdir)), FileBackend)
+
+	def test_needles(self):
+		fb = FileBackend()
+
+		assert fb.get_needles(EqualsCondition('a', "'x'")) == [('x', )]
+		assert fb.get_needles(EqualsCondition('a', "x")) == [('x', )]
+		assert fb.get_needles(EqualsCondition('a', "10")) == []
+		assert fb.get_needles(EqualsCondition('a', "'a\"b'")) == []
+		assert fb.get_needles(EqualsCondition('a', "'a/b'")) == []
+		assert fb.get_needles(EqualsCondition('a', "''")) == []
+		assert fb.get_needles(GreaterThanCondition('a', "'x'")) == []
+		assert fb.get_needles(AndOperator(EqualsCondition('a', "'x'"), ConditionGroup(EqualsCondition('b', "'y'")))) == \
+			[('x', ), ('y', )]
+		assert fb.get_needles(OrOperator(EqualsCondition('a', "'y'"), EqualsCondition('b', "'x'"))) == [('x', 'y')]
+		assert fb.get_needles(OrOperator(EqualsCondition('a', "'x'"), GreaterThanCondition('b', "1"))) == []
+		assert fb.get_needles(InCondition('a', ("'y'", 'x', "'x'"))) == [('x', 'y')]
+		assert fb.get_needles(InCondition('a', ("'y'", '1'))) == []
+		assert fb.get_needles(NotInCondition('a', ("'y'", ))) == []
+
+	def test_apply_jsonl(self, tmpdir):
+		rows = self.get_rows()
+		source = self.get_jsonl(tmpdir)
+
+		for query, expected in (
+			(Query([EqualsCondition('city', "'Berlin'")]), [0, 2]),
+			(Query([EqualsCondition('city', "'Berlin'"), GreaterThanCondition('age', "35")]), [2]),
+			(Query([OrOperator(EqualsCondition('name', "'Bob'"), EqualsCondition('name', "Carol"))]), [1, 2]),
+			(Query([GreaterThanCondition('age', "25")]), [0, 2, 3]),
+			(Query([EqualsCondition('city', u"'K\u00f6ln'")]), [3]),
+			(Query([EqualsCondition('city', "'Paris'")]), []),
+		):
+			assert list(query.apply(source)) == [rows[i] for i in expected]
+
+	def test_apply_raw(self, tmpdir):
+		source = self.get_jsonl(tmpdir, raw=True)
+		ranges = list(Query([EqualsCondition('name', "'Bob'")]).apply(source))
+
+		assert len(ranges) == 1
+		with open(source.path, 'rb') as f:
+			data = f.read()
+		start, end = ranges[0]
+		assert json.loads(data[start:end].decode('utf-8')) == self.get_rows()[1]
+
+	def test_apply_csv(self, tmpdir):
+		source = self.get_csv(tmpdir)
+
+		assert [r['name'] for r in Query([EqualsCondition('city', "'Berlin'")]).apply(source)] == ['Alice', 'Carol']
+		assert [r['name'] for r in Query([EqualsCondition('age', "20")]).apply(source)] == ['Bob']
+		assert [r['name'] for r in Query([EqualsCondition('city', u"'K\u00f6ln'")]).apply(source)] == [u'B\u00e4rbel']
+
+	def test_apply_csv_twice(self, tmpdir):
+		path = tmpdir.join('data.csv')
+		path.write('name,age\nbob,10\nalice,20')
+		query = Query([GreaterThanCondition('age', '15')])
+
+		for source in (CSVFile(str(path)), CSVFile(str(path), converters={'age': int})):
+			first = list(query.apply(source))
+			assert [r['name'] for r in first] == ['alice']
+			assert list(query.apply(source)) == first
+			assert query.count(source) == 1
+			assert source.fieldnames is None
+
+	def test_apply_csv_fieldnames(self, tmpdir):
+		path = tmpdir.join('data.csv')
+		path.write('Alice;30\nBob;20')
+		source = CSVFile(str(path), delimiter=';', fieldnames=['name', 'age'])
+
+		assert list(Query([EqualsCondition('name', "Bob")]).apply(source)) == [{'name': 'Bob', 'age': '20'}]
+
+	def test_apply_csv_converters(self, tmpdir):
+		path = tmpdir.join('data.csv')
+		path.write('name,n\nx,10\ny,9\n')
+
+		# without converters the cells are strings which compare lexicographically
+		assert [r['name'] for r in Query([GreaterThanCondition('n', '5')]).apply(CSVFile(str(path)))] == ['y']
+
+		source = CSVFile(str(path), converters={'n': int})
+		assert [r['name'] for r in Query([GreaterThanCondition('n', '5')]).apply(source)] == ['x', 'y']
+
+		schema = Schema({'name': str, 'n': int})
+		query = Parser(schema=schema).parse("n > 5 and name in ('x', 'z')")
+		assert [r['name'] for r in query.apply(CSVFile(str(path), converters=schema))] == ['x']
+
+		# empty cells of converted fields are missing values
+		path.write('name,n\nx,10\nz,\n')
+		source = CSVFile(str(path), converters=schema)
+		assert list(Query([EqualsCondition('name', "'z'")]).apply(source)) == [{'name': 'z', 'n': None}]
+
+	def test_apply_empty_file(self, tmpdir):
+		path = tmpdir.join('empty.jsonl')
+		path.write('')
+		assert list(Query([EqualsCondition('name', "Bob")]).apply(JSONLinesFile(str(path)))) == []
+
 
 @pytest.mark.skipif(not have_django, reason='Disable without django')
 class TestDjangoBackend(object):
@@ -174,6 +914,68 @@ class TestDjangoBackend(object):
 		with pytest.raises(Exception):
 			db.to_q(False)
 
+	def test_to_q_paths(self):
+		db = DjangoBackend()
+
+		assert db.to_q(EqualsCondition('user.address.city', "'x'")).children == [('user__address__city', 'x')]
+		q = db.to_q(OrOperator(EqualsCondition('a.b', 1), EqualsCondition('a.b', 2)))
+		assert q.children[0].children == [('a__b__in', [1, 2])]
+		q = db.to_q(AndOperator(GreaterThanOrEqualCondition('a.b', 1), LessThanOrEqualCondition('a.b', 2)))
+		assert q.children[0].children == [('a__b__range', (1, 2))]
+
+	def test_to_q_typed(self):
+		db = DjangoBackend()
+
+		assert db.to_q(EqualsCondition('a', "'x'")).children == [('a', 'x')]
+		assert db.to_q(EqualsCondition('a', "'x'", typed=True)).children == [('a', "'x'")]
+
+	def test_to_q_in(self):
+		db = DjangoBackend()
+
+		q = db.to_q(OrOperator(EqualsCondition('a', '1'), EqualsCondition('b', '2'), EqualsCondition('a', "'x'"),
+							   GreaterThanCondition('a', '5'), EqualsCondition('a', '3')))
+		assert q.connector == 'OR'
+		assert len(q.children) == 3
+		assert q.children[0].children == [('a__in', ['1', 'x', '3'])]
+		assert q.children[1].children == [('b', '2')]
+		assert q.children[2].children == [('a__gt', '5')]
+
+	def test_to_q_membership(self):
+		db = DjangoBackend()
+
+		assert db.to_q(InCondition('a.b', ('1', "'x'"))).children == [('a__b__in', ('1', 'x'))]
+		assert db.to_q(InCondition('a', (1, 2), typed=True)).children == [('a__in', (1, 2))]
+
+		q = db.to_q(NotInCondition('a.b', ("'x'", )))
+		assert not q.negated
+		assert q.children[0] == ('a__b__isnull', False)
+		assert q.children[1].negated
+		assert q.children[1].children == [('a__b__in', ('x', ))]
+
+	def test_to_q_range(self):
+		db = DjangoBackend()
+
+		q = db.to_q(AndOperator(EqualsCondition('b', '2'), LessThanOrEqualCondition('a', '9'), ConditionGroup(
+			EqualsCondition('c', '1')), GreaterThanOrEqualCondition('a', '1'), GreaterThanOrEqualCondition('b', '1')))
+		assert q.connector == 'AND'
+		assert len(q.children) == 4
+		assert q.children[0].children == [('b', '2')]
+		assert q.children[1].children[0].children == [('c', '1')]
+		assert q.children[2].children == [('a__range', ('1', '9'))]
+		assert q.children[3].children == [('b__gte', '1')]
+
+	def test_to_q_many_terms(self):
+		db = DjangoBackend()
+
+		q = db.to_q(OrOperator(*[GreaterThanCondition('a', i) for i in range(20000)]))
+		assert q.connector == 'OR'
+		assert len(q.children) == 20000
+		assert q.children[-1].children == [('a__gt', 19999)]
+
+		q = db.to_q(OrOperator(*[EqualsCondition('a', i) for i in range(20000)]))
+		assert len(q.children) == 1
+		assert q.children[0].children == [('a__in', list(range(20000)))]
+
 	def test_apply_django_filter(self):
 		qs = Mock()
 
@@ -194,3 +996,238 @@ class TestDjangoBackend(object):
 		assert manager.all.called # Mock() isn't an instance of Manager, so .all() must be called
 		assert all_qs.filter.called
 
+	def test_apply_single_filter(self):
+		all_qs = Mock()
+
+		manager = Mock()
+		manager.all = Mock(return_value=all_qs)
+
+		DjangoBackend().apply(Query([EqualsCondition('a', 1), EqualsCondition('b', 2)]), manager)
+
+		assert all_qs.filter.call_count == 1
+		q = all_qs.filter.call_args[0][0]
+		assert [x.children for x in q.children] == [[('a', 1)], [('b', 2)]]
+
+	def test_apply_empty(self):
+		manager = Mock()
+
+		Query([], empty=True).apply(manager, backend=DjangoBackend)
+
+		assert manager.none.called
+		assert not manager.all.called
+
+	def test_terminal_operations(self):
+		qs = MagicMock()
+		filtered = qs.all.return_value.filter.return_value
+		filtered.__getitem__.return_value = ['a']
+		query = Query([EqualsCondition('a', 1)])
+
+		assert query.apply(qs, backend=DjangoBackend, limit=5) == ['a']
+		filtered.__getitem__.assert_called_with(slice(None, 5, None))
+
+		assert query.first(qs, backend=DjangoBackend) == 'a'
+		filtered.__getitem__.assert_called_with(slice(None, 1, None))
+
+		filtered.__getitem__.return_value = []
+		assert query.first(qs, backend=DjangoBackend) is None
+
+		filtered.exists.return_value = True
+		assert query.exists(qs, backend=DjangoBackend) is True
+		filtered.count.return_value = 3
+		assert query.count(qs, backend=DjangoBackend) == 3
+
+
+
+@pytest.mark.skipif(not have_numpy, reason='Disable without numpy')
+class TestNumpyBackend(object):
+
+	def get_data(self):
+		return numpy.array(
+			[(1, 1.5, 'a', True), (2, 2.5, 'b', False), (3, 3.5, 'c', True)],
+			dtype=[('i', 'i4'), ('f', 'f8'), ('s', 'U5'), ('b', '?')]
+		)
+
+	def test_supports(self):
+		assert NumpyBackend.supports(self.get_data())
+		assert NumpyBackend.supports({'a': numpy.arange(3)})
+		assert not NumpyBackend.supports(numpy.arange(3))
+		assert not NumpyBackend.supports({})
+		assert not NumpyBackend.supports({'a': [1, 2]})
+		assert not NumpyBackend.supports([1, 2])
+
+	def test_get_backend(self):
+		assert isinstance(get_backend(self.get_data()), NumpyBackend)
+		assert isinstance(get_backend({'a': numpy.arange(3)}), NumpyBackend)
+
+	def test_mask(self):
+		nb = NumpyBackend()
+		data = self.get_data()
+
+		for query, expected in (
+			(Query([EqualsCondition('i', '2')]), [False, True, False]),
+			(Query([GreaterThanCondition('f', '2')]), [False, True, True]),
+			(Query([GreaterThanOrEqualCondition('i', '2')]), [False, True, True]),
+			(Query([LessThanCondition('i', '2')]), [True, False, False]),
+			(Query([LessThanOrEqualCondition('f', '2.5')]), [True, True, False]),
+			(Query([EqualsCondition('s', "'b'")]), [False, True, False]),
+			(Query([EqualsCondition('s', "b")]), [False, True, False]),
+			(Query([EqualsCondition('b', "true")]), [True, False, True]),
+			(Query([EqualsCondition('s', "'x'")]), [False, False, False]),
+			(Query([AndOperator(EqualsCondition('b', 'true'), GreaterThanCondition('i', '1'))]), [False, False, True]),
+			(Query([OrOperator(EqualsCondition('i', '1'), EqualsCondition('i', '3'))]), [True, False, True]),
+			(Query([ConditionGroup(OrOperator(EqualsCondition('i', '1'), EqualsCondition('i', '3'))),
+					EqualsCondition('s', 'c')]), [False, False, True]),
+		):
+			assert nb.mask(query, data).tolist() == expected
+			assert query.mask(data).tolist() == expected
+
+	def test_apply(self):
+		data = self.get_data()
+		query = Query([GreaterThanCondition('i', '1')])
+
+		result = query.apply(data)
+		assert result['i'].tolist() == [2, 3]
+
+		result = query.apply({'i': data['i'], 's': data['s']})
+		assert result['i'].tolist() == [2, 3]
+		assert result['s'].tolist() == ['b', 'c']
+
+	def test_empty(self):
+		data = self.get_data()
+		query = Query([], empty=True)
+
+		assert query.mask(data).tolist() == [False, False, False]
+		assert len(query.apply(data)) == 0
+
+	def test_nested_fields(self):
+		data = numpy.array([(1, (2.5, 'a')), (2, (3.5, 'b'))], dtype=[('i', 'i4'), ('p', [('x', 'f8'), ('s', 'U5')])])
+
+		assert Query([GreaterThanCondition('p.x', '3')]).mask(data).tolist() == [False, True]
+		assert Query([EqualsCondition('p.s', 'a')]).apply(data)['i'].tolist() == [1]
+
+	def test_leading_missing_values(self):
+		data = {'b': numpy.array([None, 'x', 'y'], dtype=object), 'n': numpy.array([None, None], dtype=object)}
+
+		assert Query([EqualsCondition('b', "'x'")]).mask({'b': data['b']}).tolist() == [False, True, False]
+		assert Query([InCondition('b', ("'x'", 'y'))]).mask({'b': data['b']}).tolist() == [False, True, True]
+		assert Query([EqualsCondition('n', "'x'")]).mask({'n': data['n']}).tolist() == [False, False]
+
+	def test_typed(self):
+		data = self.get_data()
+		assert NumpyBackend().mask(Query([EqualsCondition('b', False, typed=True)]), data).tolist() == [False, True, False]
+		assert NumpyBackend().mask(Query([EqualsCondition('s', "c", typed=True)]), data).tolist() == [False, False, True]
+
+		dates = {'d': numpy.array(['2020-01-01', '2021-01-01'], dtype='datetime64[D]'),
+				 'b': numpy.array([b'x', b'y'])}
+		query = Query([GreaterThanCondition('d', datetime.date(2020, 6, 1), typed=True)])
+		assert NumpyBackend().mask(query, dates).tolist() == [False, True]
+		assert NumpyBackend().mask(Query([EqualsCondition('b', 'x', typed=True)]), dates).tolist() == [True, False]
+
+	def test_not_in_missing(self):
+		data = {'f': numpy.array([1.5, numpy.nan, 3.5]), 'o': numpy.array(['a', None, 'c'], dtype=object)}
+
+		assert Query([NotInCondition('f', ('1.5', ))]).mask(data).tolist() == [False, False, True]
+		assert Query([NotInCondition('o', ("'a'", ))]).mask(data).tolist() == [False, False, True]
+
+	def test_membership(self):
+		data = self.get_data()
+
+		assert Query([InCondition('i', ('1', '3'))]).mask(data).tolist() == [True, False, True]
+		assert Query([InCondition('s', ("'b'", 'c'))]).mask(data).tolist() == [False, True, True]
+		assert Query([NotInCondition('f', ('2.5', ))]).mask(data).tolist() == [True, False, True]
+		assert Query([InCondition('i', (2, ), typed=True)]).mask({'i': data['i']}).tolist() == [False, True, False]
+		assert Query([InCondition('b', ('x', 'z'), typed=True)]).mask({'b': numpy.array([b'x', b'y'])}).tolist() == \
+			[True, False]
+
+	def test_terminal_operations(self):
+		data = self.get_data()
+		query = Query([GreaterThanCondition('i', '1')])
+
+		assert query.apply(data, limit=1)['i'].tolist() == [2]
+		assert query.apply({'i': data['i']}, limit=1)['i'].tolist() == [2]
+		assert query.first(data)['s'] == 'b'
+		assert query.first({'i': data['i'], 's': data['s']}) == {'i': 2, 's': 'b'}
+		assert query.exists(data) is True
+		assert query.count(data) == 2
+
+		query = Query([GreaterThanCondition('i', '5')])
+		assert query.first(data) is None
+		assert query.exists(data) is False
+		assert query.count(data) == 0
+
+
+@pytest.mark.skipif(not have_pandas, reason='Disable without pandas')
+class TestPandasBackend(object):
+
+	def get_data(self):
+		return pandas.DataFrame({
+			'i': [1, 2, 3],
+			'f': [1.5, 2.5, 3.5],
+			's': ['a', 'b', 'c'],
+			'n': pandas.array([1, None, 3], dtype='Int64'),
+		}, index=['x', 'y', 'z'])
+
+	def test_supports(self):
+		assert PandasBackend.supports(self.get_data())
+		assert not PandasBackend.supports(self.get_data()['i'])
+		assert not PandasBackend.supports([1, 2])
+
+	def test_get_backend(self):
+		assert isinstance(get_backend(self.get_data()), PandasBackend)
+
+	def test_mask(self):
+		pb = PandasBackend()
+		data = self.get_data()
+
+		for query, expected in (
+			(Query([EqualsCondition('i', '2')]), [False, True, False]),
+			(Query([GreaterThanCondition('f', '2')]), [False, True, True]),
+			(Query([EqualsCondition('s', "'b'")]), [False, True, False]),
+			(Query([GreaterThanCondition('n', '0')]), [True, False, True]),
+			(Query([OrOperator(EqualsCondition('s', 'a'), LessThanCondition('n', '2'))]), [True, False, False]),
+			(Query([AndOperator(GreaterThanCondition('i', '1'), LessThanOrEqualCondition('f', '2.5'))]), [False, True, False]),
+			(Query([InCondition('s', ("'a'", 'c'))]), [True, False, True]),
+			(Query([InCondition('n', ('3', '4'))]), [False, False, True]),
+			(Query([NotInCondition('i', ('2', ))]), [True, False, True]),
+			(Query([NotInCondition('n', ('1', ))]), [False, False, True]),
+		):
+			assert pb.mask(query, data).tolist() == expected
+
+	def test_not_in_missing(self):
+		data = pandas.DataFrame({'s': ['a', None, 'c'], 'f': [1.5, float('nan'), 3.5]})
+
+		assert Query([NotInCondition('s', ("'a'", ))]).mask(data).tolist() == [False, False, True]
+		assert Query([NotInCondition('f', ('1.5', ))]).mask(data).tolist() == [False, False, True]
+
+	def test_apply(self):
+		data = self.get_data()
+		query = Query([GreaterThanCondition('i', '1')])
+
+		result = query.apply(data)
+		assert isinstance(result, pandas.DataFrame)
+		assert result['s'].tolist() == ['b', 'c']
+		assert PandasBackend().index(query, data).tolist() == ['y', 'z']
+
+	def test_terminal_operations(self):
+		data = self.get_data()
+		query = Query([GreaterThanCondition('i', '1')])
+
+		result = query.apply(data, limit=1)
+		assert isinstance(result, pandas.DataFrame)
+		assert result.index.tolist() == ['y']
+		assert query.first(data).name == 'y'
+		assert query.exists(data) is True
+		assert query.count(data) == 2
+		assert Query([GreaterThanCondition('i', '5')]).first(data) is None
+
+	def test_leading_missing_values(self):
+		data = pandas.DataFrame({'b': [None, 'x', 'y'], 'o': pandas.Series([numpy.nan, 'x', 'y'], dtype=object)})
+
+		for column in ('b', 'o'):
+			assert Query([EqualsCondition(column, "'x'")]).mask(data).tolist() == [False, True, False]
+			assert Query([InCondition(column, ("'x'", 'y'))]).mask(data).tolist() == [False, True, True]
+		assert Query([EqualsCondition('b', "'x'")]).mask(pandas.DataFrame({'b': [None, None]})).tolist() == [False, False]
+
+	def test_dotted_columns(self):
+		data = pandas.json_normalize([{'user': {'city': 'Berlin'}}, {'user': {'city': 'Paris'}}])
+		assert Query([EqualsCondition('user.city', 'Paris')]).mask(data).tolist() == [False, True]
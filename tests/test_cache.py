@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+from phylter.cache import ParseCache, normalize_query
+from phylter.lexer import ParseError
+from phylter.parser import Parser
+
+
+class TestNormalizeQuery(object):
+
+	def test_normalize(self):
+		assert normalize_query("foo == 1") == "foo == 1"
+		assert normalize_query("  foo   ==\t1 \n") == "foo == 1"
+		assert normalize_query("foo  ==  'a  b'") == "foo == 'a  b'"
+		assert normalize_query('foo  ==  "a  b" or  x == 1') == 'foo == "a  b" or x == 1'
+
+
+class TestParseCache(object):
+
+	def test_constructor(self):
+		for v in (None, 0, -1):
+			with pytest.raises(ValueError):
+				ParseCache(v)
+
+	def test_get_put(self):
+		c = ParseCache(2)
+		assert c.get('a') is None
+		c.put('a', 1)
+		assert c.get('a') == 1
+		assert c.hits == 1
+		assert c.misses == 1
+		assert len(c) == 1
+
+	def test_eviction(self):
+		c = ParseCache(2)
+		c.put('a', 1)
+		c.put('b', 2)
+		c.get('a')  # 'b' is now the least recently used entry
+		c.put('c', 3)
+
+		assert 'a' in c
+		assert 'b' not in c
+		assert 'c' in c
+		assert c.info == {'hits': 1, 'misses': 0, 'maxsize': 2, 'currsize': 2}
+
+	def test_clear(self):
+		c = ParseCache(2)
+		c.put('a', 1)
+		c.get('a')
+		c.clear()
+		assert len(c) == 0
+		assert c.hits == 0
+
+	def test_threads(self):
+		c = ParseCache(10)
+
+		def worker():
+			for i in range(1000):
+				c.put(i % 20, i)
+				c.get(i % 20)
+
+		threads = [threading.Thread(target=worker) for _ in range(4)]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+
+		assert len(c) == 10
+		assert c.hits + c.misses == 4000
+
+
+class TestParserCache(object):
+
+	def test_no_cache(self):
+		p = Parser()
+		assert p.cache is None
+		assert p.parse("foo == 1") is not p.parse("foo == 1")
+
+	def test_cache_size(self):
+		p = Parser(cache_size=10)
+		q = p.parse("foo == 1")
+		assert p.parse("foo   ==   1 ") is q
+		assert p.cache.hits == 1
+		assert p.cache.misses == 1
+
+	def test_shared_cache(self):
+		c = ParseCache(10)
+		q = Parser(cache=c).parse("foo == 1")
+		assert Parser(cache=c).parse("foo == 1") is q
+
+	def test_error_positions(self):
+		for p in (Parser(), Parser(cache_size=4)):
+			with pytest.raises(ParseError) as e:
+				p.parse('  a   ==   ')
+			assert e.value.pos == 11
+
+	def test_immutable(self):
+		p = Parser(cache_size=10)
+		q = p.parse("foo == 1 or bar == 2")
+
+		q.query.consume()
+		assert len(list(p.parse("foo == 1 or bar == 2").query)) == 1
+		assert p.parse("foo == 1 or bar == 2").query.current is not None
+
+		for attribute in ('empty', 'schema'):
+			with pytest.raises(AttributeError):
+				setattr(q, attribute, None)
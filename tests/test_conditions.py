@@ -1,5 +1,13 @@
 # -*- coding: utf-8 -*-
-from phylter.conditions import EqualsCondition, GreaterThanCondition, AndOperator, OrOperator
+import pytest
+import copy
+import gc
+import pickle
+
+
+from phylter.conditions import EqualsCondition, GreaterThanCondition, AndOperator, OrOperator, ConditionGroup, \
+	InCondition, NotInCondition, intern_node, interned_nodes
+from phylter.parser import Parser
 
 
 class TestConditions(object):
@@ -8,9 +16,90 @@ class TestConditions(object):
 		assert EqualsCondition('foo', 'bar') == EqualsCondition('foo', 'bar')
 		assert EqualsCondition('foo', 'bar') != GreaterThanCondition('foo', 'bar')
 
+	def test_membership(self):
+		assert InCondition('foo', ('1', 'x')) == InCondition('foo', ('1', 'x'))
+		assert InCondition('foo', ('1', 'x')) != NotInCondition('foo', ('1', 'x'))
+		assert InCondition('foo', (1, )) != InCondition('foo', (True, ))
+		assert str(InCondition('foo', ('1', "'x'"))) == "foo in (1, 'x')"
+		assert str(NotInCondition('foo', ('1', ))) == "foo not in (1)"
+		assert pickle.loads(pickle.dumps(NotInCondition('foo', ('1', )))) == NotInCondition('foo', ('1', ))
+
 
 class TestOperators(object):
 
 	def test_equals(self):
 		assert AndOperator('foo', 'bar') == AndOperator('foo', 'bar')
 		assert AndOperator('foo', 'bar') != OrOperator('foo', 'bar')
+
+	def test_flatten(self):
+		a, b, c = EqualsCondition('a', 1), EqualsCondition('b', 2), EqualsCondition('c', 3)
+
+		assert OrOperator(OrOperator(a, b), c).operands == (a, b, c)
+		assert OrOperator(a, OrOperator(b, c)).operands == (a, b, c)
+		assert OrOperator(OrOperator(a, b), c) == OrOperator(a, b, c)
+		assert OrOperator(a, AndOperator(b, c)).operands == (a, AndOperator(b, c))
+		assert OrOperator(a, ConditionGroup(OrOperator(b, c))).operands == (a, ConditionGroup(OrOperator(b, c)))
+
+	def test_left_right(self):
+		a, b, c = EqualsCondition('a', 1), EqualsCondition('b', 2), EqualsCondition('c', 3)
+
+		op = AndOperator(a, b, c)
+		assert op.left == AndOperator(a, b)
+		assert op.right == c
+		assert AndOperator(a, b).left == a
+
+	def test_operands(self):
+		with pytest.raises(ValueError):
+			AndOperator(EqualsCondition('a', 1))
+
+
+class TestNodes(object):
+
+	def get_nodes(self):
+		a, b = EqualsCondition('a', '1'), GreaterThanCondition('b', '2')
+		return [a, AndOperator(a, b), OrOperator(a, b, EqualsCondition('c', '3')), ConditionGroup(AndOperator(a, b))]
+
+	def test_immutable(self):
+		for node in self.get_nodes():
+			with pytest.raises(AttributeError):
+				node.foo = 1
+			with pytest.raises(AttributeError):
+				del node.key
+			assert not hasattr(node, '__dict__')
+
+		with pytest.raises(AttributeError):
+			EqualsCondition('a', '1').left = 'b'
+		with pytest.raises(AttributeError):
+			AndOperator(EqualsCondition('a', '1'), EqualsCondition('b', '1')).operands = ()
+
+	def test_hash(self):
+		assert hash(EqualsCondition('a', '1')) == hash(EqualsCondition('a', '1'))
+		assert len(set(self.get_nodes() + self.get_nodes())) == 4
+		assert EqualsCondition('a', '1') != AndOperator(EqualsCondition('a', '1'), EqualsCondition('a', '1'))
+
+	def test_pickle(self):
+		for node in self.get_nodes():
+			assert pickle.loads(pickle.dumps(node)) == node
+			assert pickle.loads(pickle.dumps(node, 0)) == node
+			assert copy.copy(node) == node
+			assert copy.deepcopy(node) == node
+
+	def test_intern(self):
+		a = intern_node(EqualsCondition('intern', '1'))
+		assert intern_node(EqualsCondition('intern', '1')) is a
+		assert intern_node(EqualsCondition('intern', '2')) is not a
+
+		key = a.key
+		del a
+		gc.collect()
+		assert key not in interned_nodes
+
+	def test_parser_shares_nodes(self):
+		p = Parser()
+		q1 = p.parse("a == 1 and (b == 2 or c == 3)")
+		q2 = p.parse("(b == 2 or c == 3) or d == 4")
+
+		and_op, = q1.query
+		or_op, = q2.query
+		assert and_op.operands[1] is or_op.operands[0]
+		assert and_op.operands[1].item.operands[0] is Parser().parse("b == 2").query.iterable[0]
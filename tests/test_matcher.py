@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from phylter.backends.mapping import MappingBackend
+from phylter.conditions import EqualsCondition, GreaterThanCondition, AndOperator, OrOperator, ConditionGroup
+from phylter.matcher import QueryMatcher
+from phylter.parser import Parser
+from phylter.query import Query
+
+
+class Foo(object):
+	def __init__(self, a, b):
+		self.a = a
+		self.b = b
+
+
+class TestHashing(object):
+
+	def test_hash(self):
+		assert hash(EqualsCondition('a', '1')) == hash(EqualsCondition('a', '1'))
+		assert len({EqualsCondition('a', '1'), EqualsCondition('a', '1'), GreaterThanCondition('a', '1')}) == 2
+		assert hash(OrOperator(OrOperator(EqualsCondition('a', '1'), EqualsCondition('b', '1')), EqualsCondition('c', '1'))) == \
+			hash(OrOperator(EqualsCondition('a', '1'), EqualsCondition('b', '1'), EqualsCondition('c', '1')))
+		assert hash(ConditionGroup(EqualsCondition('a', '1'))) == hash(ConditionGroup(EqualsCondition('a', '1')))
+
+
+class TestQueryMatcher(object):
+
+	def get_matcher(self, **kwargs):
+		p = Parser()
+		return QueryMatcher([
+			('q1', p.parse("a == 1")),
+			('q2', p.parse("a == 1 and b > 5")),
+			('q3', p.parse("b > 5 or a == 2")),
+			('q4', p.parse("(a == 1 and b > 5) or b == 0")),
+		], **kwargs)
+
+	def test_match(self):
+		m = self.get_matcher()
+
+		assert len(m) == 4
+		assert m.match(Foo(1, 10)) == ['q1', 'q2', 'q3', 'q4']
+		assert m.match(Foo(1, 0)) == ['q1', 'q4']
+		assert m.match(Foo(2, 3)) == ['q3']
+		assert m.match(Foo(3, 3)) == []
+
+	def test_shared_nodes(self):
+		m = self.get_matcher()
+
+		# a == 1, b > 5, (a == 1 and b > 5), a == 2, (b > 5 or a == 2), b == 0, (... or b == 0)
+		assert m.node_count == 7
+
+	def test_conditions_evaluated_once(self):
+		calls = []
+
+		class Counting(Foo):
+			def __getattribute__(self, name):
+				calls.append(name)
+				return object.__getattribute__(self, name)
+
+		m = self.get_matcher()
+		m.match(Counting(1, 10))
+		assert sorted(calls) == ['a', 'b']
+
+	def test_add_remove(self):
+		m = self.get_matcher()
+		m.remove('q1')
+		m.add('q5', Query([EqualsCondition('a', '3')]))
+
+		assert m.match(Foo(3, 10)) == ['q3', 'q5']
+
+	def test_dict_queries(self):
+		m = QueryMatcher({'x': Query([AndOperator(EqualsCondition('a', '1'), EqualsCondition('b', '2'))])})
+		assert m.match(Foo(1, 2)) == ['x']
+
+	def test_backend(self):
+		m = self.get_matcher(backend=MappingBackend)
+		assert m.match({'a': 2, 'b': 0}) == ['q3', 'q4']
+
+	def test_apply(self):
+		m = self.get_matcher()
+		items = [Foo(3, 3), Foo(2, 3)]
+		assert list(m.apply(items)) == [(items[0], []), (items[1], ['q3'])]
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from phylter.conditions import EqualsCondition, GreaterThanCondition, GreaterThanOrEqualCondition, LessThanCondition, \
+	LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup
+from phylter.optimizer import Optimizer
+from phylter.parser import Parser, ConsumableIter
+from phylter.query import Query
+from phylter.schema import Schema
+
+schema = Schema({'a': int, 'b': int, 'age': float, 'name': str, 's': str})
+
+
+def optimize(s, schema=None):
+	return Parser(schema=schema).parse(s).optimize()
+
+
+class Foo(object):
+	def __init__(self, a, b=0):
+		self.a = a
+		self.b = b
+
+
+class TestOptimizer(object):
+
+	def test_unwrap_groups(self):
+		assert optimize("(a == 1)").query.iterable == [EqualsCondition('a', '1')]
+		assert optimize("a == 1 or (b == 2 or c == 3)").query.iterable == [
+			OrOperator(EqualsCondition('a', '1'), EqualsCondition('b', '2'), EqualsCondition('c', '3'))
+		]
+		assert optimize("a == 1 and (b == 2 or c == 3)").query.iterable == [
+			AndOperator(EqualsCondition('a', '1'), OrOperator(EqualsCondition('b', '2'), EqualsCondition('c', '3')))
+		]
+
+	def test_duplicates(self):
+		assert optimize("a == 1 or a == 1").query.iterable == [EqualsCondition('a', '1')]
+		assert optimize("a == 'x' and (a == 'x')").query.iterable == [EqualsCondition('a', "'x'")]
+
+	def test_merge_ranges(self):
+		def typed(condition_class, value):
+			return condition_class('age', float(value), typed=True)
+
+		assert optimize("age > 5 and age > 10 and (age > 10)", schema).query.iterable == [typed(GreaterThanCondition, 10)]
+		assert optimize("age >= 10 and age > 10", schema).query.iterable == [typed(GreaterThanCondition, 10)]
+		assert optimize("age < 5 and age <= 5 and age < 7", schema).query.iterable == [typed(LessThanCondition, 5)]
+		assert optimize("age > 1 and age < 9 and age > 2", schema).query.iterable == [
+			AndOperator(typed(GreaterThanCondition, 2), typed(LessThanCondition, 9))
+		]
+		assert optimize("age > 5 or age > 10", schema).query.iterable == [typed(GreaterThanCondition, 5)]
+		assert optimize("age < 5 or age <= 5", schema).query.iterable == [typed(LessThanOrEqualCondition, 5)]
+
+		# equality implies the range
+		assert optimize("age > 1 and age == 5", schema).query.iterable == [typed(EqualsCondition, 5)]
+
+		# non-numeric literals aren't merged
+		assert optimize("name > 'a' and name > 'b'", schema).query.iterable == [
+			AndOperator(GreaterThanCondition('name', 'a', typed=True), GreaterThanCondition('name', 'b', typed=True))
+		]
+
+	def test_untyped_ranges(self):
+		# without a schema the field may hold strings, which compare lexicographically
+		assert optimize("s > 10 and s > 9").query.iterable == [
+			AndOperator(GreaterThanCondition('s', '10'), GreaterThanCondition('s', '9'))
+		]
+		assert not optimize("s == 5 and s > 10").empty
+		assert not optimize("s > 10 and s < 9").empty
+
+		items = [Foo('5'), Foo('10'), Foo('95')]
+		for s in ("a > 10 and a > 9", "a == 5 and a > 10", "a > 10 or a > 9", "a < 2 and a > 10"):
+			assert list(Parser().parse(s).apply(items)) == list(optimize(s).apply(items)), s
+
+	def test_contradictions(self):
+		for s in (
+			"a == 1 and a == 2",
+			"a > 5 and a < 3",
+			"a > 5 and a <= 5",
+			"a == 1 and a > 1",
+			"b == 1 and ((a == 1 and a == 2) or (a > 3 and a < 2))",
+		):
+			q = optimize(s, schema)
+			assert q.empty, s
+			assert str(q) == "FALSE"
+			assert list(q.apply([Foo(1), Foo(5)])) == []
+			assert not q.compile()(Foo(1))
+
+		# one impossible branch of an or is removed
+		assert optimize("a == 3 or (a == 1 and a == 2)").query.iterable == [EqualsCondition('a', '3')]
+		assert optimize("a == 1 and a == 2").empty
+		assert optimize("a == 'x' and a == 'y'").empty
+
+		for s in ("a >= 5 and a <= 5", "a == 1 and a == '1'", "a == 1 and a == 1.0", "a == 1 and a > 1"):
+			assert not optimize(s).empty, s
+		assert not optimize("a >= 5 and a <= 5", schema).empty
+
+	def test_reorder(self):
+		assert optimize("(a == 1 or b == 2) and c > 1 and d == 2").query.iterable == [
+			AndOperator(
+				EqualsCondition('d', '2'),
+				GreaterThanCondition('c', '1'),
+				OrOperator(EqualsCondition('a', '1'), EqualsCondition('b', '2')),
+			)
+		]
+
+	def test_str(self):
+		assert str(optimize("a > 1 and (b == 2 and a > 3)", schema)) == "(b == 2) AND (a > 3)"
+
+	def test_multiple_toplevel(self):
+		q = Optimizer().optimize(Query(ConsumableIter([EqualsCondition('a', '1'), EqualsCondition('a', '1')])))
+		assert q.query.iterable == [EqualsCondition('a', '1')]
+
+	def test_same_results(self):
+		items = [Foo(a, b) for a in range(6) for b in range(6)]
+
+		for s in (
+			"a > 1 and a > 2 and b < 4",
+			"a == 1 or b == 2 or (a == 1 and b > 2)",
+			"(a >= 2 and a <= 2) or b > 4 or b > 3",
+			"a == 2 and (b == 1 or b == 3) and a < 4",
+		):
+			assert list(Parser().parse(s).apply(items)) == list(optimize(s).apply(items)), s
+			assert list(Parser().parse(s).apply(items)) == list(optimize(s, schema).apply(items)), s
+
+	def test_parser_option(self):
+		assert Parser(optimize=True).parse("a == 1 or (a == 1)").query.iterable == [EqualsCondition('a', '1')]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from phylter.backends.mapping import MappingBackend
+from phylter.conditions import EqualsCondition, GreaterThanCondition, OrOperator
+from phylter.parallel import chunks
+from phylter.query import Query
+
+
+class TestChunks(object):
+
+	def test_chunks(self):
+		assert list(chunks(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+		assert list(chunks([], 3)) == []
+
+
+class TestApplyParallel(object):
+
+	def get_query(self):
+		return Query([OrOperator(EqualsCondition('a', '1'), GreaterThanCondition('b', '90'))])
+
+	def get_rows(self):
+		return [{'a': i % 3, 'b': i} for i in range(100)]
+
+	def test_pickle(self):
+		q = self.get_query()
+		q.compile()
+		assert pickle.loads(pickle.dumps(q)).query == q.query
+
+	def test_ordered(self):
+		rows = self.get_rows()
+		expected = list(self.get_query().apply(rows))
+
+		result = list(self.get_query().apply_parallel(iter(rows), workers=2, chunksize=7))
+		assert result == expected
+
+	def test_unordered(self):
+		rows = self.get_rows()
+		expected = list(self.get_query().apply(rows))
+
+		result = list(self.get_query().apply_parallel(rows, workers=2, chunksize=7, ordered=False))
+		assert sorted(result, key=lambda x: x['b']) == expected
+
+	def test_backend(self):
+		rows = self.get_rows()
+		result = list(self.get_query().apply_parallel(iter(rows), workers=2, chunksize=10, backend=MappingBackend))
+		assert len(result) == 39
+
+	def test_chunksize(self):
+		with pytest.raises(ValueError):
+			list(self.get_query().apply_parallel([], chunksize=0))
@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 import pytest
-from pyparsing import ParseException
 
 from phylter.conditions import EqualsCondition, GreaterThanCondition, GreaterThanOrEqualCondition, LessThanCondition, \
-	LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup
-from phylter.parser import ConsumableIter, Parser, pattern
+	LessThanOrEqualCondition, AndOperator, OrOperator, ConditionGroup, InCondition, NotInCondition
+from phylter.lexer import ParseError, tokenize, Token
+from phylter.parser import ConsumableIter, Parser
 from phylter.query import Query
 
 
@@ -109,7 +109,85 @@ class TestConsumableIter(object):
 
 		assert [x for x in ci] == [1, 2, 3]
 
+have_pyparsing = False
+try:
+	from pyparsing import ParseException
+	have_pyparsing = True
+except ImportError:
+	have_pyparsing = False
+
+
+class TestTokenize(object):
+
+	def test_tokenize(self):
+		assert tokenize("foo == 'b a r' AND (x>=-1.5 or y != 2)") == [
+			Token('identifier', 'foo', 0),
+			Token('operator', '==', 4),
+			Token('string', "'b a r'", 7),
+			Token('and', 'and', 15),
+			Token('(', '(', 19),
+			Token('identifier', 'x', 20),
+			Token('operator', '>=', 21),
+			Token('number', '-1.5', 23),
+			Token('or', 'or', 28),
+			Token('identifier', 'y', 31),
+			Token('operator', '!=', 33),
+			Token('identifier', '2', 36),
+			Token(')', ')', 37),
+			Token('end', None, 38),
+		]
+
+	def test_tokenize_dotted_paths(self):
+		assert tokenize("user.address.city == x.y and a_1.b2 > 1.5") == [
+			Token('identifier', 'user.address.city', 0),
+			Token('operator', '==', 18),
+			Token('identifier', 'x.y', 21),
+			Token('and', 'and', 25),
+			Token('identifier', 'a_1.b2', 29),
+			Token('operator', '>', 36),
+			Token('number', '1.5', 38),
+			Token('end', None, 41),
+		]
+
+		with pytest.raises(ParseError):
+			tokenize("user. == 1")
+
+	def test_tokenize_membership(self):
+		assert tokenize("a in (1, 'x') and b NOT IN (c)") == [
+			Token('identifier', 'a', 0),
+			Token('in', 'in', 2),
+			Token('(', '(', 5),
+			Token('identifier', '1', 6),
+			Token(',', ',', 7),
+			Token('string', "'x'", 9),
+			Token(')', ')', 12),
+			Token('and', 'and', 14),
+			Token('identifier', 'b', 18),
+			Token('not', 'not', 20),
+			Token('in', 'in', 24),
+			Token('(', '(', 27),
+			Token('identifier', 'c', 28),
+			Token(')', ')', 29),
+			Token('end', None, 30),
+		]
+
+	def test_tokenize_escaped_quotes(self):
+		assert tokenize(r'"a\"b"')[0] == Token('string', r'"a\"b"', 0)
+
+	def test_tokenize_fail(self):
+		with pytest.raises(ParseError) as e:
+			tokenize("foo == $")
+		assert e.value.pos == 7
+
+		with pytest.raises(ParseError):
+			tokenize("foo == 'bar")
+
+
 class TestParser(object):
+	parse_exception = ParseError
+
+	def get_parser(self):
+		return Parser()
 
 	def test_constructor(self):
 		p = Parser()
@@ -124,6 +202,8 @@ class TestParser(object):
 		assert p._get_condition_class('<') == LessThanCondition
 		assert p._get_condition_class('>=') == GreaterThanOrEqualCondition
 		assert p._get_condition_class('<=') == LessThanOrEqualCondition
+		assert p._get_condition_class('in') == InCondition
+		assert p._get_condition_class('not in') == NotInCondition
 
 		for x in (None, 'foobar'):
 			with pytest.raises(Exception) as e:
@@ -149,15 +229,33 @@ class TestParser(object):
 			('foo >= bar', 'foo', 'bar', GreaterThanOrEqualCondition),
 			('foo <= bar', 'foo', 'bar', LessThanOrEqualCondition),
 		):
-			q = Parser().parse(query).query
+			q = self.get_parser().parse(query).query
 			assert q == ConsumableIter([
 				clazz(left, right)
 			])
 			print("------")
 
+	def test_parse_dotted_paths(self):
+		q = self.get_parser().parse("user.address.city == 'Berlin' and (user.age > 3)")
+		condition, group = q.query.iterable[0].operands
+		assert condition.left == 'user.address.city'
+		assert group.item.left == 'user.age'
+
+	def test_parse_membership(self):
+		q = self.get_parser().parse("a in (1) or b == 2 and c not in (x, 'y z')")
+		assert q.query.iterable == [
+			AndOperator(
+				OrOperator(
+					InCondition('a', ('1', )),
+					EqualsCondition('b', '2'),
+				),
+				NotInCondition('c', ('x', "'y z'")),
+			)
+		]
+
 	def test_parse_groups(self):
 		s = "foo == 'bar' or (foo == 'baz' or foo=='bat')"
-		q = Parser().parse(s)
+		q = self.get_parser().parse(s)
 		assert q.query.iterable == [
 			OrOperator(
 				EqualsCondition('foo', "'bar'"),
@@ -172,7 +270,7 @@ class TestParser(object):
 
 		# multiple group
 		s = "foo == 'bar' or (foo == 'baz' or foo=='bat') or (a == 1 and b < 2)"
-		q = Parser().parse(s)
+		q = self.get_parser().parse(s)
 		assert q.query.iterable == [
 			OrOperator(
 				OrOperator(
@@ -232,7 +330,7 @@ class TestParser(object):
 				)
 			),
 		):
-			q = Parser().parse(query).query
+			q = self.get_parser().parse(query).query
 			assert q == ConsumableIter([result])
 
 	def test_parse_fail(self):
@@ -242,9 +340,13 @@ class TestParser(object):
 			'foo == 1 or ',
 			'or',
 			'and',
+			'foo in ()',
+			'foo in (1',
+			'foo in 1',
+			'foo not (1)',
 		):
-			with pytest.raises(ParseException) as e:
-				Parser().parse(s)
+			with pytest.raises(self.parse_exception) as e:
+				self.get_parser().parse(s)
 
 	def test_find_group_end(self):
 		p = Parser()
@@ -261,3 +363,98 @@ class TestParser(object):
 
 		with pytest.raises(Exception) as e:
 			assert p.find_group_end(ConsumableIter(['(', 'foo', '==', 'bar'])) == group_end_pos
+
+
+class TestExpressionParser(object):
+
+	def test_parse_error_position(self):
+		with pytest.raises(ParseError) as e:
+			Parser().parse("foo == 1 and bar 2")
+		assert e.value.pos == 17
+		assert str(e.value) == "Expected operator, found '2' at position 17"
+
+		with pytest.raises(ParseError) as e:
+			Parser().parse("(foo == 1")
+		assert str(e.value) == "Expected ')', found end of query at position 9"
+
+		with pytest.raises(ParseError) as e:
+			Parser().parse("foo != 1")
+		assert e.value.pos == 4
+
+		with pytest.raises(ParseError):
+			Parser().parse("")
+
+		with pytest.raises(ParseError):
+			Parser().parse("foo == 1 bar == 2")
+
+	def test_parse_membership_errors(self):
+		with pytest.raises(ParseError) as e:
+			Parser().parse("a in (1 2)")
+		assert str(e.value) == "Expected ',' or ')', found '2' at position 8"
+
+		with pytest.raises(ParseError) as e:
+			Parser().parse("a not (1)")
+		assert str(e.value) == "Expected 'in', found '(' at position 6"
+
+	def test_parse_nested_groups(self):
+		q = Parser().parse("(a == 1 or (b == 2 and c == 3)) and d_e == 'x'")
+		assert q.query.iterable == [
+			AndOperator(
+				ConditionGroup(
+					OrOperator(
+						EqualsCondition('a', '1'),
+						ConditionGroup(
+							AndOperator(
+								EqualsCondition('b', '2'),
+								EqualsCondition('c', '3'),
+							)
+						)
+					)
+				),
+				EqualsCondition('d_e', "'x'")
+			)
+		]
+
+	def test_parse_case_insensitive_operators(self):
+		assert Parser().parse("a == 1 AND b == 2 Or c == 3").query.iterable == \
+			Parser().parse("a == 1 and b == 2 or c == 3").query.iterable
+
+
+@pytest.mark.skipif(not have_pyparsing, reason='Disable without pyparsing')
+class TestPyparsingParser(TestParser):
+
+	@property
+	def parse_exception(self):
+		return ParseException
+
+	def get_parser(self):
+		return Parser(use_pyparsing=True)
+
+
+class TestLargeQueries(object):
+
+	def test_parse_many_or_terms(self):
+		n = 20000
+		s = " or ".join("a == %s" % i for i in range(n))
+		q = Parser().parse(s)
+
+		root = q.query.iterable[0]
+		assert isinstance(root, OrOperator)
+		assert len(root.operands) == n
+		assert root.operands[-1] == EqualsCondition('a', str(n-1))
+
+	def test_parse_mixed_terms(self):
+		s = " and ".join("(%s)" % " or ".join("a == %s" % j for j in range(50)) for i in range(200))
+		root = Parser().parse(s).query.iterable[0]
+		assert isinstance(root, AndOperator)
+		assert len(root.operands) == 200
+		assert len(root.operands[0].item.operands) == 50
+
+	def test_apply_many_or_terms(self):
+		class Foo(object):
+			def __init__(self, a):
+				self.a = a
+
+		s = " or ".join("a == %s" % i for i in range(20000))
+		q = Parser().parse(s)
+		assert [x.a for x in q.apply([Foo(5), Foo(19999), Foo(20000)])] == [5, 19999]
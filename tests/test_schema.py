@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import datetime
+import decimal
+import sys
+from typing import Optional, List
+
+import pytest
+
+from phylter.backends.mapping import MappingBackend
+from phylter.backends.objects import ObjectsBackend
+from phylter.conditions import EqualsCondition, GreaterThanCondition
+from phylter.lexer import ParseError
+from phylter.parser import Parser
+from phylter.schema import Schema, SchemaError
+
+try:
+	from mock import Mock
+except ImportError:
+	from unittest.mock import Mock
+
+
+class Person(object):
+	def __init__(self, name, age, active=True, born=None):
+		self.name = name
+		self.age = age
+		self.active = active
+		self.born = born
+
+
+def get_schema():
+	return Schema({
+		'name': str,
+		'age': int,
+		'score': float,
+		'active': bool,
+		'born': datetime.date,
+		'seen': datetime.datetime,
+		'price': decimal.Decimal,
+		'extra': None,
+	})
+
+
+class TestSchema(object):
+
+	def test_coerce(self):
+		schema = get_schema()
+
+		assert schema.coerce('name', "'Alice'") == 'Alice'
+		assert schema.coerce('name', "\"'quoted'\"") == "'quoted'"
+		assert schema.coerce('name', "42") == '42'
+		assert schema.coerce('age', "42") == 42
+		assert schema.coerce('age', "'42'") == 42
+		assert schema.coerce('age', "2.5") == 2.5
+		assert schema.coerce('score', "2") == 2.0
+		assert schema.coerce('active', "TRUE") is True
+		assert schema.coerce('active', "no") is False
+		assert schema.coerce('born', "'2020-01-31'") == datetime.date(2020, 1, 31)
+		assert schema.coerce('seen', "'2020-01-31 12:30:00'") == datetime.datetime(2020, 1, 31, 12, 30)
+		assert schema.coerce('seen', "'2020-01-31'") == datetime.datetime(2020, 1, 31)
+		assert schema.coerce('price', "9.99") == decimal.Decimal('9.99')
+		assert schema.coerce('extra', "'x'") == "'x'"
+
+	def test_errors(self):
+		schema = get_schema()
+
+		for field, value in (('age', 'abc'), ('active', 'maybe'), ('born', "'yesterday'"), ('price', 'x')):
+			with pytest.raises(SchemaError):
+				schema.coerce(field, value)
+
+		with pytest.raises(SchemaError):
+			schema.coerce('foo', '1')
+
+	@pytest.mark.skipif(sys.version_info < (3, 7), reason="requires dataclasses")
+	def test_from_dataclass(self):
+		import dataclasses
+
+		@dataclasses.dataclass
+		class Item(object):
+			name: str
+			count: int
+			price: Optional[float]
+			tags: List[str]
+
+		schema = Schema.from_dataclass(Item)
+		assert schema.fields == {'name': str, 'count': int, 'price': float, 'tags': None}
+
+	def test_from_model(self):
+		def field(name, internal_type, target=None):
+			f = Mock(is_relation=target is not None, attname="%s_id" % name if target else name)
+			f.name = name
+			f.get_internal_type.return_value = internal_type
+			f.target_field = target
+			return f
+
+		model = Mock()
+		model._meta.concrete_fields = [
+			field('id', 'AutoField'), field('name', 'CharField'), field('active', 'BooleanField'),
+			field('joined', 'DateTimeField'), field('owner', 'ForeignKey', target=field('id', 'BigAutoField')),
+		]
+
+		assert Schema.from_model(model).fields == {
+			'id': int, 'name': str, 'active': bool, 'joined': datetime.datetime, 'owner_id': int,
+		}
+
+
+class TestSchemaParser(object):
+
+	def test_parse(self):
+		q = Parser(schema=get_schema()).parse("age > 30 and name == 'Bob' or active == false")
+		operands = list(q.query)[0].operands
+
+		assert operands[0] == GreaterThanCondition('age', 30, typed=True)
+		assert operands[0] != GreaterThanCondition('age', '30')
+		assert [x.right for x in operands[1].operands] == ['Bob', False]
+		assert q.schema is not None
+
+	def test_parse_membership(self):
+		q = Parser(schema=get_schema()).parse("age in (20, '30') and born not in ('2020-01-31')")
+		operands = list(q.query)[0].operands
+
+		assert operands[0].right == (20, 30)
+		assert operands[1].right == (datetime.date(2020, 1, 31), )
+		assert all(x.typed for x in operands)
+
+		with pytest.raises(ParseError) as e:
+			Parser(schema=get_schema()).parse("age in (1, abc)")
+		assert e.value.pos == 11
+
+	def test_untyped_fields(self):
+		q = Parser(schema=get_schema()).parse("extra == 1")
+		assert list(q.query) == [EqualsCondition('extra', '1')]
+
+	def test_unknown_field(self):
+		with pytest.raises(ParseError) as e:
+			Parser(schema=get_schema()).parse("age > 1 and foo == 1")
+		assert e.value.pos == 12
+		assert "Unknown field 'foo'" in str(e.value)
+
+	def test_invalid_value(self):
+		with pytest.raises(ParseError) as e:
+			Parser(schema=get_schema()).parse("age > abc")
+		assert e.value.pos == 6
+
+	def test_pyparsing(self):
+		pytest.importorskip('pyparsing')
+
+		parser = Parser(schema=get_schema(), use_pyparsing=True)
+		assert list(parser.parse("age == 3").query) == [EqualsCondition('age', 3, typed=True)]
+		with pytest.raises(ParseError):
+			parser.parse("foo == 1")
+
+	def test_cache(self):
+		parser = Parser(cache_size=10)
+		typed = Parser(cache=parser.cache, schema=get_schema())
+
+		assert list(parser.parse("age == 3").query) == [EqualsCondition('age', '3')]
+		assert list(typed.parse("age == 3").query) == [EqualsCondition('age', 3, typed=True)]
+		assert typed.parse("age  == 3") is typed.parse("age == 3")
+
+	def test_apply(self):
+		people = [Person('Alice', 30), Person('Bob', 20, active=False), Person("'Carol'", 40)]
+		parser = Parser(schema=get_schema())
+
+		assert [p.name for p in parser.parse("age >= 30").apply(people)] == ['Alice', "'Carol'"]
+		assert [p.name for p in parser.parse("active == false").apply(people)] == ['Bob']
+		assert [p.name for p in parser.parse("age in (20, 40)").apply(people)] == ['Bob', "'Carol'"]
+		# the quotes of a typed string are only removed once
+		assert [p.name for p in parser.parse("name == \"'Carol'\"").apply(people)] == ["'Carol'"]
+
+		rows = [{'age': 30, 'born': datetime.date(1990, 1, 1)}, {'age': 20, 'born': datetime.date(2000, 1, 1)}]
+		assert list(parser.parse("born < '1995-01-01'").apply(rows, backend=MappingBackend)) == [rows[0]]
+
+	def test_optimize(self):
+		q = Parser(schema=get_schema(), optimize=True).parse("age > 3 and age < 2")
+		assert q.empty
+		assert q.schema is not None
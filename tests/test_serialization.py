@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import datetime
+import decimal
+import json
+
+import pytest
+
+from phylter.conditions import EqualsCondition, AndOperator, OrOperator, ConditionGroup, LessThanOrEqualCondition, \
+	InCondition
+from phylter.parser import Parser, ConsumableIter
+from phylter.query import Query
+from phylter.serialization import DecodeError, to_bytes, from_bytes, MAX_DEPTH
+
+
+class Foo(object):
+	def __init__(self, a, b):
+		self.a = a
+		self.b = b
+
+
+class FakeRedis(object):
+	# stores bytes only, like a redis client
+	def __init__(self):
+		self.data = {}
+
+	def set(self, key, value):
+		assert isinstance(value, bytes)
+		self.data[key] = value
+
+	def get(self, key):
+		return self.data.get(key)
+
+
+queries = [
+	"a == 1",
+	"a == 1 and b > 2",
+	"a == 1 or b >= 2 or c < 3 and d <= 4",
+	"(a == 1 and b == 'x y') or c == \"ä\\\"\"",
+	"a > -1.5 and ((b == 1 or b == 2) and c == true)",
+]
+
+
+class TestSerialization(object):
+
+	@pytest.mark.parametrize('s', queries)
+	def test_bytes_roundtrip(self, s):
+		q = Parser().parse(s)
+		q2 = Query.from_bytes(q.to_bytes())
+		assert list(q2.query) == list(q.query)
+		assert not q2.empty
+
+	@pytest.mark.parametrize('s', queries)
+	def test_json_roundtrip(self, s):
+		q = Parser().parse(s)
+		data = q.to_json()
+		assert json.loads(data)['version'] == 1
+		assert list(Query.from_json(data).query) == list(q.query)
+
+	def test_json_format(self):
+		q = Parser().parse("a == 1 and (b > 2 or c <= 3)")
+		assert json.loads(q.to_json()) == {
+			'version': 1,
+			'empty': False,
+			'query': [['and', ['==', 'a', '1'], ['()', ['or', ['>', 'b', '2'], ['<=', 'c', '3']]]]]
+		}
+
+	def test_values(self):
+		values = [None, True, False, 0, 1, -1, 2 ** 40, -2 ** 40, 1.5, -0.25, u'', u'ä']
+		q = Query(ConsumableIter([AndOperator(*[EqualsCondition('a', v) for v in values] + [InCondition('a', (u'a', 1, None))])]))
+		for q2 in (Query.from_bytes(q.to_bytes()), Query.from_json(q.to_json())):
+			operands = list(q2.query)[0].operands
+			assert [x.right for x in operands] == values + [(u'a', 1, None)]
+			assert [type(x.right) for x in operands[:-1]] == [type(x) for x in values]
+
+	def test_typed(self):
+		values = [datetime.date(2020, 1, 31), datetime.datetime(2020, 1, 31, 12, 30, 15, 500), decimal.Decimal('9.99'),
+				  "'quoted'", 3]
+		q = Query(ConsumableIter([AndOperator(*[EqualsCondition('a', v, typed=True) for v in values])]))
+
+		for q2 in (Query.from_bytes(q.to_bytes()), Query.from_json(q.to_json())):
+			operands = list(q2.query)[0].operands
+			assert [x.right for x in operands] == values
+			assert all(x.typed for x in operands)
+			assert list(q2.query) == list(q.query)
+
+		assert json.loads(q.to_json())['query'][0][1] == ['==', 'a', {'date': '2020-01-31'}, True]
+
+	def test_membership(self):
+		q = Parser().parse("a in (1, 'x') and b not in (y)")
+		assert json.loads(q.to_json())['query'] == [['and', ['in', 'a', ['1', "'x'"]], ['not in', 'b', ['y']]]]
+
+		for q2 in (Query.from_bytes(q.to_bytes()), Query.from_json(q.to_json())):
+			assert list(q2.query) == list(q.query)
+
+	def test_unsupported_value(self):
+		with pytest.raises(ValueError):
+			Query(ConsumableIter([EqualsCondition('a', object())])).to_bytes()
+
+	def test_empty(self):
+		q = Parser().parse("a == 1 and a == 2").optimize()
+		assert q.empty
+
+		for q2 in (Query.from_bytes(q.to_bytes()), Query.from_json(q.to_json())):
+			assert q2.empty
+			assert list(q2.apply([Foo(1, 1)])) == []
+
+	def test_apply(self):
+		q = Query.from_bytes(Parser().parse("a == 1 or b > 5").to_bytes())
+		items = [Foo(1, 1), Foo(2, 2), Foo(3, 6)]
+		assert [x.a for x in q.apply(items)] == [1, 3]
+
+	def test_shared_nodes(self):
+		q = Parser().parse("a == 1 and b == 2")
+		assert list(Query.from_bytes(q.to_bytes()).query)[0].operands[0] is list(q.query)[0].operands[0]
+
+	def test_large(self):
+		q = Parser().parse(" or ".join("a == %s" % i for i in range(5000)))
+		data = q.to_bytes()
+		assert len(data) < len(str(q))
+		assert list(Query.from_bytes(data).query) == list(q.query)
+
+	def test_store(self):
+		redis = FakeRedis()
+		q = Parser().parse("a == 1 and b <= 2")
+		redis.set('query:1', q.to_bytes())
+
+		q2 = Query.from_bytes(redis.get('query:1'))
+		assert list(q2.query) == [AndOperator(EqualsCondition('a', '1'), LessThanOrEqualCondition('b', '2'))]
+
+
+class TestDecoding(object):
+
+	def test_invalid_bytes(self):
+		data = Parser().parse("a == 1 and b == 2").to_bytes()
+
+		for invalid in (b'', b'XYZ', b'PHQ', data[:-1], data + b'\x00', b'PHQ\x02' + data[4:],
+						data[:6] + b'\x7f' + data[7:], b'PHQ\x01\x00\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff'):
+			with pytest.raises(DecodeError):
+				from_bytes(invalid)
+
+		with pytest.raises(TypeError):
+			from_bytes(u'PHQ')
+
+	def test_invalid_operands(self):
+		data = bytearray(b'PHQ\x01\x00\x01\x10\x01\x01\x03\x01a\x03\x011')  # and with a single operand
+		with pytest.raises(DecodeError):
+			from_bytes(bytes(data))
+
+	def test_invalid_string_reference(self):
+		assert from_bytes(b'PHQ\x01\x00\x01\x01\x03\x01a\x07\x00').query.iterable == [EqualsCondition('a', 'a')]
+		with pytest.raises(DecodeError):
+			from_bytes(b'PHQ\x01\x00\x01\x01\x03\x01a\x07\x01')
+
+	def test_invalid_conditions(self):
+		for invalid in (
+			b'PHQ\x01\x00\x01\x01\x04\x0a\x03\x01x',  # a == with a number as field
+			b'PHQ\x01\x00\x01\x06\x03\x01a\x03\x03abc',  # in with a single value
+			b'PHQ\x01\x00\x01\x06\x03\x01a\x06\x00',  # in with an empty list
+			b'PHQ\x01\x00\x01\x01\x03\x01a\x06\x01\x03\x01x',  # == with a list
+		):
+			with pytest.raises(DecodeError):
+				from_bytes(invalid)
+
+		assert list(from_bytes(b'PHQ\x01\x00\x01\x06\x03\x01a\x06\x01\x03\x01x').query) == [InCondition('a', ('x', ))]
+
+	def test_long_strings(self):
+		# multi-byte string lengths and string references
+		fields = ['f%s' % i for i in range(200)]
+		q = Query(ConsumableIter([OrOperator(*[EqualsCondition(f, 'x' * 300) for f in fields + fields])]))
+		assert list(from_bytes(to_bytes(q)).query) == list(q.query)
+
+		with pytest.raises(DecodeError):
+			from_bytes(b'PHQ\x01\x00\x01\x01\x03\x01a\x05\x00\x00')  # truncated float
+
+	def test_invalid_utf8(self):
+		with pytest.raises(DecodeError):
+			from_bytes(b'PHQ\x01\x00\x01\x01\x03\x01\xff\x03\x011')
+
+	def test_depth(self):
+		node = EqualsCondition('a', '1')
+		for i in range(MAX_DEPTH + 1):
+			node = ConditionGroup(node)
+		data = to_bytes(Query(ConsumableIter([node])))
+
+		with pytest.raises(DecodeError):
+			from_bytes(data)
+
+		with pytest.raises(DecodeError):
+			Query.from_json(Query(ConsumableIter([node])).to_json())
+
+	def test_invalid_json(self):
+		for invalid in ('', '[]', '{}', '{"version": 2, "query": []}', '{"version": 1, "query": {}}',
+						'{"version": 1, "query": [["=", "a", "1"]]}', '{"version": 1, "query": [["==", "a"]]}',
+						'{"version": 1, "query": [["and", ["==", "a", "1"]]]}', '{"version": 1, "query": [[]]}',
+						'{"version": 1, "query": [["==", "a", {"x": 1}]]}', '{"version": 1, "query": [[1, 2, 3]]}',
+						'{"version": 1, "query": [["==", "a", {"date": "x"}]]}', '{"version": 1, "query": [["==", "a", 1, 1]]}',
+						'{"version": 1, "query": [["==", 5, "x"]]}', '{"version": 1, "query": [["==", null, "x"]]}',
+						'{"version": 1, "query": [["in", "a", "abc"]]}', '{"version": 1, "query": [["in", "a", []]]}',
+						'{"version": 1, "query": [["not in", "a", [["x"]]]]}', '{"version": 1, "query": [["==", "a", ["x"]]]}'):
+			with pytest.raises(DecodeError):
+				Query.from_json(invalid)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from phylter.backends.mapping import MappingBackend
+from phylter.backends.objects import ObjectsBackend
+from phylter.conditions import EqualsCondition, GreaterThanCondition, OrOperator
+from phylter.parser import Parser
+from phylter.stats import QueryStats, NodeStats, is_coerced
+
+
+class Foo(object):
+	def __init__(self, a, b):
+		self.a = a
+		self.b = b
+
+
+class TestQueryStats(object):
+
+	def get_items(self):
+		return [Foo(i, i % 3) for i in range(10)]
+
+	def test_counts(self):
+		stats = QueryStats()
+		q = Parser().parse("a > 4 and b == 0")
+		result = list(q.apply(self.get_items(), backend=ObjectsBackend(stats=stats)))
+		assert [x.a for x in result] == [6, 9]
+
+		gt = stats[GreaterThanCondition('a', '4')]
+		assert gt.evaluations == 10
+		assert gt.passed == 5
+		assert gt.pass_rate == 0.5
+		assert gt.time > 0
+
+		eq = stats[EqualsCondition('b', '0')]
+		assert eq.evaluations == 5  # short-circuited for a <= 4
+		assert eq.passed == 2
+
+		root = stats[list(q.query)[0]]
+		assert root.evaluations == 10
+		assert root.passed == 2
+		assert len(stats.nodes) == 3
+
+	def test_apply_options(self):
+		stats = QueryStats()
+		items = [{'a': 1}, {'a': 2}, {'a': 3}]
+		q = Parser().parse("a == 1 or a == 3")
+		assert list(q.apply(items, stats=stats)) == [{'a': 1}, {'a': 3}]
+		assert stats[OrOperator(EqualsCondition('a', '1'), EqualsCondition('a', '3'))].passed == 2
+		assert stats[EqualsCondition('a', '3')].evaluations == 2
+
+	def test_not_cached(self):
+		q = Parser().parse("a == 1")
+		items = [Foo(1, 1)]
+		assert q.compile(ObjectsBackend(stats=QueryStats())) is not q.compile(ObjectsBackend(stats=QueryStats()))
+		assert q.compile(ObjectsBackend()) is q.compile(ObjectsBackend())
+
+		stats = QueryStats()
+		list(q.apply(items, backend=ObjectsBackend(stats=stats)))
+		list(q.apply(items, backend=ObjectsBackend(stats=stats)))
+		assert stats[EqualsCondition('a', '1')].evaluations == 2
+
+	def test_not_cached_mappings(self):
+		q = Parser().parse("a == 1")
+		rows = [{'a': 1}, {'a': 2}]
+		first, second = QueryStats(), QueryStats()
+
+		list(q.apply(rows, stats=first))
+		list(q.apply(rows, stats=second))
+		list(q.apply(rows))
+		assert first[EqualsCondition('a', '1')].evaluations == 2
+		assert second[EqualsCondition('a', '1')].evaluations == 2
+		assert q.compile(MappingBackend()) is q.compile(MappingBackend())
+
+	def test_coercion_failures(self):
+		stats = QueryStats()
+		items = [Foo(1, 'x'), Foo(2, 'y'), Foo(None, 'z')]
+		q = Parser().parse("a == foo or b == 5")
+		assert list(q.apply(items, backend=ObjectsBackend(stats=stats))) == []
+
+		assert stats[EqualsCondition('a', 'foo')].coercion_failures == 2
+		assert stats[EqualsCondition('b', '5')].coercion_failures == 0
+
+	def test_callbacks(self):
+		calls = []
+		stats = QueryStats(callbacks=[lambda s, result, elapsed: calls.append((s.node, result))])
+		stats.add_callback(lambda s, result, elapsed: calls.append(elapsed >= 0))
+
+		q = Parser().parse("a == 1")
+		list(q.apply([Foo(1, 1), Foo(2, 2)], backend=ObjectsBackend(stats=stats)))
+		assert calls == [(EqualsCondition('a', '1'), True), True, (EqualsCondition('a', '1'), False), True]
+
+	def test_errors(self):
+		stats = QueryStats()
+		q = Parser().parse("c == 1")
+		with pytest.raises(AttributeError):
+			list(q.apply([Foo(1, 1)], backend=ObjectsBackend(stats=stats)))
+		assert stats[EqualsCondition('c', '1')].errors == 1
+		assert stats[EqualsCondition('c', '1')].evaluations == 0
+
+	def test_report(self):
+		stats = QueryStats()
+		list(Parser().parse("a == 1").apply([{'a': 1}], backend=MappingBackend(stats=stats)))
+		report = stats.report().splitlines()
+		assert len(report) == 2
+		assert report[1].startswith("a == 1 ")
+
+		stats.reset()
+		assert [s.evaluations for s in stats] == [0]
+
+	def test_node_stats(self):
+		assert NodeStats(EqualsCondition('a', '1')).pass_rate is None
+
+	def test_is_coerced(self):
+		assert is_coerced(1.0, int)
+		assert is_coerced(u'a', str)
+		assert is_coerced('a', type(None))
+		assert not is_coerced('a', int)